@@ -0,0 +1,73 @@
+from flask import Blueprint, Response
+from flask import current_app as app
+
+from backend import AudioBuffersInstance, CACHE_CONNECTED
+from metrics import (
+    ACTIVE_SESSIONS,
+    BUFFERED_BYTES,
+    CONTENT_TYPE,
+    LOADED_MODELS,
+    MODEL_INSTANCES,
+    REGISTRY,
+)
+
+from typing import Dict, Tuple
+
+
+# --------------------------------------------------------------------------- #
+# blueprint
+# --------------------------------------------------------------------------- #
+
+monitoring_bp = Blueprint("monitoring_bp", __name__)
+
+
+# --------------------------------------------------------------------------- #
+# gauges, read when /metrics is scraped
+# --------------------------------------------------------------------------- #
+
+
+def count_sessions() -> Dict[Tuple[str], int]:
+    """Streaming sessions by whether their client is connected."""
+    _sessions = list(AudioBuffersInstance.get_instance().values())
+    _connected = sum(1 for session in _sessions if session.get(CACHE_CONNECTED))
+    return {("true",): _connected, ("false",): len(_sessions) - _connected}
+
+
+def get_buffered_bytes() -> Dict[Tuple[str], int]:
+    """Bytes of the session buffers in memory / spilled to disk."""
+    _accounting = app.config.get("STREAM_BUFFER_ACCOUNTING")
+    if _accounting is None:
+        return {}
+    _stats = _accounting.stats()
+    return {("memory",): _stats["memory_bytes"], ("disk",): _stats["disk_bytes"]}
+
+
+def count_loaded_models() -> int:
+    return len(app.config["LOADED_MODELS"])
+
+
+def count_model_instances() -> Dict[Tuple[str, str], int]:
+    """Idle + busy instances of every loaded model."""
+    _instances = {}
+    for name, pool in app.config["LOADED_MODELS"].items():
+        _stats = pool.stats()
+        _instances[(name, "idle")] = _stats["idle"]
+        _instances[(name, "busy")] = _stats["busy"]
+    return _instances
+
+
+ACTIVE_SESSIONS.set_function(count_sessions)
+BUFFERED_BYTES.set_function(get_buffered_bytes)
+LOADED_MODELS.set_function(count_loaded_models)
+MODEL_INSTANCES.set_function(count_model_instances)
+
+
+# --------------------------------------------------------------------------- #
+# routes
+# --------------------------------------------------------------------------- #
+
+
+@monitoring_bp.route("", methods=["GET"])
+def metrics():
+    """Every metric in the Prometheus text format."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
 from flask import current_app as app
 
+import logging
 import os
+import tracing
 
 from backend import MongoDBInstance
 from typing import Optional, Union, List, Dict, Any
@@ -44,7 +46,7 @@ def get_db_objects(
 
     # perform ensured check
     if not ensured_endpoint(collection_name):
-        print("Created new collection")
+        tracing.log_event("collection_created", collection=collection_name)
 
     collection = client[collection_name]
     if collection is None:
@@ -95,7 +97,6 @@ def ensured_endpoint(collection_name: str):
         return False
 
     # check if collection exists
-    print(client)
     if collection_name not in client.list_collection_names():
         # create
         client.create_collection(collection_name)
@@ -333,7 +334,12 @@ def get_objects():
     # get the object from the collection
     try:
         results = get_db_objects(filters, collection_name)
-        print(results)
+        tracing.log_event(
+            "get_objects",
+            logging.DEBUG,
+            collection=collection_name,
+            objects=len(results) if results is not None else None,
+        )
 
         if results is None:
             return (
@@ -9,9 +9,29 @@ from backend import (
     CACHE_AUDIO_DATA,
     CACHE_FILE_PATH,
     CACHE_FILE_URL,
+    CACHE_LIVE_TRANSCRIBER,
+    CACHE_RECORDER,
+    CACHE_CONNECTED,
+    CACHE_LAST_ACTIVE,
+    CACHE_TRACE,
 )
+from api.stt import get_session_span, get_shared_model, get_vad_params
+from audio_decoder import StreamRecorder
+from live import LiveTranscriber
+from metrics import (
+    CHUNK_INGEST_SECONDS,
+    EMIT_SECONDS,
+    FFMPEG_SECONDS,
+    INFERENCE_SECONDS,
+    TimedModel,
+)
+from session_buffer import BufferAccounting, BufferFull, SpillBuffer
+from transcription import WHISPER_SAMPLE_RATE
 
+import logging
 import os
+import tracing
+import time
 import ffmpeg
 
 from typing import Optional, Union, List, Dict, Any
@@ -40,7 +60,119 @@ def is_valid_streaming_key(key: str) -> bool:
 def is_audio_buffer_empty(key: str) -> bool:
     """Check if the audio buffer is empty."""
     # Check if the key exists and if its buffer is empty
-    return is_valid_streaming_key(key) and len(AudioBuffersInstance()[key]) == 0
+    return (
+        is_valid_streaming_key(key)
+        and len(AudioBuffersInstance.get_instance()[key][CACHE_AUDIO_DATA]) == 0
+    )
+
+
+def emit_event(event: str, *args, **kwargs):
+    """`emit` to the current client, timed into the emit latency metric."""
+    with EMIT_SECONDS.time(event=event):
+        emit(event, *args, **kwargs)
+
+
+# --------------------------------------------------------------------------- #
+# session buffers
+# --------------------------------------------------------------------------- #
+
+
+def get_buffer_accounting() -> BufferAccounting:
+    """Process-wide accounting of the session buffers."""
+    if app.config.get("STREAM_BUFFER_ACCOUNTING") is None:
+        app.config["STREAM_BUFFER_ACCOUNTING"] = BufferAccounting(
+            app.config.get("STREAM_BUFFER_GLOBAL_MEMORY_LIMIT", 0)
+        )
+    return app.config["STREAM_BUFFER_ACCOUNTING"]
+
+
+def new_session_buffer(key: str, name: str, max_bytes: int = 0) -> SpillBuffer:
+    """Memory capped buffer for a session, spills to `<spill dir>/<key>.<name>`."""
+    return SpillBuffer(
+        os.path.join(app.config["STREAM_SPILL_DIR"], f"{key}.{name}"),
+        memory_limit=app.config.get("STREAM_BUFFER_MEMORY_LIMIT", 8 * 1024 * 1024),
+        max_bytes=max_bytes,
+        accounting=get_buffer_accounting(),
+    )
+
+
+def release_session_memory(key: str):
+    """
+    Free what a finished / disconnected session holds in memory. The decoded
+    audio is dropped when its wav archive exists (/stt/transcribe_stream reads
+    that instead), otherwise it is kept for it and only moved to disk while
+    the session buffers are over their global memory limit. The raw chunks
+    are freed once they were decoded.
+    """
+    _session = AudioBuffersInstance.get_instance()[key]
+    _recorder = _session.get(CACHE_RECORDER)
+    _buffer = _session[CACHE_AUDIO_DATA]
+    if _recorder is not None and _recorder.is_ok():
+        _buffer.release()
+        _archive_path = _recorder.get_archive_path()
+        if _archive_path and os.path.exists(_archive_path):
+            _recorder.release()
+            return
+        _buffer = _recorder.get_pcm_buffer()
+    # decoder failed, the chunks are all there is
+    if get_buffer_accounting().is_over_memory_limit():
+        _buffer.spill()
+
+
+def get_file_url(file_path: str) -> str:
+    """Public URL of a file in the audio cache."""
+    base_url = app.config.get(
+        "AUDIO_BASE_URL",
+        f"http://{os.getenv('BACKEND_HOST')}:{os.getenv('BACKEND_PORT')}/static/audio",
+    )
+    return f"{base_url}/{os.path.basename(file_path)}"
+
+
+def start_recorder(key: str) -> Optional[StreamRecorder]:
+    """
+    Start decoding the session (once, before the first chunk is written).
+    The wav is only written if STREAM_ARCHIVE_WAV is set. None if ffmpeg
+    could not be started.
+    """
+    _session = AudioBuffersInstance.get_instance()[key]
+    if _session.get(CACHE_RECORDER) is not None:
+        return _session[CACHE_RECORDER]
+
+    # check if folder exists
+    if not os.path.exists(app.config["AUDIO_CACHE_DIR"]):
+        os.makedirs(app.config["AUDIO_CACHE_DIR"])
+
+    try:
+        _session[CACHE_RECORDER] = StreamRecorder(
+            new_session_buffer(
+                key,
+                "pcm",
+                int(
+                    app.config.get("STREAM_MAX_SECONDS", 0)
+                    * WHISPER_SAMPLE_RATE
+                    * 2
+                ),
+            ),
+            (
+                _session[CACHE_FILE_PATH]
+                if app.config.get("STREAM_ARCHIVE_WAV", True)
+                else None
+            ),
+            WHISPER_SAMPLE_RATE,
+            app.config.get("STREAM_INPUT_FORMAT"),
+        )
+    except Exception as e:
+        tracing.log_event(
+            "stream_decoder_failed", logging.ERROR, _session[CACHE_TRACE], error=str(e)
+        )
+        return None
+    return _session[CACHE_RECORDER]
+
+
+def finish_recorder(recorder: StreamRecorder) -> bool:
+    """Flush the session's decoder, True if every chunk was decoded."""
+    with FFMPEG_SECONDS.time(operation="flush"):
+        return recorder.finish(app.config.get("STREAM_DECODER_TIMEOUT", 10.0))
 
 
 def process_audio(key: str) -> bool:
@@ -50,19 +182,34 @@ def process_audio(key: str) -> bool:
         return False
 
     _audio_instance = AudioBuffersInstance.get_instance()
+    _span = _audio_instance[key][CACHE_TRACE]
+
+    # the recorder decoded the stream as it came in, just flush it
+    _recorder = _audio_instance[key].get(CACHE_RECORDER)
+    if _recorder is not None and finish_recorder(_recorder):
+        _audio_instance[key][CACHE_FILE_URL] = get_file_url(
+            _audio_instance[key][CACHE_FILE_PATH]
+        )
+        # the raw chunks were only kept in case the decoder failed
+        _audio_instance[key][CACHE_AUDIO_DATA].release()
+        _span.log(
+            "recording_saved",
+            samples=_recorder.get_samples_written(),
+            bytes_in=_recorder.get_bytes_in(),
+        )
+        return True
+
+    # decoder failed / never started, convert the buffered chunks in one go
     audio_chunks = _audio_instance[key][CACHE_AUDIO_DATA]
 
     # Combine the chunks into a single blob
-    audio_blob = b"".join(audio_chunks)
+    audio_blob = audio_chunks.read()
 
-    print(f"This is the streaming key: {_audio_instance[key][CACHE_STREAMING_KEY]}")
-    print(_audio_instance[key][CACHE_FILE_PATH])
-    print(f"Audio buffer length: {len(audio_blob)}")
+    _span.log("recording_convert", logging.WARNING, bytes=len(audio_blob))
 
     # check if folder exists
     if not os.path.exists(app.config["AUDIO_CACHE_DIR"]):
         os.makedirs(app.config["AUDIO_CACHE_DIR"])
-        print("Created audio cache directory")
 
     # save the audio file as a webm file
     try:
@@ -72,37 +219,26 @@ def process_audio(key: str) -> bool:
 
         with open(_temp_file, "wb") as f:
             f.write(audio_blob)
-        print("Saved audio blob to raw temporary file at:", _temp_file)
 
         _final_file = _audio_instance[key][CACHE_FILE_PATH]
 
         # ffmpeg to save file as proper format
 
-        ffmpeg.input(_temp_file).output(
-            _final_file, ar=16000, ac=1, acodec="pcm_s16le"
-        ).run(quiet=False, overwrite_output=True)
-
-        print("Saved audio data to wav file: ", _final_file)
+        with FFMPEG_SECONDS.time(operation="convert"):
+            ffmpeg.input(_temp_file).output(
+                _final_file, ar=16000, ac=1, acodec="pcm_s16le"
+            ).run(quiet=False, overwrite_output=True)
 
         # create file url
-        base_url = app.config.get(
-            "AUDIO_BASE_URL",
-            f"http://{os.getenv('BACKEND_HOST')}:{os.getenv('BACKEND_PORT')}/static/audio",
-        )
-        file_url = f"{base_url}/{os.path.basename(_final_file)}"
-        _audio_instance[key][CACHE_FILE_URL] = file_url
+        _audio_instance[key][CACHE_FILE_URL] = get_file_url(_final_file)
 
         # delete temp file
         os.remove(_temp_file)
-        print("Deleted temporary file: ", _temp_file)
-    except FileNotFoundError:
-        print("File not found error")
-        return False
     except Exception as e:
-        print(f"Error processing audio: {e}")
+        _span.log("recording_failed", logging.ERROR, error=f"{type(e).__name__}: {e}")
         return False
 
-    print(f"Audio processed and saved to {_final_file}")
+    _span.log("recording_saved", file=_final_file)
 
     return True
 
@@ -114,7 +250,6 @@ def process_audio(key: str) -> bool:
 
 @socket_io_instance.on("connect", namespace="/streaming")
 def handle_connect():
-    print("Client connected", request.sid)
     sid = request.sid
 
     _audio_instance = AudioBuffersInstance.get_instance()
@@ -122,16 +257,25 @@ def handle_connect():
     _audio_instance[sid] = {
         CACHE_STREAMING_KEY: sid,
         CACHE_FILE_PATH: os.path.join(app.config["AUDIO_CACHE_DIR"], f"{sid}.wav"),
-        CACHE_AUDIO_DATA: [],
+        CACHE_AUDIO_DATA: new_session_buffer(
+            sid, "chunks", app.config.get("STREAM_MAX_CHUNK_BYTES", 0)
+        ),
         CACHE_FILE_URL: None,
+        CACHE_LIVE_TRANSCRIBER: None,
+        CACHE_RECORDER: None,
+        CACHE_CONNECTED: True,
+        CACHE_LAST_ACTIVE: time.time(),
+        # the session's trace, everything done for it logs under this span
+        CACHE_TRACE: tracing.Span("session", streaming_id=sid),
     }
+    _audio_instance[sid][CACHE_TRACE].log("connect")
 
     # check if valid streaming key
     if not is_valid_streaming_key(sid):
-        emit("error", {"message": "Invalid streaming key"})
+        emit_event("error", {"message": "Invalid streaming key"})
         return
 
-    emit("response", {"message": "Connected to server"})
+    emit_event("response", {"message": "Connected to server"})
 
 
 @socket_io_instance.on("stop_recording", namespace="/streaming")
@@ -140,31 +284,33 @@ def handle_stop_recording():
 
     # check if valid streaming key
     if not is_valid_streaming_key(sid):
-        emit("error", {"message": "Invalid streaming key"})
+        emit_event("error", {"message": "Invalid streaming key"})
         return
 
     _audio_instance = AudioBuffersInstance.get_instance()
 
+    _span = _audio_instance[sid][CACHE_TRACE]
+    _span.log("stop_recording")
+
     # return the audio file path
-    print("Emitting file path: ", _audio_instance[sid][CACHE_FILE_PATH])
     file_path = _audio_instance[sid][CACHE_FILE_PATH]
 
     # Construct a public URL for the audio file.
-    base_url = app.config.get(
-        "AUDIO_BASE_URL",
-        f"http://{os.getenv('BACKEND_HOST')}:{os.getenv('BACKEND_PORT')}/static/audio",
-    )
-    file_url = f"{base_url}/{os.path.basename(file_path)}"
-    _audio_instance[sid][CACHE_FILE_URL] = file_url
+    _audio_instance[sid][CACHE_FILE_URL] = get_file_url(file_path)
 
     # process the file first
     if not process_audio(sid):
-        emit("error", {"message": "Failed to process audio"})
+        emit_event("error", {"message": "Failed to process audio"})
         return
-    print(f"Saved recording for client {sid}")
+
+    # every sample is decoded now, the rest is transcribed on the live thread
+    # and sent as the final partial_segments
+    _live = _audio_instance[sid].get(CACHE_LIVE_TRANSCRIBER)
+    if _live is not None:
+        _live.stop()
 
     # emit the file path to the client
-    emit(
+    emit_event(
         "result_file_path",
         {
             "streaming_id": sid,
@@ -172,18 +318,86 @@ def handle_stop_recording():
             "file_url": _audio_instance[sid][CACHE_FILE_URL],
         },
     )
+    _span.log("result_file_path", file_url=_audio_instance[sid][CACHE_FILE_URL])
 
 
 @socket_io_instance.on("disconnect", namespace="/streaming")
 def handle_disconnect():
-    print("Client disconnected", request.sid)
     sid = request.sid
 
     # check if valid streaming key
     if not is_valid_streaming_key(sid):
-        emit("error", {"message": "Invalid streaming key"})
+        emit_event("error", {"message": "Invalid streaming key"})
+        return
+
+    # nobody is listening for partial transcripts anymore
+    _session = AudioBuffersInstance.get_instance()[sid]
+    _session[CACHE_CONNECTED] = False
+    _session[CACHE_LAST_ACTIVE] = time.time()
+    if _session.get(CACHE_LIVE_TRANSCRIBER) is not None:
+        _session[CACHE_LIVE_TRANSCRIBER].stop(final_pass=False)
+
+    # keep what was recorded so far
+    _recorder = _session.get(CACHE_RECORDER)
+    if _recorder is not None and not _recorder.is_finished():
+        finish_recorder(_recorder)
+
+    # free what /stt/transcribe_stream can do without
+    release_session_memory(sid)
+    _session[CACHE_TRACE].log("disconnect")
+    _session[CACHE_TRACE].end()
+
+
+@socket_io_instance.on("start_live", namespace="/streaming")
+def handle_start_live(data):
+    """Start transcribing the session while it is recorded."""
+    sid = request.sid
+
+    # check if valid streaming key
+    if not is_valid_streaming_key(sid):
+        emit_event("error", {"message": "Invalid streaming key"})
+        return
+
+    _audio_instance = AudioBuffersInstance.get_instance()
+    if _audio_instance[sid].get(CACHE_LIVE_TRANSCRIBER) is not None:
+        emit_event("error", {"message": "Live transcription already started"})
+        return
+
+    _model = (data or {}).get("model")
+    _shared_model = get_shared_model(_model)
+    if _shared_model is None:
+        emit_event("error", {"message": f"Model {_model} not available"})
+        return
+
+    def _emit_partial(payload: Dict[str, Any]):
+        with EMIT_SECONDS.time(event="partial_segments"):
+            socket_io_instance.emit(
+                "partial_segments", payload, namespace="/streaming", to=sid
+            )
+
+    # the recorder starts with the first chunk, so it may not exist yet (a
+    # decoder started mid-stream would miss the header)
+    _recorder = _audio_instance[sid].get(CACHE_RECORDER)
+    if _recorder is None and not _audio_instance[sid][CACHE_AUDIO_DATA]:
+        _recorder = start_recorder(sid)
+    if _recorder is None:
+        emit_event("error", {"message": "Failed to start live transcription"})
         return
 
+    _live = LiveTranscriber(
+        sid,
+        TimedModel(_shared_model, INFERENCE_SECONDS, {"model": _model, "path": "live"}),
+        _recorder.get_storage(),
+        _emit_partial,
+        interval=app.config.get("LIVE_TRANSCRIBE_INTERVAL", 1.0),
+        decode_window=app.config.get("LIVE_DECODE_WINDOW", 15.0),
+        vad_params=get_vad_params(),
+    )
+    _audio_instance[sid][CACHE_LIVE_TRANSCRIBER] = _live
+    _audio_instance[sid][CACHE_TRACE].log("start_live", model=_model)
+
+    emit_event("response", {"message": "Live transcription started", "model": _model})
+
 
 @socket_io_instance.on("audio_chunk", namespace="/streaming")
 def handle_audio_chunk(data):
@@ -191,22 +405,75 @@ def handle_audio_chunk(data):
     sid = request.sid
     # check if valid streaming id
     if not sid:
-        emit("error", {"message": "Invalid streaming key"})
+        emit_event("error", {"message": "Invalid streaming key"})
 
     # check if valid streaming key
     if not is_valid_streaming_key(sid):
-        emit("error", {"message": "Invalid streaming key"}, namespace="/streaming")
+        emit_event(
+            "error", {"message": "Invalid streaming key"}, namespace="/streaming"
+        )
         return
 
     _chunk = data["chunk"]
-    print("Received chunk: length = ", len(_chunk))
+    if tracing.enabled(logging.DEBUG):
+        tracing.log_event(
+            "audio_chunk",
+            logging.DEBUG,
+            AudioBuffersInstance.get_instance()[sid][CACHE_TRACE],
+            bytes=len(_chunk),
+        )
 
-    # Append the received audio data to the buffer
-    _audio_instance = AudioBuffersInstance.get_instance()
-    _audio_instance[sid][CACHE_AUDIO_DATA].append(_chunk)
+    with CHUNK_INGEST_SECONDS.time():
+        # Append the received audio data to the buffer
+        _audio_instance = AudioBuffersInstance.get_instance()
+        _audio_instance[sid][CACHE_LAST_ACTIVE] = time.time()
+        _buffer = _audio_instance[sid][CACHE_AUDIO_DATA]
+        _first = len(_buffer) == 0
+        try:
+            _buffer.append(_chunk)
+        except BufferFull:
+            _error = "Recording too long"
+        except ValueError:
+            # buffer released, the recording was already processed
+            _error = "Recording already stopped"
+        else:
+            _error = None
+
+            # decode as it arrives, the first chunk starts the decoder
+            if _first:
+                start_recorder(sid)
+            _recorder = _audio_instance[sid].get(CACHE_RECORDER)
+            if _recorder is not None and not _recorder.is_finished():
+                _recorder.write(_chunk)
+
+    if _error is not None:
+        emit_event("error", {"message": _error}, namespace="/streaming")
+        return
 
     # Optionally, send back a response
-    emit("response", {"message": "received chunk"}, namespace="/streaming")
+    emit_event("response", {"message": "received chunk"}, namespace="/streaming")
+
+
+@streaming_bp.route("/buffers", methods=["GET"])
+def streaming_buffers():
+    """Bytes held by the session buffers, per session and in total."""
+    _sessions = {}
+    for sid, session in list(AudioBuffersInstance.get_instance().items()):
+        _recorder = session.get(CACHE_RECORDER)
+        _sessions[sid] = {
+            "chunks": session[CACHE_AUDIO_DATA].stats(),
+            "pcm": (
+                _recorder.get_pcm_buffer().stats() if _recorder is not None else None
+            ),
+        }
+    _reaper = app.config.get("SESSION_REAPER")
+    return jsonify(
+        {
+            "total": get_buffer_accounting().stats(),
+            "sessions": _sessions,
+            "reaper": _reaper.stats() if _reaper is not None else None,
+        }
+    )
 
 
 @streaming_bp.route("/force_stop", methods=["POST"])
@@ -1,10 +1,47 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask import current_app as app
 
+import json
+import logging
 import os
-from pywhispercpp.model import Model as WhisperModel
+import threading
+import time
+import wave
+import numpy as np
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from audio_decoder import decode_audio_file, probe_duration
+from backend import SocketIOInstance, AudioBuffersInstance, CACHE_RECORDER, CACHE_TRACE
+from batch import (
+    BATCH_ITEM_FILE,
+    BATCH_ITEM_RECORDING,
+    BATCH_ORDER_SHORTEST,
+    BATCH_ORDERS,
+    BatchItem,
+    TranscriptionBatch,
+)
+from engines import ENGINE_WHISPERCPP, STTEngine, create_engine
+from jobs import TranscriptionJob
+import tracing
+from metrics import EMIT_SECONDS, INFERENCE_SECONDS, MODEL_LOAD_SECONDS
+from model_pool import (
+    ModelCache,
+    ModelPool,
+    ModelPoolClosed,
+    ModelPoolError,
+    PooledModel,
+)
+from result_cache import hash_audio, hash_file, make_cache_key
+from transcription import (
+    WHISPER_SAMPLE_RATE,
+    transcribe_audio,
+    transcribe_file,
+    transcribe_long_audio,
+)
+from verify import read_wav_samples
+from workers import WorkerPoolBusy, WorkerCrashed, WorkerJobError, WorkerModel
 
-from typing import Optional, Union, List, Dict, Any
+from typing import Callable, Optional, Union, List, Dict, Any
 
 
 # --------------------------------------------------------------------------- #
@@ -13,6 +50,17 @@ from typing import Optional, Union, List, Dict, Any
 
 stt_bp = Blueprint("stt_bp", __name__)
 
+# background model loading
+MODEL_STATE_LOADING = "loading"
+MODEL_STATE_READY = "ready"
+MODEL_STATE_FAILED = "failed"
+
+_model_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model_loader")
+
+# one load at a time per model, so two requests don't both build a pool
+_load_locks: Dict[str, threading.Lock] = {}
+_load_locks_lock = threading.Lock()
+
 
 # --------------------------------------------------------------------------- #
 # verification functions
@@ -29,34 +77,189 @@ def is_model_loaded(model: str) -> bool:
     return model in app.config["LOADED_MODELS"]
 
 
+def uses_worker_pool() -> bool:
+    """Check if transcription runs in the worker processes (which own the models)."""
+    return app.config.get("WORKER_POOL") is not None
+
+
+def get_model_concurrency() -> int:
+    """Transcriptions that can run at once: one per worker / pooled instance."""
+    if uses_worker_pool():
+        return max(1, app.config.get("TRANSCRIBE_WORKERS", 1))
+    return max(1, app.config.get("MODEL_POOL_SIZE", 1))
+
+
+def get_vad_params() -> Optional[Dict[str, Any]]:
+    """Get the VAD parameters, or None if the VAD is disabled."""
+    if not app.config.get("VAD_ENABLED", False):
+        return None
+    return dict(app.config.get("VAD_PARAMS", {}))
+
+
+def _get_load_lock(model: str) -> threading.Lock:
+    with _load_locks_lock:
+        return _load_locks.setdefault(model, threading.Lock())
+
+
 def load_model(model: str) -> bool:
     """Load the model into memory."""
-    # check if model already loadaed
-    if is_model_loaded(model):
-        return False
     if not is_model_valid(model):
         app.logger.error("Model not valid")
         return False
+    with _get_load_lock(model):
+        # check if model already loadaed
+        if is_model_loaded(model):
+            return False
+        return _load_model(model)
+
+
+def _load_model(model: str) -> bool:
 
     # define variables
     _model_name = os.path.basename(model)
+    _model_path = app.config["MODEL_PATH_MAP"][model]
+    _pool_size = app.config.get("MODEL_POOL_SIZE", 1)
+    _engine = app.config.get("STT_ENGINE", ENGINE_WHISPERCPP)
+    _model_params = dict(app.config.get("STT_ENGINE_PARAMS") or {})
+    if app.config.get("MODEL_POOL_THREADS"):
+        _model_params["n_threads"] = app.config["MODEL_POOL_THREADS"]
+    _log_file = (
+        f"{app.config['WHISPER_LOGS_DIR']}/{_model_name}.log"
+        if app.config["WHISPER_LOGS"]
+        else None
+    )
 
-    # Load model
-    _model = WhisperModel(
-        app.config["MODEL_PATH_MAP"][model],
-        redirect_whispercpp_logs_to=(
-            f"{app.config['WHISPER_LOGS_DIR']}/{_model_name}.log"
-            if app.config["WHISPER_LOGS"]
-            else None
+    def _create_instance() -> STTEngine:
+        with MODEL_LOAD_SECONDS.time(model=model):
+            return create_engine(
+                _engine,
+                _model_path,
+                redirect_whispercpp_logs_to=_log_file,
+                **_model_params,
+            )
+
+    # Load model - first instance now, the rest on demand
+    _pool = ModelPool(
+        model,
+        _create_instance,
+        size=_pool_size,
+        timeout=app.config.get("MODEL_POOL_TIMEOUT", 30.0),
+        memory_per_instance=ModelCache.estimate_model_memory(
+            _model_path, app.config.get("MODEL_MEMORY_OVERHEAD", 1.25)
         ),
     )
+    try:
+        # reserve room in the cache first, this may evict other models
+        if app.config["LOADED_MODELS"].put(model, _pool) is not _pool:
+            # loaded by someone else meanwhile
+            _pool.close()
+            return False
+        _pool.checkin(_pool.checkout())
+    except Exception as e:
+        app.logger.error("Failed to load model %s: %s", model, e)
+        if not app.config["LOADED_MODELS"].remove(model, _pool):
+            _pool.close()
+        return False
+
+    app.logger.debug("Loading model: %s (pool size %d)", model, _pool_size)
+    return True
+
+
+def warmup_model(model: str) -> float:
+    """Run a short inference on silence so the first real request is fast."""
+    _start = time.perf_counter()
+    _samples = int(16000 * app.config.get("MODEL_WARMUP_SECONDS", 1.0))
+    with get_model_pool(model).instance() as _instance:
+        _instance.transcribe(np.zeros(_samples, dtype=np.float32))
+    return time.perf_counter() - _start
+
+
+def _preload_model_task(flask_app, model: str):
+    """Load + warm up a model on the loader thread, recording its state."""
+    with flask_app.app_context():
+        _state = app.config["MODEL_LOAD_STATES"][model]
+        try:
+            _start = time.perf_counter()
+            if not load_model(model) and not is_model_loaded(model):
+                raise RuntimeError("Model failed to load")
+            _state["load_seconds"] = time.perf_counter() - _start
+            _state["warmup_seconds"] = warmup_model(model)
+            _state["state"] = MODEL_STATE_READY
+        except Exception as e:
+            app.logger.error("Failed to preload model %s: %s", model, e)
+            _state["state"] = MODEL_STATE_FAILED
+            _state["error"] = str(e)
+        finally:
+            _state["finished_at"] = time.time()
+
+
+def preload_model(model: str) -> Future:
+    """
+    Load + warm up a model in the background.
+
+    Returns the load job; if the model is already loading, that job is
+    returned instead of starting another one.
+    """
+    _jobs: Dict[str, Future] = app.config.setdefault("MODEL_LOAD_JOBS", {})
+    _states = app.config.setdefault("MODEL_LOAD_STATES", {})
+    if model in _jobs and not _jobs[model].done():
+        return _jobs[model]
+
+    _states[model] = {
+        "state": MODEL_STATE_LOADING,
+        "started_at": time.time(),
+        "finished_at": None,
+        "load_seconds": None,
+        "warmup_seconds": None,
+        "error": None,
+    }
+    _jobs[model] = _model_loader.submit(
+        _preload_model_task, app._get_current_object(), model
+    )
+    return _jobs[model]
 
-    # Placeholder for loading logic
-    app.config["LOADED_MODELS"][model] = _model
-    app.logger.debug("Loading model: %s", model)
+
+def get_model_load_state(model: str) -> Optional[Dict[str, Any]]:
+    """Get the background load state of a model (None if never preloaded)."""
+    _state = app.config.get("MODEL_LOAD_STATES", {}).get(model)
+    return dict(_state) if _state else None
+
+
+def wait_for_model_load(model: str, timeout: float = None) -> bool:
+    """
+    Block until a background load of the model (if any) is finished.
+    Returns False if it is still loading after `timeout` seconds.
+    """
+    _job = app.config.get("MODEL_LOAD_JOBS", {}).get(model)
+    if _job is None or _job.done():
+        return True
+    try:
+        _job.result(timeout=timeout)
+    except TimeoutError:
+        return False
     return True
 
 
+def get_model_pool(model: str) -> ModelPool:
+    """
+    The pool of a model, loading it again if it was evicted. Raises
+    ModelPoolClosed (a 503) if it can't be loaded.
+    """
+    _pool = app.config["LOADED_MODELS"].get(model)
+    if _pool is None:
+        load_model(model)
+        _pool = app.config["LOADED_MODELS"].get(model)
+    if _pool is None:
+        tracing.log_event("model_not_loaded", logging.WARNING, model=model)
+        raise ModelPoolClosed(f"Model {model} is not loaded")
+    return _pool
+
+
+def get_engine_resources(pool: ModelPool) -> List[Dict[str, Any]]:
+    """What every instance of a loaded model holds + how much it was used."""
+    return [instance.resources() for instance in pool.get_instances()]
+
+
 def get_model_path(model: str) -> str:
     """Get the model from the path."""
     if not is_model_valid(model):
@@ -65,25 +268,450 @@ def get_model_path(model: str) -> str:
     return app.config["MODEL_PATH_MAP"][model]
 
 
-def compute_file_transcription(model: str, file_name: str) -> List[any]:
-    print(model, file_name)
-    print(app.config["MODEL_PATH_MAP"])
-    print(app.config["LOADED_MODELS"])
+def get_shared_model(model: str) -> Optional[Any]:
+    """
+    Model-like object for long-lived users (live transcription). Calls go to
+    the worker processes or to a pooled instance, never hold one.
+    """
     if not is_model_valid(model):
-        print("Model not valid")
-        return []
-    if not is_model_loaded(model):
-        print("Model not loaded")
+        return None
+    if uses_worker_pool():
+        return WorkerModel(
+            app.config["WORKER_POOL"], model, app.config.get("WORKER_JOB_TIMEOUT")
+        )
+
+    wait_for_model_load(model, timeout=app.config.get("MODEL_POOL_TIMEOUT", 30.0))
+    try:
+        _pool = get_model_pool(model)
+    except ModelPoolClosed:
+        return None
+    return PooledModel(_pool, app.config.get("MODEL_POOL_TIMEOUT"))
+
+
+def get_model_file_identity(model: str) -> Optional[List[int]]:
+    """[size, mtime ns] of a model's file, None if it has none (fake engine)."""
+    _path = app.config["MODEL_PATH_MAP"].get(model)
+    if not _path or not os.path.exists(_path):
+        return None
+    _stat = os.stat(_path)
+    return [_stat.st_size, _stat.st_mtime_ns]
+
+
+def get_result_cache_params(model: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Everything besides the audio that changes a transcription: the engine
+    and its parameters, the model file, VAD + long audio splitting and the
+    decode parameters.
+    """
+    return {
+        "engine": app.config.get("STT_ENGINE", ENGINE_WHISPERCPP),
+        "engine_params": dict(
+            sorted((app.config.get("STT_ENGINE_PARAMS") or {}).items())
+        ),
+        "model_file": get_model_file_identity(model),
+        "vad": get_vad_params(),
+        "long_audio": [
+            app.config.get("LONG_AUDIO_SECONDS", 0),
+            app.config.get("LONG_AUDIO_PIECE_SECONDS", 120.0),
+            app.config.get("LONG_AUDIO_OVERLAP_SECONDS", 2.0),
+        ],
+        **kwargs,
+    }
+
+
+def get_result_cache_key(
+    model: str, media: Union[str, np.ndarray], kwargs: Dict[str, Any]
+) -> str:
+    """
+    Result cache key of the audio content + model + everything else that
+    changes the result (see get_result_cache_params). A 16khz wav hashes the
+    same as its samples streamed from memory. A file's hash is kept by the
+    cache until the file changes.
+    """
+
+    def _hash_media(file_name: str) -> str:
+        try:
+            _audio, _sample_rate = read_wav_samples(file_name)
+            if _sample_rate == WHISPER_SAMPLE_RATE:
+                return hash_audio(_audio)
+        except (EOFError, ValueError, wave.Error):
+            pass
+        return hash_file(file_name)
+
+    if isinstance(media, str):
+        _hash = app.config["RESULT_CACHE"].get_file_hash(media, _hash_media)
+    else:
+        _hash = hash_audio(media)
+    return make_cache_key(_hash, model, get_result_cache_params(model, kwargs))
+
+
+def get_result_cache_stats() -> Optional[Dict[str, Any]]:
+    """Result cache statistics, None if the cache is disabled."""
+    _cache = app.config.get("RESULT_CACHE")
+    return _cache.stats() if _cache is not None else None
+
+
+def run_transcription(
+    model: str,
+    media: Union[str, np.ndarray],
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    audio_seconds: Optional[float] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Transcribe a file path or 16khz float32 array with a valid model, or
+    get the result of the same audio + parameters from the result cache.
+    `audio_seconds` is the length of a file if the caller knows it already.
+    """
+    with tracing.start_span(
+        "transcription",
+        model=model,
+        **(
+            {"file": media}
+            if isinstance(media, str)
+            else {"audio_seconds": len(media) / WHISPER_SAMPLE_RATE}
+        ),
+    ) as _span:
+        _cache = app.config.get("RESULT_CACHE")
+        if _cache is None:
+            segments = _run_transcription(
+                model, media, progress_callback, audio_seconds, **kwargs
+            )
+            _span.set(segments=len(segments))
+            return segments
+
+        _key = get_result_cache_key(model, media, kwargs)
+        segments = _cache.get(_key)
+        if segments is not None:
+            if progress_callback is not None:
+                progress_callback(1, 1)
+            _span.set(cached=True, segments=len(segments))
+            return segments
+
+        segments = _run_transcription(
+            model, media, progress_callback, audio_seconds, **kwargs
+        )
+        _cache.put(_key, segments)
+        _span.set(cached=False, segments=len(segments))
+        return segments
+
+
+def load_long_audio(
+    media: Union[str, np.ndarray], audio_seconds: Optional[float] = None
+) -> Optional[np.ndarray]:
+    """
+    16khz audio of the media if it is long enough to be split, else None. A
+    file's length is `audio_seconds` if known, else read from its header
+    (ffprobe only for files that aren't wav).
+    """
+    _min_seconds = app.config.get("LONG_AUDIO_SECONDS", 0)
+    if not _min_seconds:
+        return None
+    if not isinstance(media, str):
+        return media if len(media) >= _min_seconds * WHISPER_SAMPLE_RATE else None
+
+    _seconds = audio_seconds if audio_seconds is not None else probe_duration(media)
+    if _seconds is None or _seconds < _min_seconds:
+        return None
+    if media.endswith(".wav"):
+        try:
+            _audio, _sample_rate = read_wav_samples(media)
+            if _sample_rate == WHISPER_SAMPLE_RATE:
+                return _audio
+        except (EOFError, ValueError, wave.Error):
+            pass
+    return decode_audio_file(media, WHISPER_SAMPLE_RATE)
+
+
+def run_long_transcription(
+    model: str,
+    audio_data: np.ndarray,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Split long audio at silences and transcribe the pieces in parallel, one
+    per worker / pooled instance.
+    """
+    _vad_params = get_vad_params()
+    if uses_worker_pool():
+        _workers = app.config["WORKER_POOL"]
+        _timeout = app.config.get("WORKER_JOB_TIMEOUT")
+
+        def _transcribe_piece(piece: np.ndarray) -> List[list]:
+            _job = _workers.submit(model, piece, _vad_params, **kwargs)
+            return _job.result(timeout=_timeout)
+
+    else:
+        _pool = get_model_pool(model)
+
+        def _transcribe_piece(piece: np.ndarray) -> List[list]:
+            with _pool.instance() as _instance:
+                return transcribe_audio(_instance, piece, _vad_params, **kwargs)
+
+    return transcribe_long_audio(
+        _transcribe_piece,
+        audio_data,
+        get_model_concurrency(),
+        progress_callback,
+        piece_seconds=app.config.get("LONG_AUDIO_PIECE_SECONDS", 120.0),
+        overlap_seconds=app.config.get("LONG_AUDIO_OVERLAP_SECONDS", 2.0),
+        vad_params=_vad_params,
+    )
+
+
+def _run_transcription(
+    model: str,
+    media: Union[str, np.ndarray],
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    audio_seconds: Optional[float] = None,
+    **kwargs,
+) -> List[list]:
+    # long audio is split up + transcribed in parallel
+    _long_audio = load_long_audio(media, audio_seconds)
+    if _long_audio is not None:
+        with INFERENCE_SECONDS.time(model=model, path="long"):
+            return run_long_transcription(
+                model, _long_audio, progress_callback, **kwargs
+            )
+
+    # hand off to the worker processes, this thread only waits on the job
+    if uses_worker_pool():
+        with INFERENCE_SECONDS.time(model=model, path="worker"):
+            _job = app.config["WORKER_POOL"].submit(
+                model, media, get_vad_params(), progress_callback, **kwargs
+            )
+            return _job.result(timeout=app.config.get("WORKER_JOB_TIMEOUT"))
+
+    # perform transcription on an instance nobody else is using
+    _transcribe = transcribe_file if isinstance(media, str) else transcribe_audio
+    with get_model_pool(model).instance() as _instance:
+        with INFERENCE_SECONDS.time(model=model, path="local"):
+            segments = _transcribe(
+                _instance, media, get_vad_params(), progress_callback, **kwargs
+            )
+    # return results
+    return segments
+
+
+def compute_file_transcription(
+    model: str,
+    file_name: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    audio_seconds: Optional[float] = None,
+    **kwargs,
+) -> List[any]:
+    if not is_model_valid(model):
+        tracing.log_event("model_not_valid", logging.WARNING, model=model)
         return []
     if not os.path.exists(file_name):
-        print("File not found")
+        tracing.log_event("file_not_found", logging.WARNING, file=file_name)
+        return []
+    return run_transcription(
+        model, file_name, progress_callback, audio_seconds, **kwargs
+    )
+
+
+def compute_audio_transcription(
+    model: str,
+    audio_data: np.ndarray,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """Transcribe 16khz float32 audio without going through a file."""
+    if not is_model_valid(model):
+        tracing.log_event("model_not_valid", logging.WARNING, model=model)
         return []
+    if len(audio_data) == 0:
+        tracing.log_event("no_audio", logging.WARNING, model=model)
+        return []
+    return run_transcription(model, audio_data, progress_callback, **kwargs)
 
-    # perform transcription
-    segments = app.config["LOADED_MODELS"][model].transcribe(file_name)
-    # return results
-    print(segments)
-    return [[segment.t0, segment.t1, segment.text] for segment in segments]
+
+def get_session_audio(streaming_id: str) -> Optional[np.ndarray]:
+    """Decoded audio of a finished streaming session, if it's still in memory."""
+    _session = AudioBuffersInstance.get_instance().get(streaming_id)
+    _recorder = _session.get(CACHE_RECORDER) if _session else None
+    if _recorder is None or not _recorder.is_finished() or not _recorder.is_ok():
+        return None
+    _audio = _recorder.get_audio()
+    # dropped on disconnect (maybe while reading), the wav archive has it
+    if _recorder.get_pcm_buffer().is_released():
+        return None
+    return _audio
+
+
+def get_recorded_seconds(streaming_id: str) -> Optional[float]:
+    """Seconds decoded by a session's finished recorder, None if unknown."""
+    _session = AudioBuffersInstance.get_instance().get(streaming_id)
+    _recorder = _session.get(CACHE_RECORDER) if _session else None
+    if _recorder is None or not _recorder.is_finished() or not _recorder.is_ok():
+        return None
+    return _recorder.get_samples_written() / WHISPER_SAMPLE_RATE
+
+
+def get_session_span(streaming_id: str) -> Optional[tracing.Span]:
+    """Root span of a streaming session's trace, None if the session is gone."""
+    _session = AudioBuffersInstance.get_instance().get(streaming_id)
+    return _session.get(CACHE_TRACE) if _session else None
+
+
+def pin_session(streaming_id: str):
+    """Context manager keeping the session's audio from being reaped."""
+    _reaper = app.config.get("SESSION_REAPER")
+    return _reaper.pinned(streaming_id) if _reaper is not None else nullcontext()
+
+
+def compute_stream_transcription(
+    model: str,
+    streaming_id: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Transcribe a streaming session: straight from its decoded audio while
+    the session is in memory, from `<streaming_id>.wav` otherwise.
+    """
+    _span = tracing.start_span(
+        "stream_transcription",
+        get_session_span(streaming_id),
+        streaming_id=streaming_id,
+    )
+    with pin_session(streaming_id), _span:
+        _audio = get_session_audio(streaming_id)
+        if _audio is not None:
+            return compute_audio_transcription(
+                model, _audio, progress_callback, **kwargs
+            )
+
+        _file_path = os.path.join(
+            app.config["AUDIO_CACHE_DIR"], f"{streaming_id}.wav"
+        )
+        return compute_file_transcription(
+            model,
+            _file_path,
+            progress_callback,
+            get_recorded_seconds(streaming_id),
+            **kwargs,
+        )
+
+
+# --------------------------------------------------------------------------- #
+# async transcription jobs
+# --------------------------------------------------------------------------- #
+
+
+def emit_job_update(job: TranscriptionJob):
+    """Push a job update to the streaming session that owns it."""
+    if job.is_finished():
+        _event, _payload = "transcription_done", job.to_dict()
+    else:
+        _event, _payload = "transcription_progress", job.to_dict(False)
+    with EMIT_SECONDS.time(event=_event):
+        SocketIOInstance.get_instance().emit(
+            _event, _payload, namespace="/streaming", to=job.streaming_id
+        )
+
+
+def submit_transcription_job(model: str, sid: str) -> TranscriptionJob:
+    """Transcribe in the background, results are pushed over /streaming."""
+    _app = app._get_current_object()
+    # hold the audio from now on, not just once the job starts
+    _pin = pin_session(sid)
+    _pin.__enter__()
+
+    def _run(progress: Callable[[int, int], None]) -> List[list]:
+        try:
+            with _app.app_context():
+                return compute_stream_transcription(model, sid, progress)
+        finally:
+            _pin.__exit__(None, None, None)
+
+    return app.config["TRANSCRIPTION_JOBS"].submit(sid, model, _run, emit_job_update)
+
+
+# --------------------------------------------------------------------------- #
+# batch transcription
+# --------------------------------------------------------------------------- #
+
+
+def get_recording_seconds(streaming_id: str) -> Optional[float]:
+    """Length of a recording (in memory or `<streaming_id>.wav`), None if gone."""
+    _seconds = get_recorded_seconds(streaming_id)
+    if _seconds is not None:
+        return _seconds
+    return probe_duration(
+        os.path.join(app.config["AUDIO_CACHE_DIR"], f"{streaming_id}.wav")
+    )
+
+
+def get_batch_file_path(path: str) -> str:
+    """
+    `path` resolved (relative to the first of BATCH_FILE_DIRS), raises
+    ValueError unless it is inside one of BATCH_FILE_DIRS (default: the
+    audio cache).
+    """
+    _dirs = app.config.get("BATCH_FILE_DIRS") or [app.config["AUDIO_CACHE_DIR"]]
+    _path = os.path.realpath(os.path.join(_dirs[0], path))
+    for _dir in _dirs:
+        _dir = os.path.realpath(_dir)
+        if os.path.commonpath([_path, _dir]) == _dir:
+            return _path
+    raise ValueError(f"File not allowed: {path}")
+
+
+def parse_batch_items(data: Dict[str, Any]) -> List[BatchItem]:
+    """
+    Batch items of a request: `files` (paths) and `recordings` (streaming
+    ids), each entry a string or `{"path" / "id": ..., "deadline": seconds}`.
+    Their length is probed later, by the batch.
+    """
+    _entries = [(BATCH_ITEM_FILE, "path", e) for e in data.get("files") or []]
+    _entries += [
+        (BATCH_ITEM_RECORDING, "id", e) for e in data.get("recordings") or []
+    ]
+
+    items = []
+    for kind, field, entry in _entries:
+        _deadline = None
+        if isinstance(entry, dict):
+            _deadline = entry.get("deadline")
+            entry = entry.get(field)
+        if not isinstance(entry, str) or not entry:
+            raise ValueError(f"Invalid {kind} entry")
+        if _deadline is not None:
+            _deadline = float(_deadline)
+        if kind == BATCH_ITEM_FILE:
+            entry = get_batch_file_path(entry)
+        items.append(BatchItem(len(items), kind, entry, deadline=_deadline))
+    return items
+
+
+def create_transcription_batch(
+    model: str, items: List[BatchItem], order: str, **kwargs
+) -> TranscriptionBatch:
+    """Batch transcribing every item with `model` (not started yet)."""
+    _app = app._get_current_object()
+
+    def _probe(item: BatchItem) -> Optional[float]:
+        if item.kind == BATCH_ITEM_FILE:
+            return probe_duration(item.source)
+        with _app.app_context():
+            return get_recording_seconds(item.source)
+
+    def _run(item: BatchItem) -> List[list]:
+        if item.audio_seconds is None:
+            raise FileNotFoundError(f"{item.kind.capitalize()} not found")
+        with _app.app_context():
+            if item.kind == BATCH_ITEM_RECORDING:
+                return compute_stream_transcription(model, item.source, **kwargs)
+            return compute_file_transcription(
+                model, item.source, audio_seconds=item.audio_seconds, **kwargs
+            )
+
+    return TranscriptionBatch(
+        items, _run, order, get_model_concurrency(), probe=_probe
+    )
 
 
 # --------------------------------------------------------------------------- #
@@ -98,11 +726,58 @@ def status():
     if not _model:
         return jsonify({"error": "No model specified"}), 400
 
+    # the worker processes own the models
+    if uses_worker_pool():
+        if not is_model_valid(_model):
+            return jsonify({"error": "Model not valid", "model": _model}), 400
+        return (
+            jsonify(
+                {
+                    "status": "STT service is running",
+                    "model": _model,
+                    "workers": app.config["WORKER_POOL"].stats(),
+                    "results": get_result_cache_stats(),
+                }
+            ),
+            200,
+        )
+
+    # check if model is being loaded in the background
+    _load_state = get_model_load_state(_model)
+    if _load_state and _load_state["state"] == MODEL_STATE_LOADING:
+        return (
+            jsonify(
+                {"status": "STT model loading", "model": _model, "load": _load_state}
+            ),
+            202,
+        )
+    if _load_state and _load_state["state"] == MODEL_STATE_FAILED:
+        return (
+            jsonify(
+                {"error": "Model failed to load", "model": _model, "load": _load_state}
+            ),
+            500,
+        )
+
     # check if model is loaded
-    if not is_model_loaded(_model):
+    _pool = app.config["LOADED_MODELS"].get(_model)
+    if _pool is None:
         return jsonify({"error": "Model not loaded", "model": _model}), 400
 
-    return jsonify({"status": "STT service is running", "model": _model}), 200
+    return (
+        jsonify(
+            {
+                "status": "STT service is running",
+                "model": _model,
+                "pool": _pool.stats(),
+                "engines": get_engine_resources(_pool),
+                "cache": app.config["LOADED_MODELS"].stats(),
+                "load": _load_state,
+                "results": get_result_cache_stats(),
+            }
+        ),
+        200,
+    )
 
 
 @stt_bp.route("/init", methods=["POST"])
@@ -124,26 +799,63 @@ def stt_initialize():
     # Placeholder for any initialization logic
     app.logger.debug("Initializing STT service with model: %s", _model)
 
-    # check if model already loaded
+    # the worker processes load (and warm up) their own models
+    if uses_worker_pool():
+        return (
+            jsonify(
+                {
+                    "message": "STT service initialized",
+                    "model": _model,
+                    "workers": app.config["WORKER_POOL"].stats(),
+                }
+            ),
+            200,
+        )
+
+    # check if model already loaded (or loading)
+    _load_state = get_model_load_state(_model)
+    if _load_state and _load_state["state"] == MODEL_STATE_LOADING:
+        return (
+            jsonify(
+                {
+                    "message": "STT service initializing",
+                    "model": _model,
+                    "load": _load_state,
+                }
+            ),
+            202,
+        )
     if is_model_loaded(_model):
         return (
             jsonify(
                 {
                     "error": "Model already loaded",
                     "model": _model,
-                    "loaded_models": app.config["LOADED_MODELS"],
+                    "loaded_models": list(app.config["LOADED_MODELS"].keys()),
                 }
             ),
             400,
         )
 
-    return jsonify({"message": "STT service initialized", "model": _model}), 200
+    # load + warm up in the background, poll /stt/status for the state
+    preload_model(_model)
+
+    return (
+        jsonify(
+            {
+                "message": "STT service initializing",
+                "model": _model,
+                "load": get_model_load_state(_model),
+            }
+        ),
+        202,
+    )
 
 
 @stt_bp.route("/clean", methods=["POST"])
 def stt_clean():
     """Clean up STT services."""
-    _models: List[str] = request.args.get("model")
+    _models: List[str] = request.args.getlist("model")
     _all_models: bool = request.args.get("all")
 
     app.logger.debug(f"Cleaning variables: {_models}, all: {_all_models}")
@@ -162,10 +874,9 @@ def stt_clean():
 
     # clean models
     for model in _targets:
-        # Placeholder for cleanup logic
-        app.logger.debug("FAKE - Cleaning up model: %s", model)
-        # Remove the model from loaded models
-        app.config["LOADED_MODELS"].pop(model, None)
+        # Remove the model from loaded models + free the native model
+        app.logger.debug("Cleaning up model: %s", model)
+        app.config["LOADED_MODELS"].remove(model)
 
     # return results
     return jsonify(
@@ -183,23 +894,30 @@ def stt_transcribe_stream():
     _model = request.json.get("model")
     _sid = request.json.get("streaming_id")
     _auto_load_model = request.json.get("audo_load_model", False)
+    _async = request.json.get("async", False)
 
-    # Get the audio file from the request
-    print(_model, _sid)
+    tracing.log_event(
+        "transcribe_stream_request",
+        logging.DEBUG,
+        get_session_span(_sid) if _sid else None,
+        model=_model,
+        streaming_id=_sid,
+        asynchronous=_async,
+    )
 
     if not _sid:
         return jsonify({"error": "No audio file provided"}), 400
 
+    # a background load may be in progress
+    wait_for_model_load(_model, timeout=app.config.get("MODEL_POOL_TIMEOUT", 30.0))
+
     # check if we need to load the model
-    if _auto_load_model:
+    if _auto_load_model and not uses_worker_pool():
         # check if model is loaded
         if not is_model_loaded(_model):
             # load the model
             load_model(_model)
 
-    # Placeholder response
-    _file_path = os.path.join(app.config["AUDIO_CACHE_DIR"], f"{_sid}.wav")
-
     # check if request model is open
     if not is_model_valid(_model):
         return (
@@ -213,7 +931,7 @@ def stt_transcribe_stream():
         )
 
     # check if model is loaded
-    if not is_model_loaded(_model):
+    if not uses_worker_pool() and not is_model_loaded(_model):
         # load model
         if not load_model(_model):
             return (
@@ -221,20 +939,120 @@ def stt_transcribe_stream():
                     {
                         "error": "Model failed to load",
                         "model": _model,
-                        "loaded_models": app.config["LOADED_MODELS"],
+                        "loaded_models": list(app.config["LOADED_MODELS"].keys()),
                     }
                 ),
                 500,
             )
-        print("Loaded Model")
-    print("Loaded models: ", app.config["LOADED_MODELS"])
-    segments = compute_file_transcription(_model, _file_path)
+        tracing.log_event("model_loaded", logging.INFO, model=_model)
+    if tracing.enabled(logging.DEBUG):
+        tracing.log_event(
+            "loaded_models", logging.DEBUG, models=app.config["LOADED_MODELS"].keys()
+        )
 
-    print("Segments:", segments)
+    # return right away, the result is pushed to the session (or polled)
+    if _async:
+        _job = submit_transcription_job(_model, _sid)
+        return (
+            jsonify(
+                {
+                    "job_id": _job.job_id,
+                    "state": _job.state,
+                    "status_url": f"{request.script_root}/stt/jobs/{_job.job_id}",
+                }
+            ),
+            202,
+        )
+
+    try:
+        segments = compute_stream_transcription(_model, _sid)
+    except (ModelPoolError, WorkerPoolBusy) as e:
+        return jsonify({"error": str(e), "model": _model}), 503
+    except (WorkerCrashed, WorkerJobError) as e:
+        return jsonify({"error": str(e), "model": _model}), 500
 
     return jsonify({"segments": segments})
 
 
+@stt_bp.route("/transcribe_batch", methods=["POST"])
+def stt_transcribe_batch():
+    """Transcribe many files / recordings, results are streamed as they finish."""
+    _data = request.get_json(silent=True) or {}
+    _model = _data.get("model")
+    _order = _data.get("order", BATCH_ORDER_SHORTEST)
+    _language = _data.get("language")
+
+    if not is_model_valid(_model):
+        return (
+            jsonify(
+                {
+                    "error": "Model not valid",
+                    "supported_models": app.config["SUPPORTED_MODELS"],
+                }
+            ),
+            400,
+        )
+    if _order not in BATCH_ORDERS:
+        return jsonify({"error": "Order not valid", "orders": list(BATCH_ORDERS)}), 400
+    try:
+        _items = parse_batch_items(_data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not _items:
+        return jsonify({"error": "No files or recordings provided"}), 400
+    if len(_items) > app.config.get("BATCH_MAX_ITEMS", 256):
+        return (
+            jsonify(
+                {"error": "Too many items", "max_items": app.config["BATCH_MAX_ITEMS"]}
+            ),
+            400,
+        )
+
+    # a background load may be in progress
+    wait_for_model_load(_model, timeout=app.config.get("MODEL_POOL_TIMEOUT", 30.0))
+    if not uses_worker_pool() and not is_model_loaded(_model):
+        if not load_model(_model):
+            return (
+                jsonify(
+                    {
+                        "error": "Model failed to load",
+                        "model": _model,
+                        "loaded_models": list(app.config["LOADED_MODELS"].keys()),
+                    }
+                ),
+                500,
+            )
+
+    _kwargs = {"language": _language} if _language else {}
+    _batch = create_transcription_batch(_model, _items, _order, **_kwargs)
+    _batch.start()
+
+    # one json object per line: every item as it finishes, then the totals
+    def _generate():
+        try:
+            for item in _batch.results():
+                _result = {"type": "result", **item.to_dict(_batch.submitted_at)}
+                yield json.dumps(_result) + "\n"
+            yield json.dumps({"type": "summary", "model": _model, **_batch.stats()})
+            yield "\n"
+        finally:
+            # the client went away, don't transcribe the rest for nobody
+            _batch.cancel()
+
+    return Response(
+        stream_with_context(_generate()), mimetype="application/x-ndjson"
+    )
+
+
+@stt_bp.route("/jobs/<job_id>", methods=["GET"])
+def stt_job_status(job_id: str):
+    """Poll an async transcription job."""
+    _job = app.config["TRANSCRIPTION_JOBS"].get(job_id)
+    if _job is None:
+        return jsonify({"error": "Job not found", "job_id": job_id}), 404
+    return jsonify(_job.to_dict()), 200
+
+
 @stt_bp.route("/debug_transcribe_file", methods=["POST"])
 def stt_debug_transcribe_file():
     """Debug transcribe file route."""
@@ -248,7 +1066,7 @@ def stt_debug_transcribe_file():
 
     # check if model is loaded
     # don't load if not already loaded
-    if not is_model_loaded(_model):
+    if not uses_worker_pool() and not is_model_loaded(_model):
         # load model
         if not load_model(_model):
             return (
@@ -256,7 +1074,7 @@ def stt_debug_transcribe_file():
                     {
                         "error": "Model failed to load",
                         "model": _model,
-                        "loaded_models": app.config["LOADED_MODELS"],
+                        "loaded_models": list(app.config["LOADED_MODELS"].keys()),
                     }
                 ),
                 500,
@@ -272,21 +1090,18 @@ def stt_debug_transcribe_file():
             ),
             400,
         )
-    print("Loaded Models: ", app.config["LOADED_MODELS"])
+    if tracing.enabled(logging.DEBUG):
+        tracing.log_event(
+            "loaded_models", logging.DEBUG, models=app.config["LOADED_MODELS"].keys()
+        )
 
     # perform transcription
-    segments = app.config["LOADED_MODELS"][_model].transcribe(
-        _audio_file, language=_language
-    )
+    try:
+        segments = compute_file_transcription(_model, _audio_file, language=_language)
+    except (ModelPoolError, WorkerPoolBusy) as e:
+        return jsonify({"error": str(e), "model": _model}), 503
+    except (WorkerCrashed, WorkerJobError) as e:
+        return jsonify({"error": str(e), "model": _model}), 500
 
     # return results
-    return (
-        jsonify(
-            {
-                "transcription": [
-                    [segment.t0, segment.t1, segment.text] for segment in segments
-                ]
-            }
-        ),
-        200,
-    )
+    return jsonify({"transcription": segments}), 200
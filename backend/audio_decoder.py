@@ -0,0 +1,339 @@
+import logging
+import os
+import threading
+import wave
+
+import ffmpeg
+import numpy as np
+import pyaudio
+
+from verify import AudioConfig, AudioStorage
+from metrics import FFMPEG_SECONDS
+from session_buffer import BufferFull, SpillBuffer
+import tracing
+
+from typing import Callable, Optional
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+# bytes per s16le sample
+PCM_SAMPLE_WIDTH = 2
+
+# how much decoded audio is read from ffmpeg at once
+READ_BLOCK_SIZE = 16384
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def pcm_to_float32(data: bytes) -> np.ndarray:
+    """Convert s16le PCM to float32 samples in [-1, 1)."""
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def probe_duration(file_name: str) -> Optional[float]:
+    """Length of an audio file in seconds, None if it can't be read."""
+    if not os.path.exists(file_name):
+        return None
+    if file_name.endswith(".wav"):
+        try:
+            with wave.open(file_name, "rb") as wf:
+                return wf.getnframes() / wf.getframerate()
+        except (EOFError, wave.Error):
+            pass
+    try:
+        with FFMPEG_SECONDS.time(operation="probe"):
+            return float(ffmpeg.probe(file_name)["format"]["duration"])
+    except (ffmpeg.Error, KeyError, ValueError):
+        return None
+
+
+def decode_audio_file(file_name: str, sample_rate: int = 16000) -> np.ndarray:
+    """Decode any file ffmpeg can read to mono float32 samples."""
+    with FFMPEG_SECONDS.time(operation="decode"):
+        _pcm, _ = (
+            ffmpeg.input(file_name)
+            .output("pipe:1", format="s16le", acodec="pcm_s16le", ac=1, ar=sample_rate)
+            .global_args("-loglevel", "error")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    return pcm_to_float32(_pcm)
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class StreamDecoder:
+    """
+    Long-lived ffmpeg process decoding a compressed stream (the browser's
+    webm/opus chunks) to mono s16le PCM.
+
+    Chunks are written to ffmpeg's stdin as they arrive, a reader thread
+    reads stdout and calls `on_pcm(bytes)` with each block of decoded audio
+    (always whole samples). Probing is kept to a minimum so audio comes out
+    while the stream is still being written.
+    """
+
+    def __init__(
+        self,
+        on_pcm: Callable[[bytes], None],
+        sample_rate: int = 16000,
+        input_format: Optional[str] = None,
+    ):
+        self._on_pcm = on_pcm
+        self._sample_rate = sample_rate
+
+        _input_args = {"probesize": 4096, "analyzeduration": 0, "fflags": "nobuffer"}
+        if input_format:
+            _input_args["f"] = input_format
+        self._process = (
+            ffmpeg.input("pipe:0", **_input_args)
+            .output("pipe:1", format="s16le", acodec="pcm_s16le", ac=1, ar=sample_rate)
+            .global_args("-hide_banner", "-loglevel", "error")
+            .run_async(pipe_stdin=True, pipe_stdout=True)
+        )
+
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+
+        # stats
+        self._bytes_in = 0
+        self._samples_out = 0
+
+        self._reader = threading.Thread(
+            target=self._read, name="stream_decoder_reader", daemon=True
+        )
+        self._reader.start()
+
+    def _read(self):
+        """Reader thread: hand ffmpeg's stdout over in whole samples."""
+        _fd = self._process.stdout.fileno()
+        _remainder = b""
+        try:
+            while True:
+                _data = os.read(_fd, READ_BLOCK_SIZE)
+                if not _data:
+                    break
+
+                # a read can end in the middle of a sample
+                _data = _remainder + _data
+                _usable = len(_data) - len(_data) % PCM_SAMPLE_WIDTH
+                _remainder = _data[_usable:]
+                if not _usable:
+                    continue
+
+                self._samples_out += _usable // PCM_SAMPLE_WIDTH
+                self._on_pcm(_data[:_usable])
+        except Exception as e:
+            tracing.log_event("stream_decoder_error", logging.ERROR, error=str(e))
+            self._error = e
+
+    def write(self, data: bytes) -> bool:
+        """Feed a chunk of the compressed stream. False if ffmpeg is gone."""
+        with self._write_lock:
+            if self._closed:
+                return False
+            try:
+                self._process.stdin.write(data)
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                tracing.log_event(
+                    "stream_decoder_write_failed", logging.ERROR, error=str(e)
+                )
+                self._error = e
+                return False
+            self._bytes_in += len(data)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        End the stream and wait until every decoded sample was delivered.
+        True if ffmpeg exited cleanly.
+        """
+        with self._write_lock:
+            if not self._closed:
+                self._closed = True
+                try:
+                    self._process.stdin.close()
+                except OSError:
+                    pass
+
+        self._reader.join(timeout)
+        try:
+            _code = self._process.wait(timeout)
+        except Exception:
+            self._process.kill()
+            return False
+        return _code == 0 and self._error is None
+
+    def kill(self):
+        """Stop right away, dropping whatever is still being decoded."""
+        with self._write_lock:
+            self._closed = True
+        self._process.kill()
+        self._reader.join(1.0)
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def get_sample_rate(self) -> int:
+        return self._sample_rate
+
+    def get_bytes_in(self) -> int:
+        return self._bytes_in
+
+    def get_samples_out(self) -> int:
+        return self._samples_out
+
+
+class StreamRecorder:
+    """
+    Recording of one streaming session.
+
+    The chunks go through a StreamDecoder and the decoded s16le PCM is kept
+    in `pcm_buffer` (a SpillBuffer, so a long recording ends up on disk
+    rather than in memory) to be handed straight to the model. With
+    `archive_path`, the PCM is also written into a wav file as it comes out
+    (on the decoder thread), so the file is complete as soon as the stream
+    ends. Audio past the buffer's `max_bytes` is dropped.
+    """
+
+    def __init__(
+        self,
+        pcm_buffer: SpillBuffer,
+        archive_path: Optional[str] = None,
+        sample_rate: int = 16000,
+        input_format: Optional[str] = None,
+    ):
+        self._pcm = pcm_buffer
+        self._archive_path = archive_path
+        self._sample_rate = sample_rate
+        self._truncated = False
+
+        # float32 copy for live transcription, only made when asked for
+        self._storage: Optional[AudioStorage] = None
+
+        self._wav = None
+        if archive_path:
+            self._wav = wave.open(archive_path, "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(PCM_SAMPLE_WIDTH)
+            self._wav.setframerate(sample_rate)
+
+        self._lock = threading.Lock()
+        self._finished = False
+        self._ok = False
+
+        try:
+            self._decoder = StreamDecoder(self._on_pcm, sample_rate, input_format)
+        except Exception:
+            self._close_archive()
+            raise
+
+    def _on_pcm(self, data: bytes):
+        with self._lock:
+            if self._truncated:
+                return
+            try:
+                self._pcm.append(data)
+            except BufferFull as e:
+                tracing.log_event("recording_truncated", logging.WARNING, error=str(e))
+                self._truncated = True
+                return
+            if self._storage is not None:
+                self._storage.append_audio(pcm_to_float32(data))
+            if self._wav is not None:
+                # header sizes are patched when the file is closed
+                self._wav.writeframesraw(data)
+
+    def _close_archive(self):
+        with self._lock:
+            if self._wav is not None:
+                self._wav.close()
+                self._wav = None
+
+    def write(self, chunk: bytes) -> bool:
+        """Feed a chunk of the recording. False if the decoder failed."""
+        return self._decoder.write(chunk)
+
+    def finish(self, timeout: Optional[float] = None) -> bool:
+        """
+        End the recording: flush the decoder and close the archive file.
+        True if every chunk was decoded.
+        """
+        if self._finished:
+            return self._ok
+        _ok = self._decoder.close(timeout)
+        self._close_archive()
+        self._ok = _ok and self._decoder.get_samples_out() > 0
+        self._finished = True
+        return self._ok
+
+    def abort(self):
+        """Stop decoding right away, keeping only what was decoded."""
+        if self._finished:
+            return
+        self._decoder.kill()
+        self._close_archive()
+        self._finished = True
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def is_finished(self) -> bool:
+        return self._finished
+
+    def is_ok(self) -> bool:
+        """Check if the recording finished with every chunk decoded."""
+        return self._ok
+
+    def is_truncated(self) -> bool:
+        """Check if audio was dropped because the buffer was full."""
+        return self._truncated
+
+    def get_storage(self) -> AudioStorage:
+        """
+        Float32 AudioStorage of the recording (live transcription). Created
+        from the audio decoded so far on first use, then kept up to date.
+        """
+        with self._lock:
+            if self._storage is None:
+                self._storage = AudioStorage(
+                    AudioConfig(self._sample_rate, 1, pyaudio.paInt16)
+                )
+                self._storage.append_audio(pcm_to_float32(self._pcm.read()))
+            return self._storage
+
+    def get_audio(self) -> np.ndarray:
+        """Every decoded sample (float32 at `sample_rate`)."""
+        return pcm_to_float32(self._pcm.read())
+
+    def get_pcm_buffer(self) -> SpillBuffer:
+        return self._pcm
+
+    def release(self) -> int:
+        """Free the decoded audio. Returns the bytes freed."""
+        self.abort()
+        with self._lock:
+            self._storage = None
+        return self._pcm.release()
+
+    def get_archive_path(self) -> Optional[str]:
+        return self._archive_path
+
+    def get_samples_written(self) -> int:
+        return self._decoder.get_samples_out()
+
+    def get_bytes_in(self) -> int:
+        return self._decoder.get_bytes_in()
@@ -1,5 +1,7 @@
 from flask_socketio import SocketIO
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+
+from metrics import MONGO_SECONDS
 
 import os
 
@@ -12,6 +14,11 @@ CACHE_STREAMING_KEY = "streaming_key"
 CACHE_AUDIO_DATA = "audio_data"
 CACHE_FILE_PATH = "file_path"
 CACHE_FILE_URL = "file_url"
+CACHE_LIVE_TRANSCRIBER = "live_transcriber"
+CACHE_RECORDER = "recorder"
+CACHE_CONNECTED = "connected"
+CACHE_LAST_ACTIVE = "last_active"
+CACHE_TRACE = "trace"
 
 
 # ---------------------------------------------------------------------------- #
@@ -41,6 +48,22 @@ class AudioBuffersInstance:
         return AudioBuffersInstance.__INSTANCE
 
 
+# mongodb command timings (pymongo + mongoengine), register before connecting
+class MongoCommandTimer(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name, status="ok"
+        )
+
+    def failed(self, event):
+        MONGO_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name, status="error"
+        )
+
+
 # mongodb factory
 class MongoDBInstance:
     __INSTANCE = None
@@ -0,0 +1,255 @@
+import heapq
+import logging
+import math
+import queue
+import threading
+import time
+import traceback
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from jobs import JOB_STATE_DONE, JOB_STATE_FAILED, JOB_STATE_QUEUED, JOB_STATE_RUNNING
+import tracing
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+# shortest audio first: maximizes finished files per second
+BATCH_ORDER_SHORTEST = "shortest"
+# earliest deadline first (items without one last), then shortest
+BATCH_ORDER_DEADLINE = "deadline"
+BATCH_ORDERS = (BATCH_ORDER_SHORTEST, BATCH_ORDER_DEADLINE)
+
+BATCH_ITEM_FILE = "file"
+BATCH_ITEM_RECORDING = "recording"
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class BatchItem:
+    """One file / recording of a batch."""
+
+    def __init__(
+        self,
+        index: int,
+        kind: str,
+        source: str,
+        audio_seconds: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ):
+        self.index = index
+        self.kind = kind
+        self.source = source
+        # None = the audio couldn't be found
+        self.audio_seconds = audio_seconds
+        # seconds after the batch was submitted
+        self.deadline = deadline
+
+        self.state = JOB_STATE_QUEUED
+        self.segments: Optional[List[list]] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def sort_key(self, order: str) -> tuple:
+        _seconds = self.audio_seconds or 0.0
+        if order == BATCH_ORDER_DEADLINE:
+            _deadline = self.deadline if self.deadline is not None else math.inf
+            return (_deadline, _seconds, self.index)
+        return (_seconds, self.index)
+
+    def is_finished(self) -> bool:
+        return self.state in (JOB_STATE_DONE, JOB_STATE_FAILED)
+
+    def to_dict(self, submitted_at: float) -> Dict[str, Any]:
+        """JSON-serializable view of the item, times relative to `submitted_at`."""
+        _finished = (
+            self.finished_at - submitted_at if self.finished_at is not None else None
+        )
+        return {
+            "index": self.index,
+            self.kind: self.source,
+            "state": self.state,
+            "segments": self.segments,
+            "error": self.error,
+            "audio_seconds": self.audio_seconds,
+            "wall_seconds": (
+                self.finished_at - self.started_at
+                if self.finished_at is not None and self.started_at is not None
+                else None
+            ),
+            "finished_after": _finished,
+            "deadline": self.deadline,
+            "missed_deadline": (
+                self.deadline is not None
+                and _finished is not None
+                and _finished > self.deadline
+            ),
+        }
+
+
+class TranscriptionBatch:
+    """
+    Runs the items of a batch `concurrency` at a time (one per model
+    instance / worker), picking the next item by `order`.
+
+    `run(item)` returns the segments of an item. `results()` yields items as
+    they finish, so the caller can hand them out before the batch is done.
+    With `probe(item)` (audio seconds, None if not found) the runner threads
+    first measure every item in parallel, the order is known once all are.
+    """
+
+    def __init__(
+        self,
+        items: List[BatchItem],
+        run: Callable[[BatchItem], List[list]],
+        order: str = BATCH_ORDER_SHORTEST,
+        concurrency: int = 1,
+        probe: Optional[Callable[[BatchItem], Optional[float]]] = None,
+    ):
+        if order not in BATCH_ORDERS:
+            raise ValueError(f"Unknown batch order: {order}")
+        self._items = list(items)
+        self._run = run
+        self._order = order
+        self._concurrency = max(1, min(concurrency, len(self._items)))
+        self._probe = probe
+
+        self._pending: List[tuple] = []
+        self._unprobed = list(self._items) if probe is not None else []
+        self._probes_left = len(self._unprobed)
+        self._probed = threading.Event()
+        self._by_index = {item.index: item for item in self._items}
+        self._finished: "queue.Queue[BatchItem]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._threads: List[threading.Thread] = []
+        if not self._probes_left:
+            self._queue_items()
+
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """Start the runner threads."""
+        self.started_at = time.time()
+        for i in range(self._concurrency):
+            _thread = threading.Thread(
+                target=self._runner, name=f"batch_runner_{i}", daemon=True
+            )
+            _thread.start()
+            self._threads.append(_thread)
+
+    def _queue_items(self):
+        """Order the items, once every one has been probed."""
+        with self._lock:
+            if not self._cancelled:
+                self._pending = [
+                    (item.sort_key(self._order), item.index) for item in self._items
+                ]
+                heapq.heapify(self._pending)
+        self._probed.set()
+
+    def _probe_items(self):
+        """Probe items until none are left, then wait for the other runners."""
+        while True:
+            with self._lock:
+                if not self._unprobed:
+                    break
+                item = self._unprobed.pop()
+            try:
+                item.audio_seconds = self._probe(item)
+            except Exception:
+                item.audio_seconds = None
+            with self._lock:
+                self._probes_left -= 1
+                _last = self._probes_left == 0
+            if _last:
+                self._queue_items()
+        self._probed.wait()
+
+    def _next_item(self) -> Optional[BatchItem]:
+        with self._lock:
+            if self._cancelled or not self._pending:
+                return None
+            _, _index = heapq.heappop(self._pending)
+            return self._by_index[_index]
+
+    def _runner(self):
+        """Runner thread: transcribe items until none are left."""
+        self._probe_items()
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            item.state = JOB_STATE_RUNNING
+            item.started_at = time.time()
+            try:
+                item.segments = self._run(item)
+                item.state = JOB_STATE_DONE
+            except Exception as e:
+                tracing.log_event(
+                    "batch_item_failed",
+                    logging.ERROR,
+                    index=item.index,
+                    **{item.kind: item.source},
+                    error=str(e),
+                    traceback=traceback.format_exc(),
+                )
+                item.error = str(e) or type(e).__name__
+                item.state = JOB_STATE_FAILED
+            item.finished_at = time.time()
+            self._finished.put(item)
+
+    def cancel(self) -> int:
+        """Don't start any more items (running ones still finish)."""
+        with self._lock:
+            self._cancelled = True
+            _dropped = len(self._pending) + len(self._unprobed)
+            self._probes_left -= len(self._unprobed)
+            self._pending = []
+            self._unprobed = []
+            _probed = self._probes_left == 0
+        if _probed:
+            # no probe left running to release the runners
+            self._probed.set()
+        return _dropped
+
+    def results(self) -> Iterator[BatchItem]:
+        """Yield every item as it finishes, in completion order (not after `cancel`)."""
+        for _ in range(len(self._items)):
+            yield self._finished.get()
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch totals; throughput is audio seconds per wall-clock second."""
+        _done = [item for item in self._items if item.state == JOB_STATE_DONE]
+        _finished = [item.finished_at for item in self._items if item.is_finished()]
+        _audio = sum(item.audio_seconds or 0.0 for item in _done)
+        _wall = (
+            max(_finished) - self.started_at
+            if _finished and self.started_at is not None
+            else 0.0
+        )
+        return {
+            "order": self._order,
+            "concurrency": self._concurrency,
+            "items": len(self._items),
+            "done": len(_done),
+            "failed": sum(1 for item in self._items if item.state == JOB_STATE_FAILED),
+            "missed_deadlines": sum(
+                1
+                for item in self._items
+                if item.to_dict(self.submitted_at)["missed_deadline"]
+            ),
+            "audio_seconds": _audio,
+            "wall_seconds": _wall,
+            "throughput": _audio / _wall if _wall > 0 else 0.0,
+        }
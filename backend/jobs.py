@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+import traceback
+import uuid
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import tracing
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+JOB_STATE_QUEUED = "queued"
+JOB_STATE_RUNNING = "running"
+JOB_STATE_DONE = "done"
+JOB_STATE_FAILED = "failed"
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class TranscriptionJob:
+    """State of one asynchronous transcription."""
+
+    def __init__(self, job_id: str, streaming_id: str, model: str):
+        self.job_id = job_id
+        self.streaming_id = streaming_id
+        self.model = model
+
+        self.state = JOB_STATE_QUEUED
+        self.progress = 0.0
+        self.segments: Optional[List[list]] = None
+        self.error: Optional[str] = None
+
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def is_finished(self) -> bool:
+        return self.state in (JOB_STATE_DONE, JOB_STATE_FAILED)
+
+    def to_dict(self, include_segments: bool = True) -> Dict[str, Any]:
+        """JSON-serializable view of the job."""
+        result = {
+            "job_id": self.job_id,
+            "streaming_id": self.streaming_id,
+            "model": self.model,
+            "state": self.state,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_segments:
+            result["segments"] = self.segments
+        return result
+
+
+class JobManager:
+    """
+    Runs transcriptions in the background and keeps their state for polling.
+
+    `run` callables get a `progress(done, total)` function and return the
+    segments. `on_update(job)` is called on every state / progress change so
+    the caller can push it to the client. The newest `max_finished` finished
+    jobs are kept around, older ones are forgotten.
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished: int = 256):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="transcription_job"
+        )
+        self._max_finished = max_finished
+        self._jobs: "OrderedDict[str, TranscriptionJob]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def submit(
+        self,
+        streaming_id: str,
+        model: str,
+        run: Callable[[Callable[[int, int], None]], List[list]],
+        on_update: Callable[[TranscriptionJob], None] = None,
+    ) -> TranscriptionJob:
+        """Queue a job, returns right away."""
+        job = TranscriptionJob(str(uuid.uuid4()), streaming_id, model)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._forget_old_jobs()
+
+        self._executor.submit(self._run_job, job, run, on_update)
+        return job
+
+    def _run_job(
+        self,
+        job: TranscriptionJob,
+        run: Callable[[Callable[[int, int], None]], List[list]],
+        on_update: Optional[Callable[[TranscriptionJob], None]],
+    ):
+        """Executor thread: run the job + report its progress."""
+
+        def _notify():
+            if on_update is None:
+                return
+            try:
+                on_update(job)
+            except Exception as e:
+                tracing.log_event(
+                    "job_update_callback_failed",
+                    logging.ERROR,
+                    job_id=job.job_id,
+                    error=str(e),
+                )
+
+        def _progress(done: int, total: int):
+            job.progress = done / total if total else 1.0
+            _notify()
+
+        job.state = JOB_STATE_RUNNING
+        job.started_at = time.time()
+        _notify()
+
+        try:
+            job.segments = run(_progress)
+            job.progress = 1.0
+            job.state = JOB_STATE_DONE
+        except Exception as e:
+            tracing.log_event(
+                "transcription_job_failed",
+                logging.ERROR,
+                job_id=job.job_id,
+                error=str(e),
+                traceback=traceback.format_exc(),
+            )
+            job.error = str(e) or type(e).__name__
+            job.state = JOB_STATE_FAILED
+        job.finished_at = time.time()
+        _notify()
+
+    def _forget_old_jobs(self):
+        """Drop the oldest finished jobs past `max_finished`."""
+        _finished = [k for k, j in self._jobs.items() if j.is_finished()]
+        for job_id in _finished[: max(0, len(_finished) - self._max_finished)]:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[TranscriptionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs per state."""
+        with self._lock:
+            result = {
+                JOB_STATE_QUEUED: 0,
+                JOB_STATE_RUNNING: 0,
+                JOB_STATE_DONE: 0,
+                JOB_STATE_FAILED: 0,
+            }
+            for job in self._jobs.values():
+                result[job.state] += 1
+            return result
@@ -0,0 +1,161 @@
+import logging
+import threading
+
+import tracing
+
+from verify import AudioStorage, VoiceActivityDetector, WhisperCore
+from transcription import WHISPER_SAMPLE_RATE
+
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def format_live_segments(chunks: List[Any]) -> List[list]:
+    """
+    Convert WhisperCore segment chunks (ms) into [t0, t1, text] lists in
+    whisper units (10 ms), like the rest of the API.
+    """
+    return [
+        [int(c.segment.t0) // 10, int(c.segment.t1) // 10, c.segment.text]
+        for c in chunks
+    ]
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class LiveTranscriber:
+    """
+    Transcribes a streaming session while it is being recorded.
+
+    Reads the decoded audio of the session's StreamRecorder (`storage`);
+    every `interval` seconds, if new audio arrived, a windowed WhisperCore pass is
+    queued (passes never pile up). After each pass that changed something,
+    `on_partial(payload)` gets the committed + tentative segments.
+    """
+
+    def __init__(
+        self,
+        streaming_id: str,
+        model: Any,
+        storage: AudioStorage,
+        on_partial: Callable[[Dict[str, Any]], None],
+        interval: float = 1.0,
+        decode_window: float = 15.0,
+        vad_params: Optional[Dict[str, Any]] = None,
+    ):
+        self._streaming_id = streaming_id
+        self._on_partial = on_partial
+        self._interval = interval
+
+        self._storage = storage
+        self._whisper = WhisperCore(
+            model,
+            self._storage,
+            max_decode_window=decode_window,
+            vad=(
+                VoiceActivityDetector(WHISPER_SAMPLE_RATE, **vad_params)
+                if vad_params is not None
+                else None
+            ),
+        )
+        self._last_samples = 0
+        self._last_payload = None
+        # logged once until a pass succeeds again, not on every failing tick
+        self._last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._ticker = threading.Thread(
+            target=self._tick_loop, name=f"live_{streaming_id}", daemon=True
+        )
+        self._ticker.start()
+
+    # ------------------------------------------------------------ #
+    # decoding
+
+    def _tick_loop(self):
+        while not self._stop_event.wait(self._interval):
+            self.tick()
+
+    def tick(self):
+        """Queue a decoding pass if audio arrived since the last one."""
+        _total = self._storage.get_total_samples()
+        if _total == self._last_samples:
+            return
+        self._last_samples = _total
+        self._whisper.queue_update_stream(
+            callback=self._emit_partial, error_callback=self._on_error
+        )
+
+    def _emit_partial(self, final: bool = False):
+        """Send the segments if they changed since the last update."""
+        _payload = {
+            "streaming_id": self._streaming_id,
+            "committed": format_live_segments(self._whisper.get_committed_segments()),
+            "tentative": format_live_segments(self._whisper.get_tentative_segments()),
+            "audio_millis": self._storage.get_total_duration_millis(),
+            "final": final,
+        }
+        self._last_error = None
+        if self._stop_event.is_set() and not final:
+            # a pass queued before `stop`, the final payload comes last
+            return
+        _key = (_payload["committed"], _payload["tentative"], final)
+        if _key == self._last_payload:
+            return
+        self._last_payload = _key
+        self._on_partial(_payload)
+
+    def _on_error(self, error: BaseException):
+        _error = str(error) or type(error).__name__
+        if _error == self._last_error:
+            return
+        self._last_error = _error
+        tracing.log_event(
+            "live_transcription_failed",
+            logging.ERROR,
+            streaming_id=self._streaming_id,
+            error=_error,
+        )
+
+    # ------------------------------------------------------------ #
+    # session functions
+
+    def stop(self, final_pass: bool = True) -> Optional[Future]:
+        """
+        Stop the session. With `final_pass` (finish the recorder first), the
+        rest of the audio is transcribed on the decoding thread, which sends
+        it with `final: true` when done. Returns the Future of that pass.
+        """
+        if self._stop_event.is_set():
+            return None
+        self._stop_event.set()
+
+        if not final_pass:
+            self._whisper.shutdown(wait=False)
+            return None
+        return self._whisper.queue_finish_stream(
+            callback=self._finish, error_callback=self._finish
+        )
+
+    def _finish(self, error: Optional[BaseException] = None):
+        """Send the final transcript (what there is, if the pass failed)."""
+        if error is not None:
+            self._on_error(error)
+        self._emit_partial(final=True)
+        self._whisper.shutdown(wait=False)
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def get_storage(self) -> AudioStorage:
+        return self._storage
+
+    def is_stopped(self) -> bool:
+        return self._stop_event.is_set()
@@ -5,11 +5,27 @@ from flask_socketio import SocketIO, emit
 import mongoengine
 import models
 
-from backend import SocketIOInstance, AudioBuffersInstance, MongoDBInstance
+from backend import (
+    SocketIOInstance,
+    AudioBuffersInstance,
+    MongoDBInstance,
+    MongoCommandTimer,
+)
+from pymongo import monitoring
+import tracing
+from engines import ENGINE_FAKE, ENGINE_WHISPERCPP
+from model_pool import ModelCache
+from jobs import JobManager
+from session_buffer import BufferAccounting
+from reaper import SessionReaper
+from result_cache import ResultCache
+from api.stt import preload_model
+from workers import TranscriptionWorkerPool
 
 from api.stt import stt_bp
 from api.streaming import streaming_bp
 from api.storage import storage_bp
+from api.monitoring import monitoring_bp
 
 import os
 import dotenv
@@ -41,6 +57,12 @@ def create_app():
 
 if __name__ == "__main__":
 
+    # with DEBUG the werkzeug reloader runs this block twice: in the watching
+    # parent and in the child that serves. background work (reaper, workers,
+    # model preloads) is only started in the serving process
+    DEBUG = os.getenv("DEBUG", "true").lower() in ("1", "true", "yes")
+    SERVING_PROCESS = not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+
     app = create_app()
 
     with app.app_context():
@@ -48,6 +70,7 @@ if __name__ == "__main__":
         app.register_blueprint(stt_bp, url_prefix="/stt")
         app.register_blueprint(streaming_bp, url_prefix="/streaming")
         app.register_blueprint(storage_bp, url_prefix="/storage")
+        app.register_blueprint(monitoring_bp, url_prefix="/metrics")
 
         # -------------------------------------------------- #
         # register custom objects
@@ -65,8 +88,50 @@ if __name__ == "__main__":
             "https://github.com/ggml-org/whisper.cpp"
         )
 
+        # structured logs + traces (tracing.py), json lines on stderr or in
+        # TRACE_FILE: records of TRACE_LEVEL and up, of the events in
+        # TRACE_SAMPLE_RATES only that fraction. per chunk records are DEBUG,
+        # so they cost nothing at the default level
+        app.config["TRACE_LEVEL"] = os.getenv("TRACE_LEVEL", "INFO")
+        app.config["TRACE_FILE"] = os.getenv("TRACE_FILE") or None
+        app.config["TRACE_SAMPLE_RATES"] = {"audio_chunk": 0.05}
+        tracing.configure(
+            app.config["TRACE_LEVEL"],
+            app.config["TRACE_SAMPLE_RATES"],
+            app.config["TRACE_FILE"],
+        )
+
         # model info
-        app.config["LOADED_MODELS"] = {}
+        # speech-to-text engine (engines.py): "whispercpp", or "fake" to load
+        # test / profile without model files, taking FAKE_ENGINE_RTF seconds
+        # per audio second (divided by n_threads with FAKE_ENGINE_THREAD_SCALING)
+        app.config["STT_ENGINE"] = os.getenv("STT_ENGINE", ENGINE_WHISPERCPP)
+        app.config["STT_ENGINE_PARAMS"] = (
+            {
+                "rtf": float(os.getenv("FAKE_ENGINE_RTF", 0.1)),
+                "scale_with_threads": os.getenv(
+                    "FAKE_ENGINE_THREAD_SCALING", "false"
+                ).lower()
+                in ("1", "true", "yes"),
+            }
+            if app.config["STT_ENGINE"] == ENGINE_FAKE
+            else {}
+        )
+
+        # LRU cache of model pools, evicts once the estimated size (ggml file
+        # size * overhead) of the loaded models goes over the budget
+        app.config["MODEL_MEMORY_BUDGET"] = (
+            int(os.getenv("MODEL_MEMORY_BUDGET_MB", 4096)) * 1024 * 1024
+        )
+        app.config["MODEL_MEMORY_OVERHEAD"] = 1.25
+        app.config["LOADED_MODELS"] = ModelCache(app.config["MODEL_MEMORY_BUDGET"])
+
+        # instances per model, threads per instance, seconds to wait for one
+        app.config["MODEL_POOL_SIZE"] = int(os.getenv("MODEL_POOL_SIZE", 2))
+        app.config["MODEL_POOL_THREADS"] = max(
+            1, (os.cpu_count() or 1) // app.config["MODEL_POOL_SIZE"]
+        )
+        app.config["MODEL_POOL_TIMEOUT"] = float(os.getenv("MODEL_POOL_TIMEOUT", 30))
         app.config["SUPPORTED_MODELS"] = [
             "tiny",
             "base",
@@ -78,6 +143,69 @@ if __name__ == "__main__":
             "large-v2",  # idk why you'd want to run this one though
         ]
 
+        # voice activity detection, skip silence before transcription
+        app.config["VAD_ENABLED"] = True
+        app.config["VAD_PARAMS"] = {}
+
+        # audio longer than LONG_AUDIO_SECONDS (0 = never) is cut at silences
+        # into pieces of about LONG_AUDIO_PIECE_SECONDS that overlap by
+        # LONG_AUDIO_OVERLAP_SECONDS, transcribed in parallel (one per pooled
+        # instance / worker) and stitched back together
+        app.config["LONG_AUDIO_SECONDS"] = float(os.getenv("LONG_AUDIO_SECONDS", 600))
+        app.config["LONG_AUDIO_PIECE_SECONDS"] = 120.0
+        app.config["LONG_AUDIO_OVERLAP_SECONDS"] = 2.0
+
+        # every /streaming session is decoded by its own ffmpeg process as the
+        # chunks arrive and kept in memory for transcription: ffmpeg input
+        # format of the chunks (None = probe), seconds to wait for the
+        # decoder to flush on stop, also write static/audio/<sid>.wav
+        app.config["STREAM_INPUT_FORMAT"] = None
+        app.config["STREAM_DECODER_TIMEOUT"] = 10.0
+        app.config["STREAM_ARCHIVE_WAV"] = os.getenv(
+            "STREAM_ARCHIVE_WAV", "1"
+        ).lower() in ("1", "true", "yes")
+
+        # session buffers (raw chunks + decoded audio) are kept in memory up
+        # to STREAM_BUFFER_MEMORY_LIMIT bytes each (or until every buffer
+        # together is over the global limit), then spill to disk. chunks
+        # past STREAM_MAX_CHUNK_BYTES / audio past STREAM_MAX_SECONDS is
+        # refused (0 = unlimited)
+        app.config["STREAM_SPILL_DIR"] = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "cache", "spill"
+        )
+        app.config["STREAM_BUFFER_MEMORY_LIMIT"] = (
+            int(os.getenv("STREAM_BUFFER_MEMORY_LIMIT_MB", 8)) * 1024 * 1024
+        )
+        app.config["STREAM_BUFFER_GLOBAL_MEMORY_LIMIT"] = (
+            int(os.getenv("STREAM_BUFFER_GLOBAL_MEMORY_LIMIT_MB", 512)) * 1024 * 1024
+        )
+        app.config["STREAM_MAX_CHUNK_BYTES"] = 256 * 1024 * 1024
+        app.config["STREAM_MAX_SECONDS"] = 3 * 60 * 60
+        app.config["STREAM_BUFFER_ACCOUNTING"] = BufferAccounting(
+            app.config["STREAM_BUFFER_GLOBAL_MEMORY_LIMIT"]
+        )
+
+        # /stt/transcribe_batch: max files + recordings per request, files
+        # must be inside BATCH_FILE_DIRS (os.pathsep separated, default: the
+        # audio cache)
+        app.config["BATCH_MAX_ITEMS"] = 256
+        app.config["BATCH_FILE_DIRS"] = [
+            d for d in os.getenv("BATCH_FILE_DIRS", "").split(os.pathsep) if d
+        ]
+
+        # live transcription (`start_live` on /streaming): seconds between
+        # decoding passes, max seconds decoded per pass
+        app.config["LIVE_TRANSCRIBE_INTERVAL"] = float(
+            os.getenv("LIVE_TRANSCRIBE_INTERVAL", 1.0)
+        )
+        app.config["LIVE_DECODE_WINDOW"] = 15.0
+
+        # models loaded + warmed up in the background at startup
+        app.config["PRELOAD_MODELS"] = [
+            m for m in os.getenv("PRELOAD_MODELS", "").split(",") if m
+        ]
+        app.config["MODEL_WARMUP_SECONDS"] = 1.0
+
         app.config["WHISPER_LOGS"] = True
         app.config["WHISPER_LOGS_DIR"] = os.path.join(
             os.path.dirname(os.path.abspath(__file__)), "logs"
@@ -90,24 +218,105 @@ if __name__ == "__main__":
             os.path.dirname(os.path.abspath(__file__)), "static", "audio"
         )
 
+        # disconnected sessions + their cached audio (wav, spilled buffers)
+        # are removed SESSION_TTL seconds after last use, or least recently
+        # used first once everything together is over AUDIO_CACHE_BUDGET
+        app.config["SESSION_TTL"] = float(os.getenv("SESSION_TTL_SECONDS", 900))
+        app.config["AUDIO_CACHE_BUDGET"] = (
+            int(os.getenv("AUDIO_CACHE_BUDGET_MB", 2048)) * 1024 * 1024
+        )
+        app.config["SESSION_REAPER_INTERVAL"] = 30.0
+        app.config["SESSION_REAPER"] = SessionReaper(
+            AudioBuffersInstance.get_instance(),
+            [app.config["AUDIO_CACHE_DIR"], app.config["STREAM_SPILL_DIR"]],
+            ttl=app.config["SESSION_TTL"],
+            budget=app.config["AUDIO_CACHE_BUDGET"],
+            interval=app.config["SESSION_REAPER_INTERVAL"],
+        )
+        if SERVING_PROCESS:
+            app.config["SESSION_REAPER"].start()
+
+        # transcription results keyed by a hash of the audio + model + decode
+        # parameters: RESULT_CACHE_ENTRIES in memory, json files in
+        # RESULT_CACHE_DIR up to RESULT_CACHE_DISK_BUDGET bytes (0 = no limit)
+        app.config["RESULT_CACHE_ENABLED"] = os.getenv(
+            "RESULT_CACHE_ENABLED", "1"
+        ).lower() in ("1", "true", "yes")
+        app.config["RESULT_CACHE_ENTRIES"] = 512
+        app.config["RESULT_CACHE_DIR"] = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "cache", "results"
+        )
+        app.config["RESULT_CACHE_DISK_BUDGET"] = (
+            int(os.getenv("RESULT_CACHE_DISK_BUDGET_MB", 256)) * 1024 * 1024
+        )
+        app.config["RESULT_CACHE"] = (
+            ResultCache(
+                app.config["RESULT_CACHE_ENTRIES"],
+                app.config["RESULT_CACHE_DIR"],
+                app.config["RESULT_CACHE_DISK_BUDGET"],
+            )
+            if app.config["RESULT_CACHE_ENABLED"]
+            else None
+        )
+
         app.config["MODEL_PATH_MAP"] = {
-            # "tiny": "tiny.bin",
-            # "base": "base.bin",
             "base.en": os.path.join(
                 app.config["WHISPER_MODELS_DIR"], "ggml-base.en.bin"
             ),
-            # "small": os.path.join(app.config["WHISPER_MODELS_DIR"], "ggml-small.bin"),
-            # "medium": os.path.join(app.config["WHISPER_MODELS_DIR"], "ggml-medium.bin"),
-            # "medium.en": os.path.join(
-            #     app.config["WHISPER_MODELS_DIR"], "ggml-medium.en.bin"
-            # ),
-            # "large-v1": os.path.join(
-            #     app.config["WHISPER_MODELS_DIR"], "ggml-large-v1.bin"
-            # ),
-            # "large-v2": os.path.join(
-            #     app.config["WHISPER_MODELS_DIR"], "ggml-large-v2.bin"
-            # )
         }
+        # every other supported model that has been downloaded (all of them
+        # for the fake engine), the model cache keeps them from all being
+        # resident at once
+        for _name in app.config["SUPPORTED_MODELS"]:
+            _path = os.path.join(app.config["WHISPER_MODELS_DIR"], f"ggml-{_name}.bin")
+            if os.path.exists(_path) or app.config["STT_ENGINE"] == ENGINE_FAKE:
+                app.config["MODEL_PATH_MAP"][_name] = _path
+
+        # transcription worker processes (0 = transcribe on the request thread
+        # with the in-process model pools). past TRANSCRIBE_MAX_PENDING queued
+        # jobs, requests are turned away with a 503
+        app.config["TRANSCRIBE_WORKERS"] = int(os.getenv("TRANSCRIBE_WORKERS", 0))
+        app.config["TRANSCRIBE_WORKER_THREADS"] = int(
+            os.getenv("TRANSCRIBE_WORKER_THREADS", 2)
+        )
+        app.config["TRANSCRIBE_MAX_PENDING"] = int(
+            os.getenv("TRANSCRIBE_MAX_PENDING", 8)
+        )
+        app.config["WORKER_JOB_TIMEOUT"] = None
+
+        app.config["WORKER_POOL"] = None
+
+        # async transcriptions (POST /stt/transcribe_stream with "async": true),
+        # finished jobs are kept for polling until TRANSCRIBE_JOB_HISTORY newer
+        # ones have finished
+        app.config["TRANSCRIBE_JOB_THREADS"] = int(
+            os.getenv("TRANSCRIBE_JOB_THREADS", 4)
+        )
+        app.config["TRANSCRIBE_JOB_HISTORY"] = 256
+        app.config["TRANSCRIPTION_JOBS"] = JobManager(
+            max_workers=app.config["TRANSCRIBE_JOB_THREADS"],
+            max_finished=app.config["TRANSCRIBE_JOB_HISTORY"],
+        )
+
+        # start preloading
+        if SERVING_PROCESS and app.config["TRANSCRIBE_WORKERS"] > 0:
+            app.config["WORKER_POOL"] = TranscriptionWorkerPool(
+                app.config["MODEL_PATH_MAP"],
+                num_workers=app.config["TRANSCRIBE_WORKERS"],
+                threads_per_worker=app.config["TRANSCRIBE_WORKER_THREADS"],
+                max_pending=app.config["TRANSCRIBE_MAX_PENDING"],
+                preload_models=app.config["PRELOAD_MODELS"],
+                engine=app.config["STT_ENGINE"],
+                engine_params=app.config["STT_ENGINE_PARAMS"],
+            )
+        elif SERVING_PROCESS:
+            for _name in app.config["PRELOAD_MODELS"]:
+                if _name in app.config["MODEL_PATH_MAP"]:
+                    preload_model(_name)
+
+        # time every mongodb command (GET /metrics), clients made after this
+        # are covered
+        monitoring.register(MongoCommandTimer())
 
         # add mongoengine
         mongoengine.connect(
@@ -304,5 +513,5 @@ if __name__ == "__main__":
         app,
         host=os.getenv("BACKEND_HOST", "localhost"),
         port=os.getenv("BACKEND_PORT", 5001),
-        debug=os.getenv("DEBUG", True),
+        debug=DEBUG,
     )
@@ -0,0 +1,323 @@
+import bisect
+import logging
+import math
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import tracing
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+# seconds, from a socket.io emit (~ms) up to a long transcription (minutes)
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class Metric:
+    """A named metric with a fixed set of label names."""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self._name = name
+        self._description = description
+        self._labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        if set(labels) != set(self._labels):
+            raise ValueError(
+                f"{self._name} takes labels {self._labels}, got {tuple(labels)}"
+            )
+        return tuple(labels[n] for n in self._labels)
+
+    def get_name(self) -> str:
+        return self._name
+
+    def collect(self) -> List[str]:
+        """Sample lines of the text exposition format."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(
+            [
+                f"# HELP {self._name} {_escape(self._description)}",
+                f"# TYPE {self._name} {self.TYPE}",
+            ]
+            + self.collect()
+        )
+
+
+class Histogram(Metric):
+    """Counts of observed values per bucket, plus their sum and count."""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self._buckets = tuple(sorted(buckets))
+        # label values -> [per bucket counts (+ the +Inf one), sum]
+        self._series: Dict[Tuple[Any, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        _key = self._label_values(labels)
+        _index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            _series = self._series.get(_key)
+            if _series is None:
+                _series = self._series[_key] = [[0] * (len(self._buckets) + 1), 0.0]
+            _series[0][_index] += 1
+            _series[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds spent in the block (also when it raises)."""
+        _start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - _start, **labels)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            _series = self._series.get(self._label_values(labels))
+            return sum(_series[0]) if _series else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            _series = [(k, list(v[0]), v[1]) for k, v in self._series.items()]
+
+        lines = []
+        for key, counts, total in sorted(_series, key=lambda s: tuple(map(str, s[0]))):
+            _cumulative = 0
+            for bound, count in zip(self._buckets + (math.inf,), counts):
+                _cumulative += count
+                _labels = _format_labels(
+                    self._labels + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self._name}_bucket{_labels} {_cumulative}")
+            _labels = _format_labels(self._labels, key)
+            lines.append(f"{self._name}_sum{_labels} {_format_value(total)}")
+            lines.append(f"{self._name}_count{_labels} {_cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Either `set` directly, or computed when
+    scraped by `function` (a number, or {label values tuple: number}).
+    """
+
+    TYPE = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Tuple[str, ...] = (),
+        function: Optional[Callable[[], Union[float, Dict[tuple, float]]]] = None,
+    ):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._label_values(labels)] = value
+
+    def set_function(
+        self, function: Optional[Callable[[], Union[float, Dict[tuple, float]]]]
+    ):
+        self._function = function
+
+    def get(self, **labels) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._label_values(labels))
+
+    def collect(self) -> List[str]:
+        if self._function is not None:
+            try:
+                _value = self._function()
+            except Exception as e:
+                tracing.log_event(
+                    "metric_collect_failed",
+                    logging.ERROR,
+                    metric=self._name,
+                    error=str(e),
+                )
+                return []
+            _values = _value if isinstance(_value, dict) else {(): _value}
+        else:
+            with self._lock:
+                _values = dict(self._values)
+
+        return [
+            f"{self._name}{_format_labels(self._labels, tuple(key))} "
+            f"{_format_value(value)}"
+            for key, value in sorted(_values.items(), key=lambda v: str(v[0]))
+            if value is not None
+        ]
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered together for GET /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.get_name() in self._metrics:
+                raise ValueError(f"Metric {metric.get_name()} already registered")
+            self._metrics[metric.get_name()] = metric
+        return metric
+
+    def histogram(self, name: str, description: str, **kwargs) -> Histogram:
+        return self.register(Histogram(name, description, **kwargs))
+
+    def gauge(self, name: str, description: str, **kwargs) -> Gauge:
+        return self.register(Gauge(name, description, **kwargs))
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            _metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in _metrics) + "\n"
+
+
+class TimedModel:
+    """Model-like adapter observing the seconds of every `transcribe` call."""
+
+    def __init__(self, instance: Any, histogram: Histogram, labels: Dict[str, Any]):
+        self._instance = instance
+        self._histogram = histogram
+        self._labels = dict(labels)
+
+    def transcribe(self, media: Any, **kwargs) -> List[Any]:
+        with self._histogram.time(**self._labels):
+            return self._instance.transcribe(media, **kwargs)
+
+
+# ---------------------------------------------------------------------------- #
+# backend metrics
+#
+# histograms are observed where the work happens, the gauges are computed
+# from the app's objects when /metrics is scraped (see main.py). work done in
+# the transcription worker processes is only seen from the outside, as the
+# inference time of the job.
+# ---------------------------------------------------------------------------- #
+
+REGISTRY = MetricsRegistry()
+
+CHUNK_INGEST_SECONDS = REGISTRY.histogram(
+    "stt_chunk_ingest_seconds",
+    "Seconds to buffer + hand an audio_chunk to the stream decoder",
+)
+FFMPEG_SECONDS = REGISTRY.histogram(
+    "stt_ffmpeg_seconds",
+    "Seconds spent in ffmpeg: probe, decode, convert (fallback of a "
+    "recording), flush (end of a streamed recording)",
+    labels=("operation",),
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "stt_model_load_seconds",
+    "Seconds to load one whisper model instance",
+    labels=("model",),
+)
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "stt_inference_seconds",
+    "Seconds per transcription: local (in-process pool), worker (worker "
+    "processes), long (split + parallel), live (one model call of a live pass)",
+    labels=("model", "path"),
+)
+MONGO_SECONDS = REGISTRY.histogram(
+    "stt_mongo_seconds",
+    "Seconds per MongoDB command",
+    labels=("command", "status"),
+)
+EMIT_SECONDS = REGISTRY.histogram(
+    "stt_socketio_emit_seconds",
+    "Seconds to emit a Socket.IO event",
+    labels=("event",),
+)
+
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    "stt_active_sessions",
+    "Streaming sessions, by whether the client is still connected",
+    labels=("connected",),
+)
+BUFFERED_BYTES = REGISTRY.gauge(
+    "stt_buffered_bytes",
+    "Bytes held by the streaming session buffers",
+    labels=("tier",),
+)
+LOADED_MODELS = REGISTRY.gauge(
+    "stt_loaded_models",
+    "Whisper models loaded in this process",
+)
+MODEL_INSTANCES = REGISTRY.gauge(
+    "stt_model_instances",
+    "Loaded whisper model instances, by model and state",
+    labels=("model", "state"),
+)
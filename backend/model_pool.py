@@ -0,0 +1,424 @@
+import os
+import threading
+import time
+
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# ---------------------------------------------------------------------------- #
+# errors
+# ---------------------------------------------------------------------------- #
+
+
+class ModelPoolError(Exception):
+    """Base class for model pool / cache errors."""
+
+
+class ModelPoolTimeout(ModelPoolError):
+    """Raised when no model instance frees up within the wait timeout."""
+
+
+class ModelPoolClosed(ModelPoolError):
+    """Raised when checking out from a pool that was evicted / closed."""
+
+
+class ModelCacheFull(ModelPoolError):
+    """Raised when a model does not fit into the memory budget."""
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class ModelPool:
+    """
+    Pool of up to `size` instances of one whisper model.
+
+    Each instance is only ever used by one request at a time. Instances are
+    created lazily by `factory` the first time every existing instance is
+    busy, so an idle server only pays for one copy of the model.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size: int = 1,
+        timeout: float = 30.0,
+        memory_per_instance: int = 0,
+        grow_hook: Callable[["ModelPool"], bool] = None,
+    ):
+        self._name = name
+        self._factory = factory
+        self._size = max(1, size)
+        self._timeout = timeout
+
+        # estimated bytes per instance + a hook asked before the pool grows
+        # (the cache uses it to make room / refuse going over budget)
+        self._memory_per_instance = memory_per_instance
+        self._grow_hook = grow_hook
+
+        self._idle: Deque[Any] = deque()
+        self._instances: List[Any] = []
+        self._creating = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # stats
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+
+    # ------------------------------------------------------------ #
+    # checkout / checkin
+
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        """
+        Take an idle instance out of the pool, creating one if there is room.
+        Waits at most `timeout` seconds (pool default if None).
+        """
+        timeout = self._timeout if timeout is None else timeout
+        _start = time.monotonic()
+        _deadline = _start + timeout
+
+        _can_grow = True
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise ModelPoolClosed(f"Model pool {self._name} is closed")
+                    if self._idle:
+                        instance = self._idle.popleft()
+                        break
+
+                    # room for a new instance, create it outside of the lock
+                    _count = len(self._instances) + self._creating
+                    if _count < self._size and (_can_grow or _count == 0):
+                        self._creating += 1
+                        instance = None
+                        break
+
+                    _remaining = _deadline - time.monotonic()
+                    if _remaining <= 0:
+                        self._timeouts += 1
+                        raise ModelPoolTimeout(
+                            f"No instance of {self._name} available after {timeout}s"
+                        )
+                    self._condition.wait(_remaining)
+
+            # ask before growing (outside of the lock, the hook may evict
+            # other pools). the first instance is always allowed
+            if instance is None and _count > 0 and self._grow_hook is not None:
+                if not self._grow_hook(self):
+                    with self._condition:
+                        self._creating -= 1
+                    _can_grow = False
+                    continue
+            break
+
+        if instance is None:
+            try:
+                instance = self._factory()
+            except Exception:
+                with self._condition:
+                    self._creating -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._creating -= 1
+                self._instances.append(instance)
+
+        with self._condition:
+            self._checkouts += 1
+            self._total_wait += time.monotonic() - _start
+        return instance
+
+    def checkin(self, instance: Any):
+        """Return an instance to the pool."""
+        with self._condition:
+            if not self._closed:
+                self._idle.append(instance)
+                self._condition.notify()
+                return
+            # pool was evicted while this instance was busy, free it now
+            self._instances = [i for i in self._instances if i is not instance]
+        self._free(instance)
+
+    @contextmanager
+    def instance(self, timeout: Optional[float] = None):
+        """Context manager around checkout / checkin."""
+        _instance = self.checkout(timeout)
+        try:
+            yield _instance
+        finally:
+            self.checkin(_instance)
+
+    def close(self) -> int:
+        """
+        Close the pool and free the native models.
+
+        Idle instances are released right away; busy instances are released
+        when they are checked back in. Returns the number freed now.
+        """
+        with self._condition:
+            self._closed = True
+            _idle = list(self._idle)
+            self._instances = [
+                i for i in self._instances if all(i is not j for j in _idle)
+            ]
+            self._idle.clear()
+            self._condition.notify_all()
+
+        for instance in _idle:
+            self._free(instance)
+        return len(_idle)
+
+    @staticmethod
+    def _free(instance: Any):
+        """Free an instance's native model (engines.STTEngine.close)."""
+        _close = getattr(instance, "close", None)
+        if _close is not None:
+            _close()
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_size(self) -> int:
+        return self._size
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def is_busy(self) -> bool:
+        """Check if any instance is checked out (or being created)."""
+        with self._condition:
+            return self._creating > 0 or len(self._idle) < len(self._instances)
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by the instances of this pool."""
+        with self._condition:
+            return (len(self._instances) + self._creating) * self._memory_per_instance
+
+    def get_memory_per_instance(self) -> int:
+        return self._memory_per_instance
+
+    def get_instances(self) -> List[Any]:
+        """Every instance, idle or busy (to read their info, not to use them)."""
+        with self._condition:
+            return list(self._instances)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool usage statistics."""
+        with self._condition:
+            return {
+                "name": self._name,
+                "size": self._size,
+                "instances": len(self._instances),
+                "idle": len(self._idle),
+                "busy": len(self._instances) - len(self._idle),
+                "memory_bytes": self.memory_usage(),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_seconds": (
+                    self._total_wait / self._checkouts if self._checkouts else 0.0
+                ),
+            }
+
+
+class PooledModel:
+    """
+    Model-like adapter around a pool, for code that holds on to one model
+    (e.g. verify.WhisperCore). Every `transcribe` checks an instance out just
+    for that call, so a long-lived holder never keeps an instance busy.
+    """
+
+    def __init__(self, pool: ModelPool, timeout: Optional[float] = None):
+        self._pool = pool
+        self._timeout = timeout
+
+    def transcribe(self, media: Any, **kwargs) -> List[Any]:
+        with self._pool.instance(self._timeout) as _instance:
+            return _instance.transcribe(media, **kwargs)
+
+    def get_pool(self) -> ModelPool:
+        return self._pool
+
+
+class ModelCache:
+    """
+    LRU cache of model pools with a memory budget.
+
+    Memory is estimated per instance (ggml file size times an overhead
+    factor). Adding a pool, or growing one, evicts the least recently used
+    pools that have no busy instance until the estimate fits the budget.
+    A budget of 0 means unlimited.
+
+    Behaves like the old `LOADED_MODELS` dict for `in`, `[]`, `keys()`.
+    `in` and `get` are the lookups counted as hits / misses (callers check
+    `in` before using a model), `[]` only marks the pool as used.
+    """
+
+    def __init__(self, memory_budget: int = 0):
+        self._memory_budget = memory_budget
+        self._pools: "OrderedDict[str, ModelPool]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        # stats
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+
+    # ------------------------------------------------------------ #
+    # memory estimation
+
+    @staticmethod
+    def estimate_model_memory(model_path: str, overhead: float = 1.25) -> int:
+        """Estimate the resident size of one model instance from its ggml file."""
+        if not os.path.exists(model_path):
+            return 0
+        return int(os.path.getsize(model_path) * overhead)
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by every cached pool."""
+        with self._lock:
+            return sum(pool.memory_usage() for pool in self._pools.values())
+
+    def _make_room(self, required: int, keep: str) -> bool:
+        """Evict LRU pools (never `keep`) until `required` more bytes fit."""
+        if not self._memory_budget:
+            return True
+
+        with self._lock:
+            # don't evict anything if it can't fit anyway
+            _evictable = sum(
+                pool.memory_usage()
+                for name, pool in self._pools.items()
+                if name != keep and not pool.is_busy()
+            )
+            if self.memory_usage() - _evictable + required > self._memory_budget:
+                return False
+
+            for name in list(self._pools.keys()):
+                if self.memory_usage() + required <= self._memory_budget:
+                    break
+                if name == keep or self._pools[name].is_busy():
+                    continue
+                self._evict(name)
+            return self.memory_usage() + required <= self._memory_budget
+
+    def _evict(self, name: str):
+        """Remove + close a pool, counting it as an eviction."""
+        pool = self._pools.pop(name)
+        self._evictions += 1
+        self._evicted_bytes += pool.memory_usage()
+        pool.close()
+
+    def _on_pool_grow(self, pool: ModelPool) -> bool:
+        """Grow hook for the cached pools (the new instance is already counted)."""
+        return self._make_room(0, keep=pool.get_name())
+
+    # ------------------------------------------------------------ #
+    # cache functions
+
+    def put(self, name: str, pool: ModelPool) -> ModelPool:
+        """
+        Add a pool (before its first instance is created), evicting LRU pools
+        to make room. Raises ModelCacheFull if it still doesn't fit.
+
+        Returns the cached pool: if `name` is already cached that pool is kept
+        + returned, and the caller closes the pool it lost with.
+        """
+        with self._lock:
+            _cached = self._pools.get(name)
+            if _cached is not None:
+                self._pools.move_to_end(name)
+                return _cached
+            if not self._make_room(pool.get_memory_per_instance(), keep=name):
+                raise ModelCacheFull(
+                    f"Model {name} needs {pool.get_memory_per_instance()} bytes, "
+                    f"budget is {self._memory_budget} bytes "
+                    f"({self.memory_usage()} in use)"
+                )
+            pool._grow_hook = self._on_pool_grow
+            self._pools[name] = pool
+            self._pools.move_to_end(name)
+            return pool
+
+    def _lookup(self, name: str, count: bool) -> Optional[ModelPool]:
+        """A pool (marked as most recently used), counting the lookup."""
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                self._misses += count
+                return None
+            self._hits += count
+            self._pools.move_to_end(name)
+            return pool
+
+    def get(self, name: str) -> Optional[ModelPool]:
+        """Get a pool + mark it as most recently used."""
+        return self._lookup(name, True)
+
+    def remove(self, name: str, pool: Optional[ModelPool] = None) -> bool:
+        """
+        Remove a pool and free its models. If `pool` is given, it is only
+        removed if it is still the one cached under `name`.
+        """
+        with self._lock:
+            if pool is not None and self._pools.get(name) is not pool:
+                return False
+            pool = self._pools.pop(name, None)
+        if pool is None:
+            return False
+        pool.close()
+        return True
+
+    def clear(self):
+        """Remove every pool."""
+        for name in self.keys():
+            self.remove(name)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._pools.keys())
+
+    def items(self) -> List[Tuple[str, ModelPool]]:
+        """(name, pool) pairs, without marking them as used."""
+        with self._lock:
+            return list(self._pools.items())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                "models": self.keys(),
+                "memory_budget_bytes": self._memory_budget,
+                "memory_bytes": self.memory_usage(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+            }
+
+    def __contains__(self, name: str) -> bool:
+        return self._lookup(name, True) is not None
+
+    def __getitem__(self, name: str) -> ModelPool:
+        pool = self._lookup(name, False)
+        if pool is None:
+            raise KeyError(name)
+        return pool
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pools)
+
+    def __repr__(self):
+        return f"ModelCache(models={self.keys()}, memory={self.memory_usage()})"
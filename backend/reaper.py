@@ -0,0 +1,272 @@
+import logging
+import os
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend import (
+    CACHE_AUDIO_DATA,
+    CACHE_CONNECTED,
+    CACHE_LAST_ACTIVE,
+    CACHE_LIVE_TRANSCRIBER,
+    CACHE_RECORDER,
+)
+import tracing
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+REAP_REASON_TTL = "ttl"
+REAP_REASON_BUDGET = "budget"
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class SessionReaper(threading.Thread):
+    """
+    Background thread expiring idle streaming sessions and cached audio.
+
+    Every `interval` seconds:
+    - sessions + files (`<sid>.wav`, temp files, spilled buffers in
+      `directories`) unused for `ttl` seconds are removed
+    - if everything together is still over `budget` bytes (0 = no budget),
+      the least recently used ones are removed until it fits
+
+    Connected sessions and pinned sessions (a transcription is using them)
+    are never removed, nor are their files.
+    """
+
+    def __init__(
+        self,
+        sessions: Dict[str, Dict[str, Any]],
+        directories: List[str],
+        ttl: float = 900.0,
+        budget: int = 0,
+        interval: float = 30.0,
+    ):
+        super().__init__(name="session_reaper", daemon=True)
+        self._sessions = sessions
+        self._directories = list(directories)
+        self._ttl = ttl
+        self._budget = budget
+        self._interval = interval
+
+        self._pins: Counter = Counter()
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+
+        # stats
+        self._passes = 0
+        self._reclaimed_bytes = {REAP_REASON_TTL: 0, REAP_REASON_BUDGET: 0}
+        self._sessions_reaped = 0
+        self._files_reaped = 0
+        self._last_pass = None
+
+    # ------------------------------------------------------------ #
+    # usage tracking
+
+    def touch(self, sid: str):
+        """Mark a session (or its cached wav if the session is gone) as used."""
+        _session = self._sessions.get(sid)
+        if _session is not None:
+            _session[CACHE_LAST_ACTIVE] = time.time()
+            return
+        for directory in self._directories:
+            _path = os.path.join(directory, f"{sid}.wav")
+            if os.path.exists(_path):
+                os.utime(_path)
+
+    def pin(self, sid: str):
+        with self._lock:
+            self._pins[sid] += 1
+
+    def unpin(self, sid: str):
+        with self._lock:
+            self._pins[sid] -= 1
+            if self._pins[sid] <= 0:
+                del self._pins[sid]
+
+    @contextmanager
+    def pinned(self, sid: str):
+        """Keep a session + its files while the block runs."""
+        self.pin(sid)
+        try:
+            yield
+        finally:
+            self.touch(sid)
+            self.unpin(sid)
+
+    def is_protected(self, sid: str) -> bool:
+        with self._lock:
+            if self._pins.get(sid):
+                return True
+        _session = self._sessions.get(sid)
+        return _session is not None and _session.get(CACHE_CONNECTED, False)
+
+    # ------------------------------------------------------------ #
+    # reaping
+
+    @staticmethod
+    def _session_id(file_name: str) -> str:
+        """`<sid>.wav`, `recording_<sid>.webm`, `<sid>.<buffer>` -> sid"""
+        _name = file_name.split(".")[0]
+        if _name.startswith("recording_"):
+            _name = _name[len("recording_") :]
+        return _name
+
+    def _collect(self) -> Dict[str, Tuple[float, int, List[str]]]:
+        """sid -> (last used, bytes held, files) for everything on record."""
+        _entries: Dict[str, Tuple[float, int, List[str]]] = {}
+
+        for sid, session in list(self._sessions.items()):
+            _bytes = len(session[CACHE_AUDIO_DATA])
+            _recorder = session.get(CACHE_RECORDER)
+            if _recorder is not None:
+                _bytes += len(_recorder.get_pcm_buffer())
+            _entries[sid] = (session.get(CACHE_LAST_ACTIVE, 0.0), _bytes, [])
+
+        for directory in self._directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file():
+                    continue
+                _sid = self._session_id(entry.name)
+                # spilled buffers are already counted with their session
+                if _sid in self._sessions and not entry.name.endswith(
+                    (".wav", ".webm")
+                ):
+                    continue
+                _stat = entry.stat()
+                _last, _bytes, _files = _entries.get(_sid, (0.0, 0, []))
+                _entries[_sid] = (
+                    max(_last, _stat.st_mtime),
+                    _bytes + _stat.st_size,
+                    _files + [entry.path],
+                )
+        return _entries
+
+    def _reap(self, sid: str, files: List[str]) -> int:
+        """Drop a session + delete its files. Returns the bytes reclaimed."""
+        _reclaimed = 0
+        _session = self._sessions.pop(sid, None)
+        if _session is not None:
+            if _session.get(CACHE_LIVE_TRANSCRIBER) is not None:
+                _session[CACHE_LIVE_TRANSCRIBER].stop(final_pass=False)
+            if _session.get(CACHE_RECORDER) is not None:
+                _reclaimed += _session[CACHE_RECORDER].release()
+            _reclaimed += _session[CACHE_AUDIO_DATA].release()
+            self._sessions_reaped += 1
+
+        for path in files:
+            try:
+                _size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            _reclaimed += _size
+            self._files_reaped += 1
+        return _reclaimed
+
+    def _last_used(self, sid: str, files: List[str]) -> float:
+        """When a session / its files were last used, read now."""
+        _session = self._sessions.get(sid)
+        _last = _session.get(CACHE_LAST_ACTIVE, 0.0) if _session is not None else 0.0
+        for path in files:
+            try:
+                _last = max(_last, os.path.getmtime(path))
+            except FileNotFoundError:
+                continue
+        return _last
+
+    def _reap_unprotected(
+        self, sid: str, files: List[str], used_before: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        `_reap` under the lock `pin` takes, so a transcription can't pin the
+        session between the check and the reaping. None (nothing reaped) if
+        it is protected, or with `used_before`, if it was used since.
+        """
+        with self._lock:
+            if self.is_protected(sid):
+                return None
+            if used_before is not None and self._last_used(sid, files) >= used_before:
+                return None
+            return self._reap(sid, files)
+
+    def run_once(self) -> int:
+        """One reaping pass. Returns the bytes reclaimed."""
+        _now = time.time()
+        _entries = self._collect()
+        _reclaimed = 0
+
+        # expired
+        for sid, (last_used, _, files) in list(_entries.items()):
+            if _now - last_used <= self._ttl:
+                continue
+            _bytes = self._reap_unprotected(sid, files, _now - self._ttl)
+            if _bytes is not None:
+                self._reclaimed_bytes[REAP_REASON_TTL] += _bytes
+                _reclaimed += _bytes
+                del _entries[sid]
+
+        # least recently used over the budget
+        if self._budget:
+            _total = sum(_bytes for _, _bytes, _ in _entries.values())
+            for sid, (_, _bytes, files) in sorted(
+                _entries.items(), key=lambda item: item[1][0]
+            ):
+                if _total <= self._budget:
+                    break
+                _freed = self._reap_unprotected(sid, files)
+                if _freed is None:
+                    continue
+                self._reclaimed_bytes[REAP_REASON_BUDGET] += _freed
+                _reclaimed += _freed
+                _total -= _bytes
+
+        self._passes += 1
+        self._last_pass = _now
+        return _reclaimed
+
+    def run(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                _reclaimed = self.run_once()
+                if _reclaimed:
+                    tracing.log_event(
+                        "session_reaper_pass", logging.INFO, reclaimed_bytes=_reclaimed
+                    )
+            except Exception as e:
+                tracing.log_event("session_reaper_failed", logging.ERROR, error=str(e))
+
+    def stop(self):
+        self._stop_event.set()
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def stats(self) -> Dict[str, Any]:
+        """Get reaper statistics."""
+        with self._lock:
+            _pinned = len(self._pins)
+        return {
+            "ttl_seconds": self._ttl,
+            "budget_bytes": self._budget,
+            "passes": self._passes,
+            "last_pass": self._last_pass,
+            "sessions": len(self._sessions),
+            "pinned_sessions": _pinned,
+            "sessions_reaped": self._sessions_reaped,
+            "files_reaped": self._files_reaped,
+            "reclaimed_bytes": sum(self._reclaimed_bytes.values()),
+            "reclaimed_bytes_by_reason": dict(self._reclaimed_bytes),
+        }
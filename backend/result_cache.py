@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+# bytes hashed at once when hashing a file
+HASH_BLOCK_SIZE = 1024 * 1024
+# content hashes of files remembered by path (+ mtime, size)
+FILE_HASH_ENTRIES = 4096
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def hash_audio(audio_data: np.ndarray) -> str:
+    """Content hash of 16khz float32 samples."""
+    return hashlib.blake2b(
+        np.ascontiguousarray(audio_data, dtype=np.float32).data, digest_size=20
+    ).hexdigest()
+
+
+def hash_file(file_name: str) -> str:
+    """Content hash of a file (for media that isn't decoded before whisper)."""
+    _hash = hashlib.blake2b(digest_size=20)
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            _hash.update(block)
+    return _hash.hexdigest()
+
+
+def make_cache_key(content_hash: str, model: str, params: Dict[str, Any]) -> str:
+    """Cache key of an audio content hash + model + decode parameters."""
+    _params = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.blake2b(
+        f"{content_hash}|{model}|{_params}".encode(), digest_size=20
+    ).hexdigest()
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class ResultCache:
+    """
+    Content-addressed cache of transcription results.
+
+    Two tiers: an in-memory LRU of up to `max_entries` results, and json
+    files in `cache_dir` kept under `disk_budget` bytes (least recently used
+    files are deleted first, a hit refreshes the file's mtime). Memory
+    misses that hit the disk are promoted back into memory.
+
+    The content hash of a file is remembered while its mtime + size don't
+    change (`get_file_hash`), so a file is read once, not on every lookup.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        cache_dir: Optional[str] = None,
+        disk_budget: int = 0,
+    ):
+        self._max_entries = max_entries
+        self._cache_dir = cache_dir
+        self._disk_budget = disk_budget
+
+        self._memory: "OrderedDict[str, List[list]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        # path -> (mtime ns, size, content hash)
+        self._file_hashes: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+
+        # key -> size of the entries on disk, oldest first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+        # stats
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._disk_evictions = 0
+        self._file_hash_hits = 0
+
+    def _load_disk_index(self):
+        _entries = []
+        for entry in os.scandir(self._cache_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                _stat = entry.stat()
+                _entries.append((_stat.st_mtime, entry.name[:-5], _stat.st_size))
+        for _, key, size in sorted(_entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+    # ------------------------------------------------------------ #
+    # cache functions
+
+    def get(self, key: str) -> Optional[List[list]]:
+        """Get the segments for a key, None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return self._memory[key]
+            if key not in self._disk_index:
+                self._misses += 1
+                return None
+
+        try:
+            with open(self._disk_path(key), "r") as f:
+                segments = json.load(f)
+            os.utime(self._disk_path(key))
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop_disk_entry(key)
+                self._misses += 1
+            return None
+
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+            self._disk_hits += 1
+            self._put_memory(key, segments)
+        return segments
+
+    def put(self, key: str, segments: List[list]):
+        """Store segments in both tiers."""
+        with self._lock:
+            self._put_memory(key, segments)
+        if not self._cache_dir:
+            return
+
+        _data = json.dumps(segments).encode()
+        if self._disk_budget and len(_data) > self._disk_budget:
+            return
+        _path = self._disk_path(key)
+        _temp = f"{_path}.{threading.get_ident()}.tmp"
+        with open(_temp, "wb") as f:
+            f.write(_data)
+        os.replace(_temp, _path)
+
+        with self._lock:
+            self._drop_disk_entry(key, remove_file=False)
+            self._disk_index[key] = len(_data)
+            self._disk_bytes += len(_data)
+            while self._disk_budget and self._disk_bytes > self._disk_budget:
+                _oldest = next(iter(self._disk_index))
+                self._drop_disk_entry(_oldest)
+                self._disk_evictions += 1
+
+    def get_file_hash(self, file_name: str, compute: Callable[[str], str]) -> str:
+        """Content hash of a file, `compute(file_name)` if it changed since."""
+        _stat = os.stat(file_name)
+        _path = os.path.abspath(file_name)
+        with self._lock:
+            _entry = self._file_hashes.get(_path)
+            if _entry is not None and _entry[:2] == (_stat.st_mtime_ns, _stat.st_size):
+                self._file_hashes.move_to_end(_path)
+                self._file_hash_hits += 1
+                return _entry[2]
+
+        _hash = compute(file_name)
+        with self._lock:
+            self._file_hashes[_path] = (_stat.st_mtime_ns, _stat.st_size, _hash)
+            self._file_hashes.move_to_end(_path)
+            while len(self._file_hashes) > FILE_HASH_ENTRIES:
+                self._file_hashes.popitem(last=False)
+        return _hash
+
+    def _put_memory(self, key: str, segments: List[list]):
+        self._memory[key] = segments
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _drop_disk_entry(self, key: str, remove_file: bool = True):
+        _size = self._disk_index.pop(key, None)
+        if _size is None:
+            return
+        self._disk_bytes -= _size
+        if remove_file:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Empty both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index.keys()):
+                self._drop_disk_entry(key)
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            _lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self._max_entries,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "disk_budget_bytes": self._disk_budget,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": (
+                    (self._memory_hits + self._disk_hits) / _lookups
+                    if _lookups
+                    else 0.0
+                ),
+                "disk_evictions": self._disk_evictions,
+                "file_hashes": len(self._file_hashes),
+                "file_hash_hits": self._file_hash_hits,
+            }
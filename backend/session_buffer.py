@@ -0,0 +1,208 @@
+import os
+import threading
+
+from typing import Any, Dict, Optional
+
+
+# ---------------------------------------------------------------------------- #
+# errors
+# ---------------------------------------------------------------------------- #
+
+
+class BufferFull(Exception):
+    """Raised when appending past a buffer's `max_bytes`."""
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class BufferAccounting:
+    """Process-wide byte counts of every SpillBuffer, in memory and on disk."""
+
+    def __init__(self, memory_limit: int = 0):
+        self._memory_limit = memory_limit
+        self._lock = threading.Lock()
+
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._buffers = 0
+
+        # stats
+        self._spills = 0
+        self._rejected_bytes = 0
+        self._released_bytes = 0
+
+    def _update(
+        self, memory_delta: int = 0, disk_delta: int = 0, buffers_delta: int = 0
+    ):
+        with self._lock:
+            self._memory_bytes += memory_delta
+            self._disk_bytes += disk_delta
+            self._buffers += buffers_delta
+
+    def _count(self, spills: int = 0, rejected: int = 0, released: int = 0):
+        with self._lock:
+            self._spills += spills
+            self._rejected_bytes += rejected
+            self._released_bytes += released
+
+    def is_over_memory_limit(self) -> bool:
+        """Check if buffers should spill regardless of their own limit."""
+        return bool(self._memory_limit) and self._memory_bytes > self._memory_limit
+
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def disk_bytes(self) -> int:
+        return self._disk_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buffers": self._buffers,
+                "memory_bytes": self._memory_bytes,
+                "memory_limit_bytes": self._memory_limit,
+                "disk_bytes": self._disk_bytes,
+                "spills": self._spills,
+                "rejected_bytes": self._rejected_bytes,
+                "released_bytes": self._released_bytes,
+            }
+
+
+class SpillBuffer:
+    """
+    Append-only byte buffer with a memory cap.
+
+    Data is kept in memory until the buffer holds more than `memory_limit`
+    bytes (or the process-wide accounting is over its limit); then it is
+    moved to the append-only file `spill_path` and every later append goes
+    there too. Appending past `max_bytes` (0 = unlimited) raises BufferFull.
+    `release` frees the memory and deletes the file.
+    """
+
+    def __init__(
+        self,
+        spill_path: str,
+        memory_limit: int = 8 * 1024 * 1024,
+        max_bytes: int = 0,
+        accounting: Optional[BufferAccounting] = None,
+    ):
+        self._spill_path = spill_path
+        self._memory_limit = memory_limit
+        self._max_bytes = max_bytes
+        self._accounting = accounting or BufferAccounting()
+
+        self._memory = bytearray()
+        self._file = None
+        self._disk_bytes = 0
+        self._released = False
+        self._lock = threading.RLock()
+
+        self._accounting._update(buffers_delta=1)
+
+    def append(self, data: bytes):
+        """Add data to the end of the buffer."""
+        with self._lock:
+            if self._released:
+                raise ValueError("Buffer was released")
+            if self._max_bytes and len(self) + len(data) > self._max_bytes:
+                self._accounting._count(rejected=len(data))
+                raise BufferFull(
+                    f"Buffer full ({len(self)} + {len(data)} > {self._max_bytes} bytes)"
+                )
+
+            if self._file is not None:
+                self._file.write(data)
+                self._disk_bytes += len(data)
+                self._accounting._update(disk_delta=len(data))
+                return
+
+            self._memory += data
+            self._accounting._update(memory_delta=len(data))
+            if (
+                len(self._memory) > self._memory_limit
+                or self._accounting.is_over_memory_limit()
+            ):
+                self.spill()
+
+    def spill(self):
+        """Move the buffer to disk, later appends go to the file as well."""
+        with self._lock:
+            if self._released or self._file is not None:
+                return
+            _dir = os.path.dirname(os.path.abspath(self._spill_path))
+            os.makedirs(_dir, exist_ok=True)
+            self._file = open(self._spill_path, "ab")
+            self._file.write(self._memory)
+
+            _moved = len(self._memory)
+            self._disk_bytes += _moved
+            self._memory = bytearray()
+            self._accounting._update(memory_delta=-_moved, disk_delta=_moved)
+            self._accounting._count(spills=1)
+
+    def read(self) -> bytes:
+        """Get a copy of everything in the buffer."""
+        with self._lock:
+            if self._file is None:
+                return bytes(self._memory)
+            self._file.flush()
+            with open(self._spill_path, "rb") as f:
+                return f.read()
+
+    def release(self) -> int:
+        """Free the memory + delete the spill file. Returns the bytes freed."""
+        with self._lock:
+            if self._released:
+                return 0
+            self._released = True
+
+            _memory, _disk = len(self._memory), self._disk_bytes
+            self._memory = bytearray()
+            self._disk_bytes = 0
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                try:
+                    os.remove(self._spill_path)
+                except FileNotFoundError:
+                    pass
+
+        self._accounting._update(
+            memory_delta=-_memory, disk_delta=-_disk, buffers_delta=-1
+        )
+        self._accounting._count(released=_memory + _disk)
+        return _memory + _disk
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def is_spilled(self) -> bool:
+        return self._file is not None
+
+    def is_released(self) -> bool:
+        return self._released
+
+    def memory_bytes(self) -> int:
+        return len(self._memory)
+
+    def disk_bytes(self) -> int:
+        return self._disk_bytes
+
+    def get_spill_path(self) -> str:
+        return self._spill_path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "bytes": len(self),
+                "memory_bytes": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "spilled": self._file is not None,
+                "released": self._released,
+            }
+
+    def __len__(self):
+        return len(self._memory) + self._disk_bytes
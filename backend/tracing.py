@@ -0,0 +1,215 @@
+import contextvars
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+from typing import Any, Dict, Optional, Union
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+LOGGER_NAME = "stt"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# span the code is running in, per thread / request
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+# event -> log every nth record, events not listed are always logged
+_sample_intervals: Dict[str, int] = {}
+_sample_counters: Dict[str, "itertools.count"] = {}
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def new_id() -> str:
+    """Random 64 bit id, hex."""
+    return os.urandom(8).hex()
+
+
+def enabled(level: int = logging.DEBUG) -> bool:
+    """
+    Check if records of `level` are logged. Hot paths check this before
+    building a record, so a disabled level costs one (cached) lookup.
+    """
+    return logger.isEnabledFor(level)
+
+
+def should_sample(event: str) -> bool:
+    """Check if this occurrence of `event` is logged (every nth, per event)."""
+    _interval = _sample_intervals.get(event)
+    if _interval is None:
+        return True
+    return next(_sample_counters[event]) % _interval == 0
+
+
+def log_event(
+    event: str,
+    level: int = logging.INFO,
+    span: Optional["Span"] = None,
+    **fields,
+):
+    """
+    Log a structured record, in `span` (default: the current span) if any.
+    Nothing is built if `level` is disabled or the event is sampled out.
+    """
+    if not logger.isEnabledFor(level) or not should_sample(event):
+        return
+    if span is None:
+        span = _current_span.get()
+    if span is not None:
+        fields = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            **fields,
+        }
+    logger.log(level, event, extra={"fields": fields})
+
+
+def current_span() -> Optional["Span"]:
+    return _current_span.get()
+
+
+def start_span(
+    name: str, parent: Optional["Span"] = None, level: int = logging.INFO, **fields
+) -> "Span":
+    """A span in `parent`'s trace (default: the current span), or a new trace."""
+    if parent is None:
+        parent = _current_span.get()
+    return Span(
+        name,
+        trace_id=parent.trace_id if parent is not None else None,
+        parent_id=parent.span_id if parent is not None else None,
+        level=level,
+        **fields,
+    )
+
+
+def configure(
+    level: Union[int, str] = logging.WARNING,
+    sample_rates: Optional[Dict[str, float]] = None,
+    file_name: Optional[str] = None,
+):
+    """
+    Log records of `level` and up as json lines to `file_name` (stderr if
+    None). `sample_rates` maps events to the fraction of them that is logged.
+    """
+    _handler = (
+        logging.FileHandler(file_name)
+        if file_name
+        else logging.StreamHandler(sys.stderr)
+    )
+    _handler.setFormatter(JsonFormatter())
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_handler)
+    logger.setLevel(level if isinstance(level, int) else level.upper())
+    logger.propagate = False
+
+    _sample_intervals.clear()
+    _sample_counters.clear()
+    for event, rate in (sample_rates or {}).items():
+        if rate >= 1:
+            continue
+        _sample_intervals[event] = max(1, round(1 / rate)) if rate > 0 else sys.maxsize
+        _sample_counters[event] = itertools.count()
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class JsonFormatter(logging.Formatter):
+    """One json object per record: time, level, event, trace ids, fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        _record = {
+            "ts": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "thread": record.threadName,
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            _record["exception"] = self.formatException(record.exc_info)
+        return json.dumps(_record, default=str)
+
+
+class Span:
+    """
+    A timed unit of work in a trace. A streaming session is the root span
+    of its trace (started on `connect`), everything done for the session -
+    chunks, the recording, transcriptions - logs with its trace id.
+
+    Used as a context manager the span is the current span of the block,
+    and is ended (logged with its duration + fields) on exit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        level: int = logging.INFO,
+        **fields,
+    ):
+        self.name = name
+        self.trace_id = trace_id or new_id()
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self._level = level
+        self._fields = fields
+        self._start = time.perf_counter()
+        self._ended = False
+        self._tokens = []
+
+    def set(self, **fields):
+        """Add fields to the span's end record."""
+        self._fields.update(fields)
+
+    def log(self, event: str, level: Optional[int] = None, **fields):
+        """Log an event in this span."""
+        log_event(event, self._level if level is None else level, self, **fields)
+
+    def child(self, name: str, **fields) -> "Span":
+        return start_span(name, self, self._level, **fields)
+
+    def end(self, error: Optional[BaseException] = None):
+        """Log the span (once): duration, status + fields."""
+        if self._ended:
+            return
+        self._ended = True
+        _level = logging.WARNING if error is not None else self._level
+        if not logger.isEnabledFor(_level) or not should_sample(self.name):
+            return
+        _fields = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "status": "error" if error is not None else "ok",
+            **self._fields,
+        }
+        if error is not None:
+            _fields["error"] = f"{type(error).__name__}: {error}"
+        logger.log(_level, self.name, extra={"fields": _fields})
+
+    def __enter__(self) -> "Span":
+        self._tokens.append(_current_span.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current_span.reset(self._tokens.pop())
+        self.end(exc)
+        return False
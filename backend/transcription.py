@@ -0,0 +1,245 @@
+import re
+import threading
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from verify import VoiceActivityDetector, read_wav_samples
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+# whisper only accepts 16khz mono float32 arrays
+WHISPER_SAMPLE_RATE = 16000
+
+
+# ---------------------------------------------------------------------------- #
+# transcription functions
+#
+# shared by the flask routes (in-process model pool) and the worker processes,
+# so nothing in here may touch the flask app. segment times are in whisper
+# units (10 ms).
+# ---------------------------------------------------------------------------- #
+
+
+def format_segments(segments: List[Any], offset: int = 0) -> List[list]:
+    """Convert whisper segments into [t0, t1, text] lists."""
+    return [
+        [segment.t0 + offset, segment.t1 + offset, segment.text] for segment in segments
+    ]
+
+
+def transcribe_speech(
+    model: Any,
+    audio_data: np.ndarray,
+    vad_params: Optional[Dict[str, Any]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Transcribe only the speech regions of 16khz audio.
+
+    Silent spans are found with the VAD and never reach the model. Segment
+    times are shifted back to the start of `audio_data`.
+    `progress_callback(done, total)` is called after each speech region.
+    """
+    _vad = VoiceActivityDetector(WHISPER_SAMPLE_RATE, **(vad_params or {}))
+    _regions = _vad.detect(audio_data)
+
+    results = []
+    for i, (start, end) in enumerate(_regions):
+        _offset = start * 100 // WHISPER_SAMPLE_RATE
+        segments = model.transcribe(audio_data[start:end], **kwargs)
+        results.extend(format_segments(segments, _offset))
+        if progress_callback is not None:
+            progress_callback(i + 1, len(_regions))
+    return results
+
+
+def transcribe_audio(
+    model: Any,
+    audio_data: np.ndarray,
+    vad_params: Optional[Dict[str, Any]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Transcribe 16khz float32 audio held in memory. With `vad_params` only
+    the speech regions are transcribed.
+    """
+    if vad_params is None:
+        return format_segments(model.transcribe(audio_data, **kwargs))
+    return transcribe_speech(
+        model, audio_data, vad_params, progress_callback, **kwargs
+    )
+
+
+def transcribe_file(
+    model: Any,
+    file_name: str,
+    vad_params: Optional[Dict[str, Any]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **kwargs,
+) -> List[list]:
+    """
+    Transcribe an audio file. With `vad_params` (a dict, may be empty) only
+    the speech regions of a 16khz wav are transcribed, and
+    `progress_callback(done, total)` is called per region.
+    """
+    if vad_params is None or not file_name.endswith(".wav"):
+        return format_segments(model.transcribe(file_name, **kwargs))
+
+    audio_data, sample_rate = read_wav_samples(file_name)
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        # let whisper resample the file
+        return format_segments(model.transcribe(file_name, **kwargs))
+    return transcribe_speech(
+        model, audio_data, vad_params, progress_callback, **kwargs
+    )
+
+
+# ---------------------------------------------------------------------------- #
+# long audio
+#
+# long audio is cut at silences into pieces that overlap by a couple of
+# seconds, the pieces are transcribed in parallel and their segments
+# stitched back together: every piece owns the span between its two cut
+# points, segments are kept by the piece that owns their midpoint.
+# ---------------------------------------------------------------------------- #
+
+
+def find_silence_cut(
+    audio_data: np.ndarray,
+    target: int,
+    search: int,
+    vad_params: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Sample to cut the audio at near `target`: the middle of the longest
+    silence within `search` samples of it, `target` if there is none.
+    """
+    _start = max(0, target - search)
+    _end = min(len(audio_data), target + search)
+    _vad = VoiceActivityDetector(WHISPER_SAMPLE_RATE, **(vad_params or {}))
+    _regions = _vad.detect(audio_data[_start:_end])
+    if not _regions:
+        return target
+
+    # silences between (and around) the speech regions of the window
+    _bounds = [0] + [edge for region in _regions for edge in region] + [_end - _start]
+    _gaps = [
+        (_bounds[i], _bounds[i + 1])
+        for i in range(0, len(_bounds), 2)
+        if _bounds[i + 1] > _bounds[i]
+    ]
+    if not _gaps:
+        return target
+    # longest, then closest to the target
+    _gap = max(
+        _gaps,
+        key=lambda g: (g[1] - g[0], -abs(_start + (g[0] + g[1]) // 2 - target)),
+    )
+    return _start + (_gap[0] + _gap[1]) // 2
+
+
+def split_audio(
+    audio_data: np.ndarray,
+    piece_seconds: float = 120.0,
+    overlap_seconds: float = 2.0,
+    search_seconds: float = 15.0,
+    vad_params: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Cut 16khz audio into pieces of about `piece_seconds`.
+
+    Returns (start, end, owned_start, owned_end) samples per piece: the
+    piece covers start..end, which is the owned span between two cut points
+    plus `overlap_seconds` on both sides.
+    """
+    _piece = int(piece_seconds * WHISPER_SAMPLE_RATE)
+    _overlap = int(overlap_seconds * WHISPER_SAMPLE_RATE)
+    _search = min(int(search_seconds * WHISPER_SAMPLE_RATE), _piece // 2)
+
+    _cuts = [0]
+    while len(audio_data) - _cuts[-1] > _piece + _search:
+        _cuts.append(
+            find_silence_cut(audio_data, _cuts[-1] + _piece, _search, vad_params)
+        )
+    _cuts.append(len(audio_data))
+
+    return [
+        (max(0, start - _overlap), min(len(audio_data), end + _overlap), start, end)
+        for start, end in zip(_cuts[:-1], _cuts[1:])
+    ]
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"[^\w\s]", "", text).strip().lower()
+
+
+def stitch_segments(
+    pieces: List[Tuple[Tuple[int, int, int, int], List[list]]]
+) -> List[list]:
+    """
+    Merge the segments of overlapping pieces (times relative to each piece)
+    into one list with absolute times. Each segment is kept only by the piece
+    owning its midpoint, and a segment repeating the text of the previous
+    one across a cut is dropped.
+    """
+    results: List[list] = []
+    for i, ((start, _, owned_start, owned_end), segments) in enumerate(pieces):
+        _offset = start * 100 // WHISPER_SAMPLE_RATE
+        # the first / last piece also own anything before / after the audio
+        _owned_start = owned_start * 100 // WHISPER_SAMPLE_RATE if i else -1
+        _owned_end = (
+            owned_end * 100 // WHISPER_SAMPLE_RATE
+            if i < len(pieces) - 1
+            else float("inf")
+        )
+        for t0, t1, text in segments:
+            t0, t1 = t0 + _offset, t1 + _offset
+            if not _owned_start <= (t0 + t1) // 2 < _owned_end:
+                continue
+            if (
+                results
+                and t0 < results[-1][1]
+                and _normalize_text(text) == _normalize_text(results[-1][2])
+            ):
+                continue
+            results.append([t0, t1, text])
+    return results
+
+
+def transcribe_long_audio(
+    transcribe_piece: Callable[[np.ndarray], List[list]],
+    audio_data: np.ndarray,
+    max_parallel: int = 1,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **split_params,
+) -> List[list]:
+    """
+    Split 16khz audio at silences and transcribe up to `max_parallel` pieces
+    at once with `transcribe_piece(audio) -> segments` (one model instance /
+    worker each). `progress_callback(done, total)` is called per piece.
+    """
+    _pieces = split_audio(audio_data, **split_params)
+    _lock = threading.Lock()
+    _done = [0]
+
+    def _run(piece: Tuple[int, int, int, int]) -> List[list]:
+        segments = transcribe_piece(audio_data[piece[0] : piece[1]])
+        if progress_callback is not None:
+            with _lock:
+                _done[0] += 1
+                progress_callback(_done[0], len(_pieces))
+        return segments
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_parallel, len(_pieces))),
+        thread_name_prefix="long_audio",
+    ) as executor:
+        _results = list(executor.map(_run, _pieces))
+    return stitch_segments(list(zip(_pieces, _results)))
@@ -0,0 +1,489 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from engines import ENGINE_WHISPERCPP
+import tracing
+
+
+# ---------------------------------------------------------------------------- #
+# errors
+# ---------------------------------------------------------------------------- #
+
+
+class WorkerPoolBusy(Exception):
+    """Raised when every worker is busy and the pending queue is full."""
+
+
+class WorkerCrashed(Exception):
+    """Raised for a job whose worker process died while running it."""
+
+
+class WorkerJobError(Exception):
+    """Raised for a job that failed inside the worker process."""
+
+
+# ---------------------------------------------------------------------------- #
+# worker process
+# ---------------------------------------------------------------------------- #
+
+
+def _worker_main(
+    worker_id: int,
+    generation: int,
+    job_queue: multiprocessing.Queue,
+    result_queue: multiprocessing.Queue,
+    model_paths: Dict[str, str],
+    n_threads: int,
+    preload_models: List[str],
+    engine: str,
+    engine_params: Dict[str, Any],
+):
+    """
+    Worker process loop. Models in `preload_models` are loaded and warmed up
+    before the worker reports ready, others are loaded on first use. Models
+    are kept for the lifetime of the process. A job is a dict:
+
+    {
+        "job_id": str,
+        "model": str,
+        "media": str (file path) or np.ndarray (16khz float32),
+        "vad_params": dict or None,
+        "kwargs": dict,
+    }
+
+    Messages are (kind, worker_id, generation, job_id, payload), progress of
+    VAD jobs is reported as ("progress", ..., (done, total)). `generation`
+    tells this process apart from earlier ones with the same `worker_id`.
+    Models are loaded by `engine` (see engines.py) with `engine_params`.
+    """
+    import numpy as np
+    from engines import create_engine
+    from transcription import transcribe_audio, transcribe_file
+
+    def _load(name: str) -> Any:
+        return create_engine(engine, model_paths[name], n_threads, **engine_params)
+
+    _models: Dict[str, Any] = {}
+    for name in preload_models:
+        _models[name] = _load(name)
+        _models[name].transcribe(np.zeros(16000, dtype=np.float32))
+    result_queue.put(("ready", worker_id, generation, None, None))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        def _progress(done: int, total: int, _job_id: str = job["job_id"]):
+            result_queue.put(
+                ("progress", worker_id, generation, _job_id, (done, total))
+            )
+
+        try:
+            _model = _models.get(job["model"])
+            if _model is None:
+                _model = _load(job["model"])
+                _models[job["model"]] = _model
+
+            _media = job["media"]
+            if isinstance(_media, str):
+                segments = transcribe_file(
+                    _model,
+                    _media,
+                    job.get("vad_params"),
+                    _progress,
+                    **job.get("kwargs", {}),
+                )
+            else:
+                segments = transcribe_audio(
+                    _model,
+                    _media,
+                    job.get("vad_params"),
+                    _progress,
+                    **job.get("kwargs", {}),
+                )
+            result_queue.put(("done", worker_id, generation, job["job_id"], segments))
+        except Exception:
+            result_queue.put(
+                (
+                    "error",
+                    worker_id,
+                    generation,
+                    job["job_id"],
+                    traceback.format_exc(),
+                )
+            )
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class WorkerModel:
+    """
+    Model-like adapter that runs `transcribe` in the worker processes, for
+    code that holds on to one model (e.g. verify.WhisperCore). Returns
+    pywhispercpp style segments like the model itself would.
+    """
+
+    def __init__(
+        self,
+        pool: "TranscriptionWorkerPool",
+        model: str,
+        timeout: Optional[float] = None,
+    ):
+        self._pool = pool
+        self._model = model
+        self._timeout = timeout
+
+    def transcribe(self, media: Any, **kwargs) -> List[Any]:
+        from engines import Segment
+
+        _job = self._pool.submit(self._model, media, None, **kwargs)
+        return [
+            Segment(t0, t1, text) for t0, t1, text in _job.result(self._timeout)
+        ]
+
+
+class TranscriptionWorkerPool:
+    """
+    Pool of worker processes that own the whisper models.
+
+    Jobs are sent to an idle worker over its own queue, results come back
+    on a shared result queue read by a listener thread, so request threads
+    only ever wait on a Future. When every worker is busy, up to
+    `max_pending` jobs wait in the parent; past that `submit` raises
+    WorkerPoolBusy (backpressure). Dead workers are restarted and the job
+    they were running fails with WorkerCrashed. A worker that dies again
+    before it is ready is restarted after `restart_backoff` seconds, doubled
+    on every further death up to `max_restart_backoff`.
+    """
+
+    def __init__(
+        self,
+        model_paths: Dict[str, str],
+        num_workers: int = 2,
+        threads_per_worker: int = 2,
+        max_pending: int = 8,
+        preload_models: List[str] = None,
+        engine: str = ENGINE_WHISPERCPP,
+        engine_params: Dict[str, Any] = None,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 60.0,
+    ):
+        self._model_paths = dict(model_paths)
+        self._preload_models = [m for m in (preload_models or []) if m in model_paths]
+        self._num_workers = max(1, num_workers)
+        self._threads_per_worker = max(1, threads_per_worker)
+        self._max_pending = max(0, max_pending)
+        self._engine = engine
+        self._engine_params = dict(engine_params or {})
+        self._restart_backoff = max(0.0, restart_backoff)
+        self._max_restart_backoff = max(self._restart_backoff, max_restart_backoff)
+
+        # spawn so workers don't inherit the server's threads / sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._result_queue = self._context.Queue()
+
+        self._lock = threading.RLock()
+        self._workers: Dict[int, Any] = {}
+        self._job_queues: Dict[int, Any] = {}
+        # per start, messages of an earlier process of a worker are stale
+        self._generation = 0
+        self._generations: Dict[int, int] = {}
+        # deaths since the worker was last ready + when a dead one restarts
+        self._deaths: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._idle: Deque[int] = deque()
+        self._running_jobs: Dict[int, Tuple[str, Future]] = {}
+        self._pending: Deque[Tuple[str, Dict[str, Any], Future]] = deque()
+        self._progress_callbacks: Dict[str, Callable[[int, int], None]] = {}
+        self._closed = False
+
+        # stats
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._restarts = 0
+
+        for worker_id in range(self._num_workers):
+            self._start_worker(worker_id)
+
+        self._listener = threading.Thread(
+            target=self._listen, name="transcription_worker_listener", daemon=True
+        )
+        self._listener.start()
+
+    # ------------------------------------------------------------ #
+    # worker management
+
+    def _start_worker(self, worker_id: int):
+        """Start (or restart) a worker process."""
+        self._generation += 1
+        self._generations[worker_id] = self._generation
+        _job_queue = self._context.Queue()
+        _process = self._context.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                self._generation,
+                _job_queue,
+                self._result_queue,
+                self._model_paths,
+                self._threads_per_worker,
+                self._preload_models,
+                self._engine,
+                self._engine_params,
+            ),
+            name=f"transcription_worker_{worker_id}",
+            daemon=True,
+        )
+        _process.start()
+        self._workers[worker_id] = _process
+        self._job_queues[worker_id] = _job_queue
+
+    def _get_restart_delay(self, worker_id: int) -> float:
+        """No delay after a first death, then backing off until it is ready."""
+        _deaths = self._deaths.get(worker_id, 0)
+        if _deaths <= 1:
+            return 0.0
+        return min(
+            self._restart_backoff * 2 ** (_deaths - 2), self._max_restart_backoff
+        )
+
+    def _check_workers(self):
+        """Restart dead workers, failing the job they were running."""
+        with self._lock:
+            if self._closed:
+                return
+            _dead = [
+                worker_id
+                for worker_id, process in self._workers.items()
+                if not process.is_alive() and worker_id not in self._restart_at
+            ]
+        if _dead:
+            # results a worker sent right before it died are in the queue
+            # already, they still count
+            while True:
+                try:
+                    _message = self._result_queue.get_nowait()
+                except queue.Empty:
+                    break
+                except (EOFError, OSError):
+                    return
+                if not self._handle_message(_message):
+                    return
+
+        _now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return
+            for worker_id in _dead:
+                _running = self._running_jobs.pop(worker_id, None)
+                if _running is not None:
+                    self._failed += 1
+                    self._progress_callbacks.pop(_running[0], None)
+                    _running[1].set_exception(
+                        WorkerCrashed(f"Worker {worker_id} crashed (job {_running[0]})")
+                    )
+                while worker_id in self._idle:
+                    self._idle.remove(worker_id)
+                self._deaths[worker_id] = self._deaths.get(worker_id, 0) + 1
+                _delay = self._get_restart_delay(worker_id)
+                self._restart_at[worker_id] = _now + _delay
+                tracing.log_event(
+                    "transcription_worker_died",
+                    logging.WARNING,
+                    worker_id=worker_id,
+                    restart_seconds=_delay,
+                )
+
+            for worker_id, restart_at in list(self._restart_at.items()):
+                if restart_at <= _now:
+                    del self._restart_at[worker_id]
+                    self._restarts += 1
+                    self._start_worker(worker_id)
+
+    def _dispatch(self):
+        """Hand pending jobs to idle workers."""
+        with self._lock:
+            while self._idle and self._pending:
+                worker_id = self._idle.popleft()
+                if not self._workers[worker_id].is_alive():
+                    # back in _idle once its restarted process is ready
+                    continue
+                job_id, job, future = self._pending.popleft()
+                if not future.set_running_or_notify_cancel():
+                    # cancelled while pending
+                    self._progress_callbacks.pop(job_id, None)
+                    self._idle.appendleft(worker_id)
+                    continue
+                self._running_jobs[worker_id] = (job_id, future)
+                self._job_queues[worker_id].put(job)
+
+    def _handle_message(self, message: Tuple) -> bool:
+        """
+        Resolve the future a worker message is for, False once the pool is
+        shut down. Messages of a worker's earlier (dead) process are dropped:
+        its job was failed already and it isn't idle.
+        """
+        _kind, worker_id, generation, job_id, payload = message
+        with self._lock:
+            if self._closed:
+                return False
+            if generation != self._generations.get(worker_id):
+                return True
+            if _kind == "progress":
+                _callback = self._progress_callbacks.get(job_id)
+            else:
+                _callback = None
+                if _kind == "ready":
+                    self._deaths.pop(worker_id, None)
+                else:
+                    self._progress_callbacks.pop(job_id, None)
+                    _running = self._running_jobs.pop(worker_id, None)
+                    if _running is not None and _running[0] == job_id:
+                        if _kind == "done":
+                            self._completed += 1
+                            _running[1].set_result(payload)
+                        else:
+                            self._failed += 1
+                            _running[1].set_exception(WorkerJobError(payload))
+                if worker_id not in self._idle:
+                    self._idle.append(worker_id)
+
+        if _kind == "progress":
+            if _callback is not None:
+                try:
+                    _callback(*payload)
+                except Exception as e:
+                    tracing.log_event(
+                        "progress_callback_failed",
+                        logging.ERROR,
+                        job_id=job_id,
+                        error=str(e),
+                    )
+        else:
+            self._dispatch()
+        return True
+
+    def _listen(self):
+        """Listener thread: resolve futures as results come in."""
+        while True:
+            try:
+                _message = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                return
+            if not self._handle_message(_message):
+                return
+            if _message[0] != "progress":
+                self._check_workers()
+
+    # ------------------------------------------------------------ #
+    # job functions
+
+    def submit(
+        self,
+        model: str,
+        media: Any,
+        vad_params: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue a transcription job. `media` is a file path or a 16khz float32
+        array. The Future resolves to a list of [t0, t1, text] segments.
+        `progress_callback(done, total)` runs on the listener thread.
+
+        Raises WorkerPoolBusy if every worker is busy and `max_pending` jobs
+        are already waiting.
+        """
+        if model not in self._model_paths:
+            raise ValueError(f"Model {model} is not available to the workers")
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "model": model,
+            "media": media,
+            "vad_params": vad_params,
+            "kwargs": kwargs,
+        }
+        future = Future()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Worker pool is shut down")
+            if not self._idle and len(self._pending) >= self._max_pending:
+                self._rejected += 1
+                raise WorkerPoolBusy(
+                    f"All {self._num_workers} workers busy, "
+                    f"{len(self._pending)} jobs pending"
+                )
+            self._submitted += 1
+            self._pending.append((job_id, job, future))
+            if progress_callback is not None:
+                self._progress_callbacks[job_id] = progress_callback
+
+        self._dispatch()
+        return future
+
+    def shutdown(self, wait: bool = True, timeout: float = 5.0):
+        """Stop every worker, failing jobs that haven't finished."""
+        with self._lock:
+            self._closed = True
+            for _, _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            for job_id, future in self._running_jobs.values():
+                future.set_exception(RuntimeError("Worker pool shut down"))
+            self._running_jobs.clear()
+            self._progress_callbacks.clear()
+            for _job_queue in self._job_queues.values():
+                _job_queue.put(None)
+
+        if wait:
+            for process in self._workers.values():
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics."""
+        with self._lock:
+            return {
+                "workers": self._num_workers,
+                "threads_per_worker": self._threads_per_worker,
+                "engine": self._engine,
+                "alive": sum(1 for p in self._workers.values() if p.is_alive()),
+                "idle": len(self._idle),
+                "busy": len(self._running_jobs),
+                "pending": len(self._pending),
+                "max_pending": self._max_pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "restarts": self._restarts,
+                "restarting": len(self._restart_at),
+            }
+
+    def get_models(self) -> List[str]:
+        return list(self._model_paths.keys())
@@ -0,0 +1,338 @@
+"""
+Microbenchmarks of AudioStorage / AudioChunk, the buffers every streaming
+tick reads from.
+
+Operations:
+- append         AudioStorage.append_audio / AudioChunk.append_audio_data
+                 throughput for each block size (`--blocks`, in samples)
+- range_seconds  AudioStorage.get_audio_range_seconds latency
+- range_millis   AudioStorage.get_audio_range_millis latency
+- chunk_time     AudioChunk.get_audio_from_time latency
+- memory         bytes held per hour of audio (tracemalloc + buffer capacity)
+
+Range reads are measured on one session grown to each of `--sessions`
+seconds (1 minute to 3 hours by default), for a window at the end of the
+session (what a live tick decodes), a random window, a VAD frame and the
+whole session. The audio is synthetic float32 noise.
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --sessions 60 600 --chunk-seconds 10 30
+"""
+
+import argparse
+import itertools
+import time
+import tracemalloc
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from common import (
+    SAMPLE_RATE,
+    percentiles,
+    print_table,
+    time_calls,
+    write_results,
+)
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+CASE_KEYS = (
+    "operation",
+    "target",
+    "chunk_seconds",
+    "session_seconds",
+    "block_samples",
+    "window",
+)
+METRICS = (
+    "seconds_per_call.p50",
+    "seconds_per_call.p99",
+    "samples_per_second",
+    "bytes_per_audio_hour",
+)
+HIGHER_IS_BETTER = ("samples_per_second",)
+
+# read windows: the tail a live tick decodes, a random 15 s, a VAD frame and
+# the whole session
+WINDOWS = ("tail_15s", "random_15s", "vad_frame_30ms", "full")
+
+# seconds of source audio appended over and over
+SOURCE_SECONDS = 10
+
+
+# ---------------------------------------------------------------------------- #
+# helpers
+# ---------------------------------------------------------------------------- #
+
+
+def _new_storage(chunk_seconds: float) -> Any:
+    from verify import AudioConfig, AudioStorage
+    import pyaudio
+
+    return AudioStorage(
+        AudioConfig(SAMPLE_RATE, 1, pyaudio.paFloat32), max_chunk_duration=chunk_seconds
+    )
+
+
+def _new_chunk() -> Any:
+    from verify import AudioChunk, AudioConfig
+    import pyaudio
+
+    return AudioChunk(AudioConfig(SAMPLE_RATE, 1, pyaudio.paFloat32))
+
+
+def _row(**fields) -> Dict[str, Any]:
+    """Result row with every case field present."""
+    return {**{k: None for k in CASE_KEYS}, **fields}
+
+
+def make_window(window: str, total: float, rng: np.random.Generator) -> tuple:
+    """(start, end) seconds of a read window in a session of `total` seconds."""
+    if window == "tail_15s":
+        return max(0.0, total - 15.0), -1
+    if window == "full":
+        return 0.0, -1
+    _length = 15.0 if window == "random_15s" else 0.03
+    _start = rng.uniform(0, max(0.0, total - _length))
+    return _start, _start + _length
+
+
+def grow(storage: Any, source: np.ndarray, samples: int, block: int):
+    """Append `samples` samples of `source` (cycled) in blocks of `block`."""
+    _appended = 0
+    while _appended < samples:
+        _offset = _appended % len(source)
+        _count = min(block, samples - _appended, len(source) - _offset)
+        storage.append_audio(source[_offset : _offset + _count])
+        _appended += _count
+
+
+# ---------------------------------------------------------------------------- #
+# benchmarks
+# ---------------------------------------------------------------------------- #
+
+
+def bench_append(
+    source: np.ndarray, args: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    """Append throughput + per call latency per block size."""
+    results = []
+    _samples = int(args.append_seconds * SAMPLE_RATE)
+    for chunk_seconds in args.chunk_seconds:
+        for block in args.blocks:
+            for target in ("storage", "chunk"):
+                # a chunk holds one `chunk_seconds` piece, the storage a session
+                _total = (
+                    _samples
+                    if target == "storage"
+                    else int(chunk_seconds * SAMPLE_RATE)
+                )
+                _calls = []
+                _wall = 0.0
+                for _ in range(args.repeats):
+                    _buffer = (
+                        _new_storage(chunk_seconds)
+                        if target == "storage"
+                        else _new_chunk()
+                    )
+                    _append = (
+                        _buffer.append_audio
+                        if target == "storage"
+                        else _buffer.append_audio_data
+                    )
+                    _start = time.perf_counter()
+                    for offset in range(0, _total, block):
+                        _begin = time.perf_counter()
+                        _offset = offset % (len(source) - block)
+                        _append(source[_offset : _offset + block])
+                        _calls.append(time.perf_counter() - _begin)
+                    _wall += time.perf_counter() - _start
+
+                results.append(
+                    _row(
+                        operation="append",
+                        target=target,
+                        chunk_seconds=chunk_seconds,
+                        session_seconds=_total / SAMPLE_RATE,
+                        block_samples=block,
+                        calls=len(_calls),
+                        seconds_per_call=percentiles(_calls),
+                        samples_per_second=_total * args.repeats / _wall,
+                    )
+                )
+    return results
+
+
+def bench_memory(
+    source: np.ndarray, args: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    """Memory held by a session at every length, per hour of audio."""
+    results = []
+    for chunk_seconds in args.chunk_seconds:
+        tracemalloc.start()
+        _storage = _new_storage(chunk_seconds)
+        for session_seconds in sorted(args.sessions):
+            grow(
+                _storage,
+                source,
+                int(session_seconds * SAMPLE_RATE) - _storage.get_total_samples(),
+                args.grow_block,
+            )
+            _traced = tracemalloc.get_traced_memory()[0]
+            _capacity = sum(chunk.get_capacity() for chunk in _storage) * 4
+            results.append(
+                _row(
+                    operation="memory",
+                    target="storage",
+                    chunk_seconds=chunk_seconds,
+                    session_seconds=session_seconds,
+                    chunks=len(_storage._chunks),
+                    traced_bytes=_traced,
+                    capacity_bytes=_capacity,
+                    bytes_per_audio_hour=_traced * 3600 / session_seconds,
+                    capacity_bytes_per_audio_hour=_capacity * 3600 / session_seconds,
+                )
+            )
+        del _storage
+        tracemalloc.stop()
+    return results
+
+
+def bench_reads(
+    source: np.ndarray, args: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    """Range read latency on one session grown to every length."""
+    results = []
+    _rng = np.random.default_rng(args.seed)
+    for chunk_seconds in args.chunk_seconds:
+        _storage = _new_storage(chunk_seconds)
+        for session_seconds in sorted(args.sessions):
+            grow(
+                _storage,
+                source,
+                int(session_seconds * SAMPLE_RATE) - _storage.get_total_samples(),
+                args.grow_block,
+            )
+            _chunks = list(_storage)
+
+            for window in WINDOWS:
+                _windows = itertools.cycle(
+                    [
+                        make_window(window, session_seconds, _rng)
+                        for _ in range(args.reads)
+                    ]
+                )
+
+                def _seconds():
+                    _storage.get_audio_range_seconds(*next(_windows))
+
+                def _millis():
+                    _start, _end = next(_windows)
+                    _storage.get_audio_range_millis(
+                        int(_start * 1000), int(_end * 1000) if _end != -1 else -1
+                    )
+
+                def _chunk_time():
+                    # read from the chunk holding the window start
+                    _start, _end = next(_windows)
+                    _index = _storage._find_chunk_index(int(_start * SAMPLE_RATE))
+                    _chunks[_index].get_audio_from_time(_start, _end)
+
+                for operation, function in (
+                    ("range_seconds", _seconds),
+                    ("range_millis", _millis),
+                    ("chunk_time", _chunk_time),
+                ):
+                    _times = time_calls(function, args.reads)
+                    results.append(
+                        _row(
+                            operation=operation,
+                            target="chunk" if operation == "chunk_time" else "storage",
+                            chunk_seconds=chunk_seconds,
+                            session_seconds=session_seconds,
+                            window=window,
+                            calls=len(_times),
+                            seconds_per_call=percentiles(_times),
+                        )
+                    )
+        del _storage
+    return results
+
+
+# ---------------------------------------------------------------------------- #
+# runner
+# ---------------------------------------------------------------------------- #
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sessions",
+        nargs="+",
+        type=float,
+        default=[60.0, 600.0, 3600.0, 3 * 3600.0],
+        help="session lengths (seconds) the range reads are measured at",
+    )
+    parser.add_argument(
+        "--blocks",
+        nargs="+",
+        type=int,
+        # mic block (verify.py), 250 ms browser chunk, 1 s
+        default=[1024, 4000, 16000],
+        help="append sizes in samples",
+    )
+    parser.add_argument("--chunk-seconds", nargs="+", type=float, default=[10.0])
+    parser.add_argument("--append-seconds", type=float, default=600.0)
+    parser.add_argument("--grow-block", type=int, default=16000)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="json result file")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    _source = (
+        np.random.default_rng(args.seed).standard_normal(SOURCE_SECONDS * SAMPLE_RATE)
+        * 0.1
+    ).astype(np.float32)
+
+    results = (
+        bench_append(_source, args)
+        + bench_memory(_source, args)
+        + bench_reads(_source, args)
+    )
+
+    print_table(
+        [
+            {
+                **row,
+                "p50_us": row.get("seconds_per_call", {}).get("p50", 0) * 1e6,
+                "p99_us": row.get("seconds_per_call", {}).get("p99", 0) * 1e6,
+                "Msamples/s": (row.get("samples_per_second") or 0) / 1e6 or None,
+                "MB/audio_h": (row.get("bytes_per_audio_hour") or 0) / 2**20 or None,
+            }
+            for row in results
+        ],
+        list(CASE_KEYS) + ["p50_us", "p99_us", "Msamples/s", "MB/audio_h"],
+    )
+    _output = write_results(
+        "storage",
+        results,
+        vars(args),
+        CASE_KEYS,
+        METRICS,
+        HIGHER_IS_BETTER,
+        output=args.output,
+    )
+    print(f"\nResults written to {_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Real-time factor benchmark of the transcription paths.
+
+Measures, for every (engine, path, audio length, thread count):
+- real-time factor (wall seconds / audio seconds, lower is faster)
+- latency percentiles of the timed calls
+- peak RSS of the process running the case
+
+Paths:
+- transcribe_audio            WhisperCore.transcribe_audio on a float32 array
+- transcribe_file             WhisperCore.transcribe_file on a 16khz wav
+- update_stream               WhisperCore.update_stream after every `--step`
+                              seconds of audio, as the live mode does
+- compute_file_transcription  the backend's /stt path (model pool + VAD)
+
+Engines: `ggml` (a real local model, `--model`) and `stub`, a deterministic
+fake engine taking `--stub-rtf` seconds per audio second, which measures
+the code around the model. Every case runs in its own process so the peak
+RSS is that of the case.
+
+    python benchmarks/bench_transcription.py --engines stub --lengths 5 30
+    python benchmarks/compare.py results/old.json results/new.json
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from common import (
+    DEFAULT_MODEL_PATH,
+    SAMPLE_RATE,
+    load_engine,
+    make_speech_like_audio,
+    peak_rss_bytes,
+    percentiles,
+    print_table,
+    time_calls,
+    write_results,
+    write_wav,
+)
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+ENGINES = ("stub", "ggml")
+PATHS = (
+    "transcribe_audio",
+    "transcribe_file",
+    "update_stream",
+    "compute_file_transcription",
+)
+
+# fields identifying a case, compare.py matches results on these
+CASE_KEYS = ("engine", "path", "audio_seconds", "threads")
+METRICS = ("rtf", "latency_seconds.p50", "latency_seconds.p99", "peak_rss_bytes")
+
+
+# ---------------------------------------------------------------------------- #
+# paths
+# ---------------------------------------------------------------------------- #
+
+
+def _new_core(model: Any, decode_window: float = None) -> Any:
+    from verify import AudioConfig, AudioStorage, WhisperCore
+    import pyaudio
+
+    _storage = AudioStorage(AudioConfig(SAMPLE_RATE, 1, pyaudio.paFloat32))
+    return WhisperCore(model, _storage, max_decode_window=decode_window)
+
+
+def bench_transcribe_audio(model: Any, audio, args) -> Tuple[List[float], float]:
+    _core = _new_core(model)
+    _times = time_calls(lambda: _core.transcribe_audio(audio), args.repeats)
+    return _times, sum(_times)
+
+
+def bench_transcribe_file(model: Any, audio, args) -> Tuple[List[float], float]:
+    _core = _new_core(model)
+    with tempfile.TemporaryDirectory() as directory:
+        _file = os.path.join(directory, "bench.wav")
+        write_wav(_file, audio)
+        _times = time_calls(lambda: _core.transcribe_file(_file), args.repeats)
+    return _times, sum(_times)
+
+
+def bench_update_stream(model: Any, audio, args) -> Tuple[List[float], float]:
+    """Latency per update; the wall time is every update of every repeat."""
+    _step = int(args.step * SAMPLE_RATE)
+    _latencies = []
+    for _ in range(args.repeats):
+        _core = _new_core(model, args.decode_window)
+        for start in range(0, len(audio), _step):
+            _core._audio_storage.append_audio(audio[start : start + _step])
+            _start = time.perf_counter()
+            _core.update_stream()
+            _latencies.append(time.perf_counter() - _start)
+    return _latencies, sum(_latencies)
+
+
+def bench_compute_file_transcription(
+    model: Any, audio, args
+) -> Tuple[List[float], float]:
+    from flask import Flask
+    from model_pool import ModelCache, ModelPool
+    from api.stt import compute_file_transcription
+
+    _app = Flask("bench")
+    _app.config.update(
+        LOADED_MODELS=ModelCache(0),
+        MODEL_PATH_MAP={"bench": args.model},
+        SUPPORTED_MODELS=["bench"],
+        MODEL_POOL_SIZE=1,
+        VAD_ENABLED=not args.no_vad,
+        VAD_PARAMS={},
+        RESULT_CACHE=None,
+        LONG_AUDIO_SECONDS=args.long_audio_seconds,
+    )
+    _app.config["LOADED_MODELS"].put("bench", ModelPool("bench", lambda: model))
+
+    with tempfile.TemporaryDirectory() as directory, _app.app_context():
+        _file = os.path.join(directory, "bench.wav")
+        write_wav(_file, audio)
+        _times = time_calls(
+            lambda: compute_file_transcription("bench", _file), args.repeats
+        )
+    return _times, sum(_times)
+
+
+BENCHMARKS: Dict[str, Callable[..., Tuple[List[float], float]]] = {
+    "transcribe_audio": bench_transcribe_audio,
+    "transcribe_file": bench_transcribe_file,
+    "update_stream": bench_update_stream,
+    "compute_file_transcription": bench_compute_file_transcription,
+}
+
+
+# ---------------------------------------------------------------------------- #
+# runner
+# ---------------------------------------------------------------------------- #
+
+
+def run_case(case: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one case (in a fresh process), returns its result row."""
+    # silence the stdout of whisper + the backend, results go to the parent
+    sys.stdout = open(os.devnull, "w")
+
+    _start = time.perf_counter()
+    _model = load_engine(case["engine"], args.model, case["threads"], args.stub_rtf)
+    _load_seconds = time.perf_counter() - _start
+
+    _audio = make_speech_like_audio(case["audio_seconds"], seed=args.seed)
+    _latencies, _wall = BENCHMARKS[case["path"]](_model, _audio, args)
+
+    return {
+        **case,
+        "repeats": args.repeats,
+        "calls": len(_latencies),
+        "load_seconds": _load_seconds,
+        "rtf": _wall / (case["audio_seconds"] * args.repeats),
+        "latency_seconds": percentiles(_latencies),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def _run_case_entry(case, args, results):
+    try:
+        results.put(run_case(case, args))
+    except Exception as e:
+        results.put({**case, "error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(case: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Run a case in a spawned process so its peak RSS is its own."""
+    _context = multiprocessing.get_context("spawn")
+    _results = _context.Queue()
+    _process = _context.Process(target=_run_case_entry, args=(case, args, _results))
+    _process.start()
+    try:
+        return _results.get(timeout=args.timeout)
+    except Exception:
+        _process.kill()
+        return {**case, "error": f"No result after {args.timeout}s"}
+    finally:
+        _process.join()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    parser.add_argument(
+        "--lengths", nargs="+", type=float, default=[5.0, 30.0, 120.0]
+    )
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--stub-rtf", type=float, default=0.05)
+    parser.add_argument("--step", type=float, default=1.0, help="update_stream")
+    parser.add_argument(
+        "--decode-window", type=float, default=15.0, help="update_stream"
+    )
+    parser.add_argument("--no-vad", action="store_true")
+    parser.add_argument("--long-audio-seconds", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=1800.0)
+    parser.add_argument("--output", default=None, help="json result file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if "ggml" in args.engines and not os.path.exists(args.model):
+        print(f"No model at {args.model}, skipping the ggml engine")
+        args.engines = [e for e in args.engines if e != "ggml"]
+
+    _cases = [
+        {"engine": e, "path": p, "audio_seconds": s, "threads": t}
+        for e in args.engines
+        for p in args.paths
+        for s in args.lengths
+        for t in args.threads
+    ]
+
+    results = []
+    for i, case in enumerate(_cases):
+        print(f"[{i + 1}/{len(_cases)}] {case}", flush=True)
+        results.append(run_isolated(case, args))
+        if "error" in results[-1]:
+            print(f"  error: {results[-1]['error']}")
+
+    print()
+    print_table(
+        [
+            {
+                **row,
+                "p50_ms": row.get("latency_seconds", {}).get("p50", 0) * 1000,
+                "p99_ms": row.get("latency_seconds", {}).get("p99", 0) * 1000,
+                "rss_mb": row.get("peak_rss_bytes", 0) / (1024 * 1024),
+            }
+            for row in results
+        ],
+        list(CASE_KEYS) + ["rtf", "p50_ms", "p99_ms", "rss_mb", "error"],
+    )
+    _output = write_results(
+        "transcription", results, vars(args), CASE_KEYS, METRICS, output=args.output
+    )
+    print(f"\nResults written to {_output}")
+
+
+if __name__ == "__main__":
+    main()
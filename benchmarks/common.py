@@ -0,0 +1,221 @@
+"""
+Shared pieces of the benchmark scripts: synthetic audio, loading the
+whisper engines, timing statistics, peak RSS and the json result files.
+
+The scripts are run from the repo root (`python benchmarks/<script>.py`),
+this directory is on `sys.path` because it holds the script.
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DEFAULT_MODEL_PATH = os.path.join(REPO_ROOT, "assets", "models", "ggml-base.en.bin")
+
+SAMPLE_RATE = 16000
+
+# result file format, bump when fields change meaning
+RESULTS_VERSION = 1
+
+# make `import verify` + the backend's flat imports work
+for _path in (REPO_ROOT, BACKEND_DIR):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+
+# ---------------------------------------------------------------------------- #
+# audio
+# ---------------------------------------------------------------------------- #
+
+
+def make_speech_like_audio(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic 16khz float32 audio: 1-6 s tone bursts (the VAD sees them
+    as speech) separated by 0.5-1.5 s of low noise.
+    """
+    _rng = np.random.default_rng(seed)
+    _total = int(seconds * SAMPLE_RATE)
+    audio = (_rng.standard_normal(_total) * 0.001).astype(np.float32)
+
+    _pos = 0
+    while _pos < _total:
+        _length = min(int(_rng.uniform(1.0, 6.0) * SAMPLE_RATE), _total - _pos)
+        _t = np.arange(_length, dtype=np.float32) / SAMPLE_RATE
+        audio[_pos : _pos + _length] += 0.3 * np.sin(
+            2 * np.pi * _rng.uniform(150, 400) * _t
+        )
+        _pos += _length + int(_rng.uniform(0.5, 1.5) * SAMPLE_RATE)
+    return audio
+
+
+def write_wav(file_name: str, audio_data: np.ndarray):
+    """Write 16khz float32 audio as a 16-bit mono wav."""
+    import wave
+
+    with wave.open(file_name, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(
+            (np.clip(audio_data, -1, 1) * 32767).astype(np.int16).tobytes()
+        )
+
+
+# ---------------------------------------------------------------------------- #
+# engines
+# ---------------------------------------------------------------------------- #
+
+
+def load_engine(engine: str, model_path: str, n_threads: int, rtf: float) -> Any:
+    """
+    A loaded whisper model: the real ggml one, or the stub (engines.FakeEngine,
+    `audio seconds * rtf` seconds per call, one segment per 5 s),
+    which measures everything around the model: copies, VAD, locking,
+    pooling, formatting.
+    """
+    from engines import ENGINE_FAKE, ENGINE_WHISPERCPP, create_engine
+
+    if engine == "stub":
+        return create_engine(ENGINE_FAKE, model_path, n_threads, rtf=rtf)
+    return create_engine(ENGINE_WHISPERCPP, model_path, n_threads, print_progress=False)
+
+
+# ---------------------------------------------------------------------------- #
+# measurements
+# ---------------------------------------------------------------------------- #
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Summary statistics of a list of measurements."""
+    _values = np.asarray(values, dtype=np.float64)
+    if len(_values) == 0:
+        return {}
+    return {
+        "min": float(_values.min()),
+        "mean": float(_values.mean()),
+        "p50": float(np.percentile(_values, 50)),
+        "p90": float(np.percentile(_values, 90)),
+        "p99": float(np.percentile(_values, 99)),
+        "max": float(_values.max()),
+    }
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    _peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return _peak if sys.platform == "darwin" else _peak * 1024
+
+
+def time_calls(
+    function: Callable[[], Any], repeats: int, warmup: int = 1
+) -> List[float]:
+    """Wall-clock seconds of `repeats` calls, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        function()
+    _times = []
+    for _ in range(repeats):
+        _start = time.perf_counter()
+        function()
+        _times.append(time.perf_counter() - _start)
+    return _times
+
+
+# ---------------------------------------------------------------------------- #
+# results
+# ---------------------------------------------------------------------------- #
+
+
+def get_environment() -> Dict[str, Any]:
+    """Where the results come from, so runs can be compared fairly."""
+    try:
+        _commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        _commit = None
+    return {
+        "git_commit": _commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def write_results(
+    name: str,
+    results: List[Dict[str, Any]],
+    params: Dict[str, Any],
+    case_keys: List[str],
+    metrics: List[str],
+    higher_is_better: List[str] = (),
+    output: Optional[str] = None,
+) -> str:
+    """
+    Write a result file (default `results/<name>-<utc time>.json`).
+
+    `case_keys` are the fields of a row identifying its case, `metrics` the
+    ones compare.py checks by default (`a.b` for nested fields, lower is
+    better unless listed in `higher_is_better`).
+    """
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        _stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        output = os.path.join(RESULTS_DIR, f"{name}-{_stamp}.json")
+
+    _document = {
+        "benchmark": name,
+        "version": RESULTS_VERSION,
+        "created_at": time.time(),
+        "environment": get_environment(),
+        "params": params,
+        "case_keys": list(case_keys),
+        "metrics": list(metrics),
+        "higher_is_better": list(higher_is_better),
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(_document, f, indent=2)
+    return output
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]):
+    """Print rows as an aligned text table."""
+
+    def _format(value: Any) -> str:
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return "-" if value is None else str(value)
+
+    _cells = [[_format(row.get(c)) for c in columns] for row in rows]
+    _widths = [
+        max([len(c)] + [len(cells[i]) for cells in _cells])
+        for i, c in enumerate(columns)
+    ]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, _widths)))
+    for cells in _cells:
+        print("  ".join(v.ljust(w) for v, w in zip(cells, _widths)))
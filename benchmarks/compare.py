@@ -0,0 +1,98 @@
+"""
+Compare two result files of the same benchmark.
+
+Rows are matched on the benchmark's case fields and every metric is
+reported as new / old. Exits with 1 if any metric got worse by more than
+`--threshold`, so it can gate a change.
+
+    python benchmarks/compare.py results/base.json results/new.json
+    python benchmarks/compare.py base.json new.json --metrics rtf latency_seconds.p90
+"""
+
+import argparse
+import json
+import sys
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import print_table
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+
+def get_metric(row: Dict[str, Any], metric: str) -> Optional[float]:
+    """`a.b` -> row["a"]["b"], None if missing."""
+    _value: Any = row
+    for part in metric.split("."):
+        if not isinstance(_value, dict) or part not in _value:
+            return None
+        _value = _value[part]
+    return _value if isinstance(_value, (int, float)) else None
+
+
+def compare(
+    old: Dict[str, Any], new: Dict[str, Any], metrics: List[str], threshold: float
+) -> Tuple[List[Dict[str, Any]], int]:
+    """One row per (case, metric) found in both files + the regression count."""
+    _keys = new["case_keys"]
+    _higher_is_better = set(new.get("higher_is_better", []))
+    _old_rows = {tuple(row.get(k) for k in _keys): row for row in old["results"]}
+
+    rows, regressions = [], 0
+    for row in new["results"]:
+        _case = tuple(row.get(k) for k in _keys)
+        if _case not in _old_rows:
+            continue
+        for metric in metrics:
+            _before = get_metric(_old_rows[_case], metric)
+            _after = get_metric(row, metric)
+            if _before is None or _after is None:
+                continue
+            _ratio = _after / _before if _before else None
+            _worse = _ratio is not None and (
+                _ratio < 1 - threshold
+                if metric in _higher_is_better
+                else _ratio > 1 + threshold
+            )
+            regressions += _worse
+            rows.append(
+                {
+                    "case": " ".join(f"{k}={v}" for k, v in zip(_keys, _case)),
+                    "metric": metric,
+                    "old": _before,
+                    "new": _after,
+                    "ratio": _ratio,
+                    "": "REGRESSION" if _worse else "",
+                }
+            )
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--metrics", nargs="+", default=None)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        _old = json.load(f)
+    with open(args.new) as f:
+        _new = json.load(f)
+    if _old.get("benchmark") != _new.get("benchmark"):
+        sys.exit("Result files are from different benchmarks")
+
+    rows, regressions = compare(
+        _old, _new, args.metrics or _new.get("metrics", []), args.threshold
+    )
+    print_table(rows, ["case", "metric", "old", "new", "ratio", ""])
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Load test of the /streaming Socket.IO namespace.
+
+Opens `--clients` Socket.IO clients against a running backend. Each one
+sends `audio_chunk` payloads every `--chunk-interval` seconds, the cadence
+of the frontend's `MediaRecorder.start(250)`, for `--duration` seconds,
+then emits `stop_recording` and waits for `result_file_path`.
+
+Reported per run:
+- connection success rate, and the rate of recordings that got a result
+- per-event latency: `audio_chunk` -> the server's "received chunk" response
+- time from `stop_recording` to `result_file_path`
+- server CPU + RSS (with `--server-pid`, sampled with `ps`) and the server's
+  session buffer totals (`GET /streaming/buffers`)
+
+The chunks are webm/opus encoded by ffmpeg from `--audio` (default: the
+repo's test wav), cut into as many pieces as the recording has intervals,
+like a browser's MediaRecorder output. `--webm` sends a recording saved
+from the browser instead.
+
+    python backend/main.py &
+    python benchmarks/load_streaming.py --clients 1 10 50 --server-pid $!
+"""
+
+import argparse
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+import requests
+import socketio
+
+from common import REPO_ROOT, percentiles, print_table, write_results
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+NAMESPACE = "/streaming"
+
+CASE_KEYS = ("clients", "chunk_interval", "duration_seconds", "live_model")
+METRICS = (
+    "connect_success_rate",
+    "result_success_rate",
+    "event_latency_seconds.p90",
+    "result_latency_seconds.p90",
+    "server_cpu_percent.mean",
+    "server_rss_bytes.max",
+)
+HIGHER_IS_BETTER = ("connect_success_rate", "result_success_rate")
+
+DEFAULT_AUDIO = os.path.join(REPO_ROOT, "whispercpp-audio-test.wav")
+
+
+# ---------------------------------------------------------------------------- #
+# audio
+# ---------------------------------------------------------------------------- #
+
+
+def split_chunks(data: bytes, duration: float, interval: float) -> List[bytes]:
+    """Cut a recording into one chunk per `interval` seconds."""
+    _count = max(1, math.ceil(duration / interval))
+    _size = math.ceil(len(data) / _count)
+    return [data[i : i + _size] for i in range(0, len(data), _size)]
+
+
+def encode_chunks(audio_file: str, duration: float, interval: float) -> List[bytes]:
+    """
+    webm/opus chunks of `duration` seconds of `audio_file` (looped), one
+    per `interval` seconds.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        _output = os.path.join(directory, "load.webm")
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-stream_loop",
+                "-1",
+                "-i",
+                audio_file,
+                "-t",
+                str(duration),
+                "-ac",
+                "1",
+                "-c:a",
+                "libopus",
+                "-b:a",
+                "32k",
+                "-f",
+                "webm",
+                _output,
+            ],
+            check=True,
+        )
+        with open(_output, "rb") as f:
+            _data = f.read()
+    return split_chunks(_data, duration, interval)
+
+
+# ---------------------------------------------------------------------------- #
+# server sampling
+# ---------------------------------------------------------------------------- #
+
+
+class ServerSampler(threading.Thread):
+    """Samples a process's CPU % and RSS with `ps` every `interval` seconds."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(name="server_sampler", daemon=True)
+        self._pid = pid
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.cpu_percent: List[float] = []
+        self.rss_bytes: List[int] = []
+
+    def run(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                _output = subprocess.run(
+                    ["ps", "-o", "%cpu=,rss=", "-p", str(self._pid)],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout.split()
+            except (OSError, subprocess.CalledProcessError):
+                continue
+            self.cpu_percent.append(float(_output[0]))
+            # ps reports kilobytes
+            self.rss_bytes.append(int(_output[1]) * 1024)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ---------------------------------------------------------------------------- #
+# clients
+# ---------------------------------------------------------------------------- #
+
+
+class LoadClient:
+    """One simulated recorder."""
+
+    def __init__(self, url: str, chunks: List[bytes], args: argparse.Namespace):
+        self._url = url
+        self._chunks = chunks
+        self._args = args
+
+        self._client = socketio.Client(reconnection=False)
+        self._sent_at: List[float] = []
+        self._answered = 0
+        self._sent_lock = threading.Lock()
+        self._stopping = False
+        self._stop_sent_at = 0.0
+        self._result = threading.Event()
+
+        self.connected = False
+        self.error: Optional[str] = None
+        self.connect_seconds: Optional[float] = None
+        self.event_latencies: List[float] = []
+        self.chunk_errors = 0
+        self.result_latency: Optional[float] = None
+        self.server_errors: List[str] = []
+        self.partials = 0
+
+        self._client.on("response", self._on_response, namespace=NAMESPACE)
+        self._client.on("error", self._on_error, namespace=NAMESPACE)
+        self._client.on("result_file_path", self._on_result, namespace=NAMESPACE)
+        self._client.on("partial_segments", self._on_partial, namespace=NAMESPACE)
+
+    # ------------------------------------------------------------ #
+    # events
+
+    def _answer(self, ok: bool):
+        # the server answers every chunk, in the order they were sent
+        with self._sent_lock:
+            if self._answered >= len(self._sent_at):
+                return
+            if ok:
+                self.event_latencies.append(
+                    time.perf_counter() - self._sent_at[self._answered]
+                )
+            else:
+                self.chunk_errors += 1
+            self._answered += 1
+
+    def _on_response(self, data: Dict[str, Any]):
+        if (data or {}).get("message") == "received chunk":
+            self._answer(True)
+
+    def _on_error(self, data: Dict[str, Any]):
+        self.server_errors.append((data or {}).get("message", ""))
+        if not self._stopping:
+            self._answer(False)
+        else:
+            self._result.set()
+
+    def _on_result(self, data: Dict[str, Any]):
+        self.result_latency = time.perf_counter() - self._stop_sent_at
+        self._result.set()
+
+    def _on_partial(self, data: Dict[str, Any]):
+        self.partials += 1
+
+    # ------------------------------------------------------------ #
+    # run
+
+    def run(self):
+        _start = time.perf_counter()
+        try:
+            self._client.connect(
+                self._url,
+                namespaces=[NAMESPACE],
+                wait_timeout=self._args.connect_timeout,
+            )
+        except Exception as e:
+            self.error = f"connect: {e}"
+            return
+        self.connected = True
+        self.connect_seconds = time.perf_counter() - _start
+
+        try:
+            if self._args.live_model:
+                self._client.emit(
+                    "start_live", {"model": self._args.live_model}, namespace=NAMESPACE
+                )
+
+            # fixed cadence, a slow emit doesn't push the later chunks back
+            _next = time.perf_counter()
+            for chunk in self._chunks:
+                _next += self._args.chunk_interval
+                with self._sent_lock:
+                    self._sent_at.append(time.perf_counter())
+                self._client.emit("audio_chunk", {"chunk": chunk}, namespace=NAMESPACE)
+                time.sleep(max(0.0, _next - time.perf_counter()))
+
+            self._stopping = True
+            self._stop_sent_at = time.perf_counter()
+            self._client.emit("stop_recording", namespace=NAMESPACE)
+            if not self._result.wait(self._args.result_timeout):
+                self.error = "no result_file_path"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self._client.disconnect()
+
+
+def run_load(
+    clients: int, chunks: List[bytes], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Run `clients` recorders at once, returns the result row."""
+    _sampler = ServerSampler(args.server_pid) if args.server_pid else None
+    if _sampler is not None:
+        _sampler.start()
+
+    _clients = [LoadClient(args.url, chunks, args) for _ in range(clients)]
+    _threads = []
+    _start = time.perf_counter()
+    for i, client in enumerate(_clients):
+        _thread = threading.Thread(target=client.run, name=f"load_client_{i}")
+        _thread.start()
+        _threads.append(_thread)
+        # spread the connects over the ramp-up
+        if args.ramp_seconds and clients > 1:
+            time.sleep(args.ramp_seconds / clients)
+    for thread in _threads:
+        thread.join()
+    _wall = time.perf_counter() - _start
+
+    if _sampler is not None:
+        _sampler.stop()
+
+    try:
+        _buffers = requests.get(f"{args.url}/streaming/buffers", timeout=5).json()
+        _buffers = _buffers.get("total")
+    except (requests.RequestException, ValueError):
+        _buffers = None
+
+    _connected = [c for c in _clients if c.connected]
+    _results = [c for c in _connected if c.result_latency is not None]
+    _errors: Dict[str, int] = {}
+    for client in _clients:
+        for message in client.server_errors + ([client.error] if client.error else []):
+            _errors[message] = _errors.get(message, 0) + 1
+
+    return {
+        "clients": clients,
+        "chunk_interval": args.chunk_interval,
+        "duration_seconds": args.duration,
+        "live_model": args.live_model,
+        "wall_seconds": _wall,
+        "chunks_per_client": len(chunks),
+        "chunk_bytes": sum(len(c) for c in chunks) // max(1, len(chunks)),
+        "connect_success_rate": len(_connected) / clients,
+        "result_success_rate": len(_results) / clients,
+        "connect_seconds": percentiles([c.connect_seconds for c in _connected]),
+        "event_latency_seconds": percentiles(
+            [latency for c in _connected for latency in c.event_latencies]
+        ),
+        "chunk_errors": sum(c.chunk_errors for c in _clients),
+        "chunks_unanswered": sum(len(c._sent_at) - c._answered for c in _clients),
+        "result_latency_seconds": percentiles([c.result_latency for c in _results]),
+        "partials_per_client": (
+            sum(c.partials for c in _connected) / len(_connected) if _connected else 0
+        ),
+        "errors": _errors,
+        "server_cpu_percent": (
+            percentiles(_sampler.cpu_percent) if _sampler is not None else None
+        ),
+        "server_rss_bytes": (
+            percentiles(_sampler.rss_bytes) if _sampler is not None else None
+        ),
+        "server_buffers": _buffers,
+    }
+
+
+# ---------------------------------------------------------------------------- #
+# runner
+# ---------------------------------------------------------------------------- #
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--chunk-interval", type=float, default=0.25)
+    parser.add_argument("--ramp-seconds", type=float, default=2.0)
+    parser.add_argument("--audio", default=DEFAULT_AUDIO)
+    parser.add_argument(
+        "--webm", default=None, help="webm recording of `--duration` seconds to send"
+    )
+    parser.add_argument(
+        "--live-model", default=None, help="also emit start_live with this model"
+    )
+    parser.add_argument("--server-pid", type=int, default=None)
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument("--result-timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None, help="json result file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.webm:
+        with open(args.webm, "rb") as f:
+            _chunks = split_chunks(f.read(), args.duration, args.chunk_interval)
+    else:
+        _chunks = encode_chunks(args.audio, args.duration, args.chunk_interval)
+
+    results = []
+    for clients in args.clients:
+        print(f"{clients} client(s), {args.duration}s each", flush=True)
+        results.append(run_load(clients, _chunks, args))
+
+    print()
+    print_table(
+        [
+            {
+                **row,
+                "connect_ok": row["connect_success_rate"],
+                "result_ok": row["result_success_rate"],
+                "event_p90_ms": row["event_latency_seconds"].get("p90", 0) * 1000,
+                "result_p90_s": row["result_latency_seconds"].get("p90"),
+                "cpu_max": (row["server_cpu_percent"] or {}).get("max"),
+                "rss_max_mb": (row["server_rss_bytes"] or {}).get("max", 0) / 2**20,
+            }
+            for row in results
+        ],
+        [
+            "clients",
+            "connect_ok",
+            "result_ok",
+            "event_p90_ms",
+            "result_p90_s",
+            "chunk_errors",
+            "chunks_unanswered",
+            "cpu_max",
+            "rss_max_mb",
+        ],
+    )
+    _output = write_results(
+        "streaming_load",
+        results,
+        vars(args),
+        CASE_KEYS,
+        METRICS,
+        HIGHER_IS_BETTER,
+        output=args.output,
+    )
+    print(f"\nResults written to {_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Speech-to-text engines behind one interface, used by verify.WhisperCore and
+the backend's model pools + worker processes:
+
+- `whispercpp`: whisper.cpp through pywhispercpp, from a ggml model file
+- `fake`: no model file, takes `audio seconds * rtf` seconds (sleeping) and
+  returns deterministic segments, so the scheduling, caching
+  and streaming code around the model can be load tested / profiled
+"""
+
+import os
+import threading
+import time
+import wave
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------- #
+# constants
+# ---------------------------------------------------------------------------- #
+
+SAMPLE_RATE = 16000
+
+ENGINE_WHISPERCPP = "whispercpp"
+ENGINE_FAKE = "fake"
+
+# called with every segment as soon as it is decoded
+SegmentCallback = Callable[[Any], None]
+
+
+# ---------------------------------------------------------------------------- #
+# classes
+# ---------------------------------------------------------------------------- #
+
+
+class Segment:
+    """A transcribed segment, pywhispercpp style (times in 10 ms units)."""
+
+    def __init__(self, t0: int, t1: int, text: str):
+        self.t0 = t0
+        self.t1 = t1
+        self.text = text
+
+    def __repr__(self):
+        return f"t0={self.t0}, t1={self.t1}, text={self.text}"
+
+
+class STTEngine(ABC):
+    """
+    A speech-to-text model.
+
+    `transcribe` takes a file path or 16khz mono float32 samples and returns
+    segments with `t0`, `t1` (10 ms units) and `text`, like pywhispercpp's
+    `Model.transcribe`. Other keyword arguments are whisper params, an engine
+    ignores the ones it doesn't know. The model is loaded by `load`, or on
+    the first `transcribe`.
+
+    An instance is used by one thread at a time (the model pools hand an
+    instance to one request at a time).
+    """
+
+    NAME = ""
+
+    def __init__(self, model_path: str, n_threads: Optional[int] = None, **params):
+        self._model_path = model_path
+        self._n_threads = n_threads
+        self._params = params
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+        # stats
+        self._load_seconds = 0.0
+        self._transcriptions = 0
+        self._transcribe_seconds = 0.0
+
+    # ------------------------------------------------------------ #
+    # engine specific
+
+    @abstractmethod
+    def _load(self):
+        """Load the model."""
+
+    @abstractmethod
+    def _transcribe(
+        self,
+        media: Union[str, np.ndarray],
+        new_segment_callback: Optional[SegmentCallback],
+        **kwargs,
+    ) -> List[Any]:
+        """Transcribe with the loaded model."""
+
+    def _close(self):
+        pass
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by the loaded model."""
+        return 0
+
+    # ------------------------------------------------------------ #
+    # interface
+
+    def load(self) -> "STTEngine":
+        """Load the model (once)."""
+        with self._load_lock:
+            if not self._loaded:
+                _start = time.perf_counter()
+                self._load()
+                self._load_seconds = time.perf_counter() - _start
+                self._loaded = True
+        return self
+
+    def transcribe(
+        self,
+        media: Union[str, np.ndarray],
+        new_segment_callback: Optional[SegmentCallback] = None,
+        **kwargs,
+    ) -> List[Any]:
+        """Transcribe a file or 16khz float32 samples."""
+        if not self._loaded:
+            self.load()
+        _start = time.perf_counter()
+        try:
+            return self._transcribe(media, new_segment_callback, **kwargs)
+        finally:
+            self._transcriptions += 1
+            self._transcribe_seconds += time.perf_counter() - _start
+
+    def close(self):
+        """Free the model, the next `transcribe` loads it again."""
+        with self._load_lock:
+            if self._loaded:
+                self._close()
+                self._loaded = False
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def get_model_path(self) -> str:
+        return self._model_path
+
+    def resources(self) -> Dict[str, Any]:
+        """What the engine holds + how much it has been used."""
+        return {
+            "engine": self.NAME,
+            "model_path": self._model_path,
+            "n_threads": self._n_threads,
+            "loaded": self._loaded,
+            "memory_bytes": self.memory_usage() if self._loaded else 0,
+            "load_seconds": self._load_seconds,
+            "transcriptions": self._transcriptions,
+            "transcribe_seconds": self._transcribe_seconds,
+        }
+
+
+class WhisperCppEngine(STTEngine):
+    """whisper.cpp through pywhispercpp. `params` go to `Model` as is."""
+
+    NAME = ENGINE_WHISPERCPP
+
+    def __init__(self, model_path: str, n_threads: Optional[int] = None, **params):
+        super().__init__(model_path, n_threads, **params)
+        self._model = None
+
+    def _load(self):
+        from pywhispercpp.model import Model as WhisperModel
+
+        _params = dict(self._params)
+        if self._n_threads:
+            _params["n_threads"] = self._n_threads
+        self._model = WhisperModel(self._model_path, **_params)
+
+    def _transcribe(
+        self,
+        media: Union[str, np.ndarray],
+        new_segment_callback: Optional[SegmentCallback],
+        **kwargs,
+    ) -> List[Any]:
+        if new_segment_callback is not None:
+            kwargs["new_segment_callback"] = new_segment_callback
+        return self._model.transcribe(media, **kwargs)
+
+    def _close(self):
+        # dropping the last reference runs whisper_free in the model's __del__
+        self._model = None
+
+    def memory_usage(self) -> int:
+        """The ggml file size, the bulk of a loaded model."""
+        if not os.path.exists(self._model_path):
+            return 0
+        return os.path.getsize(self._model_path)
+
+
+class FakeEngine(STTEngine):
+    """
+    Deterministic stand-in for a whisper model, no model file needed.
+
+    `transcribe` sleeps `audio seconds * rtf` (so runs repeat on a busy
+    machine), divided by `n_threads` only with `scale_with_threads`, and
+    returns one " segment <i>" per `segment_seconds` of audio, calling
+    `new_segment_callback` as each one is "decoded". Loading sleeps
+    `load_seconds`, `memory_bytes` is what `resources` reports.
+    """
+
+    NAME = ENGINE_FAKE
+
+    def __init__(
+        self,
+        model_path: str = "",
+        n_threads: Optional[int] = None,
+        rtf: float = 0.1,
+        segment_seconds: float = 5.0,
+        load_seconds: float = 0.0,
+        memory_bytes: int = 0,
+        scale_with_threads: bool = False,
+        **params,
+    ):
+        super().__init__(model_path, n_threads, **params)
+        self._rtf = rtf
+        self._scale_with_threads = scale_with_threads
+        self._segment_seconds = segment_seconds
+        self._load_delay = load_seconds
+        self._memory_bytes = memory_bytes
+
+    @staticmethod
+    def get_duration(media: Union[str, np.ndarray]) -> float:
+        """Seconds of audio in samples or a wav file (from its header)."""
+        if isinstance(media, str):
+            with wave.open(media, "rb") as wf:
+                return wf.getnframes() / wf.getframerate()
+        return len(media) / SAMPLE_RATE
+
+    def _load(self):
+        time.sleep(self._load_delay)
+
+    def _transcribe(
+        self,
+        media: Union[str, np.ndarray],
+        new_segment_callback: Optional[SegmentCallback],
+        **kwargs,
+    ) -> List[Any]:
+        _seconds = self.get_duration(media)
+        _speed = self._rtf
+        if self._scale_with_threads:
+            _speed /= max(1, self._n_threads or 1)
+        _step = max(1, int(self._segment_seconds * 100))
+        _end = int(_seconds * 100)
+
+        segments = []
+        for i, t0 in enumerate(range(0, _end, _step)):
+            _t1 = min(t0 + _step, _end)
+            time.sleep((_t1 - t0) / 100 * _speed)
+            segments.append(Segment(t0, _t1, f" segment {i}"))
+            if new_segment_callback is not None:
+                new_segment_callback(segments[-1])
+        return segments
+
+    def memory_usage(self) -> int:
+        return self._memory_bytes
+
+
+# ---------------------------------------------------------------------------- #
+# functions
+# ---------------------------------------------------------------------------- #
+
+ENGINES: Dict[str, Type[STTEngine]] = {
+    ENGINE_WHISPERCPP: WhisperCppEngine,
+    ENGINE_FAKE: FakeEngine,
+}
+
+
+def create_engine(
+    engine: str,
+    model_path: str,
+    n_threads: Optional[int] = None,
+    load: bool = True,
+    **params,
+) -> STTEngine:
+    """An engine by name (see ENGINES), loaded unless `load` is False."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}, expected one of {list(ENGINES)}")
+    instance = ENGINES[engine](model_path, n_threads, **params)
+    return instance.load() if load else instance
@@ -11,6 +11,7 @@ setup(
     version="b_0.1",
     author="Peter Zhang",
     packages=find_packages(),  # find all packages under my_module/
+    py_modules=["verify", "engines"],  # shared audio / whisper core used by the backend
     install_requires=install_requires,
     # Tell pip that we have extra non-.py files to include
     include_package_data=True,
@@ -1,31 +1,31 @@
-import pickle
+from verify import WhisperCoreSave
 
 
 filename = "whispercpp-audio-test.save"
 
-# load data with pickle
-data = pickle.load(open(filename, "rb"))
-
-# get each chunk
-_header = data["header"]
-print(_header)
+# header + index only, then the save itself (audio memory mapped)
+index = WhisperCoreSave.read_index(filename)
+print("version", index["version"])
+print(index["audio_config"])
 print()
 
-_audio_chunks = data["audio_chunks"]
-print(f"Audio Chunk Count: {_audio_chunks['count']}")
-for i in range(len(_audio_chunks["chunks"])):
+save = WhisperCoreSave.load(filename)
+_storage = save.get_audio_storage()
+_sample_rate = index["audio_config"]["sample_rate"]
+_chunks = list(_storage)
+print(f"Audio Chunk Count: {len(_chunks)}")
+for i, (chunk, offset) in enumerate(zip(_chunks, index["chunk_offsets"])):
     print(f"Audio Chunk {i}:")
-    print(_audio_chunks["chunks"][i])
+    print(
+        f"{offset / _sample_rate:.2f}s - {(offset + len(chunk)) / _sample_rate:.2f}s",
+        chunk.get_samples(),
+    )
     print()
 print()
 
-_segment_data = data["segment_data"]
-# unpickle each segment
-for i in range(len(_segment_data["segments"])):
-    _segment_data["segments"][i] = pickle.loads(_segment_data["segments"][i])
-
-print(f"Segment Count: {len(_segment_data['segments'])}")
-for i in range(len(_segment_data["segments"])):
+_segments = save.get_segments()
+print(f"Segment Count: {len(_segments)}")
+for i, chunk in enumerate(_segments):
     print(f"Segment {i}:")
-    print(_segment_data["segments"][i])
+    print(chunk.segment.t0, chunk.segment.t1, chunk.timestamp, chunk.segment.text)
     print()
@@ -0,0 +1,43 @@
+import numpy as np
+
+from verify import AudioConfig, AudioStorage
+
+
+def make_storage(max_chunk_duration: float = 1.0) -> AudioStorage:
+    return AudioStorage(AudioConfig(16000, 1, 8), max_chunk_duration)
+
+
+def test_chunks_never_grow_past_max_chunk_samples():
+    storage = make_storage()
+    _rng = np.random.default_rng(0)
+    # blocks that don't divide the chunk size, so appends cross boundaries
+    for size in _rng.integers(1, 24000, 200):
+        storage.append_audio(np.zeros(size, dtype=np.float32))
+
+    for chunk in storage:
+        assert len(chunk) <= storage._max_chunk_samples
+        assert chunk.get_capacity() <= storage._max_chunk_samples
+
+
+def test_split_blocks_keep_samples_and_offsets():
+    storage = make_storage()
+    audio = np.arange(40000, dtype=np.float32)
+    for start in range(0, len(audio), 7000):
+        storage.append_audio(audio[start : start + 7000])
+
+    assert storage.get_total_samples() == len(audio)
+    assert [len(chunk) for chunk in storage] == [16000, 16000, 8000]
+    assert storage._chunk_offsets == [0, 16000, 32000]
+    assert np.array_equal(storage.get_audio_range_samples(0, -1), audio)
+    assert np.array_equal(
+        storage.get_audio_range_samples(15000, 17000), audio[15000:17000]
+    )
+
+
+def test_restored_chunk_growth_is_capped():
+    samples = np.zeros(10000, dtype=np.float32)
+    storage = AudioStorage.from_samples(AudioConfig(16000, 1, 8), samples, [0], 1.0)
+    storage.append_audio(np.zeros(9000, dtype=np.float32))
+
+    assert [len(chunk) for chunk in storage] == [16000, 3000]
+    assert all(chunk.get_capacity() <= 16000 for chunk in storage)
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+from flask import Flask
+
+from api.stt import get_batch_file_path, parse_batch_items
+from batch import (
+    BATCH_ITEM_FILE,
+    BATCH_ORDER_DEADLINE,
+    BATCH_ORDER_SHORTEST,
+    BatchItem,
+    TranscriptionBatch,
+)
+from jobs import JOB_STATE_DONE, JOB_STATE_FAILED
+
+
+def make_app(tmp_path, **config) -> Flask:
+    app = Flask(__name__)
+    app.config.update(AUDIO_CACHE_DIR=str(tmp_path / "cache"), **config)
+    return app
+
+
+def test_files_are_restricted_to_the_audio_cache(tmp_path):
+    app = make_app(tmp_path)
+    _cache_dir = os.path.realpath(app.config["AUDIO_CACHE_DIR"])
+    with app.app_context():
+        assert get_batch_file_path("a.wav") == os.path.join(_cache_dir, "a.wav")
+        assert get_batch_file_path(os.path.join(_cache_dir, "b.wav")) == os.path.join(
+            _cache_dir, "b.wav"
+        )
+        for path in ["../a.wav", "/etc/passwd", os.path.join(_cache_dir, "..", "a")]:
+            with pytest.raises(ValueError):
+                get_batch_file_path(path)
+
+
+def test_files_can_come_from_batch_file_dirs(tmp_path):
+    app = make_app(
+        tmp_path, BATCH_FILE_DIRS=[str(tmp_path / "in"), str(tmp_path / "more")]
+    )
+    with app.app_context():
+        assert get_batch_file_path("a.wav") == os.path.realpath(
+            tmp_path / "in" / "a.wav"
+        )
+        assert get_batch_file_path(
+            str(tmp_path / "more" / "b.wav")
+        ) == os.path.realpath(tmp_path / "more" / "b.wav")
+        with pytest.raises(ValueError):
+            get_batch_file_path(str(tmp_path / "cache" / "c.wav"))
+
+
+def test_parse_batch_items_rejects_files_outside(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        items = parse_batch_items(
+            {"files": ["a.wav", {"path": "b.wav", "deadline": 5}], "recordings": ["c"]}
+        )
+        assert [(item.index, item.kind, item.deadline) for item in items] == [
+            (0, BATCH_ITEM_FILE, None),
+            (1, BATCH_ITEM_FILE, 5.0),
+            (2, "recording", None),
+        ]
+        with pytest.raises(ValueError):
+            parse_batch_items({"files": ["../secret.wav"]})
+
+
+def run_batch(items, order, seconds):
+    _ran = []
+
+    def _run(item):
+        _ran.append(item.index)
+        return []
+
+    batch = TranscriptionBatch(
+        items, _run, order, concurrency=1, probe=lambda item: seconds[item.index]
+    )
+    batch.start()
+    _finished = list(batch.results())
+    return _ran, _finished
+
+
+def test_shortest_audio_runs_first():
+    items = [BatchItem(i, BATCH_ITEM_FILE, f"{i}.wav") for i in range(4)]
+    _ran, _ = run_batch(items, BATCH_ORDER_SHORTEST, [30.0, 10.0, 20.0, 10.0])
+    assert _ran == [1, 3, 2, 0]
+    assert [item.audio_seconds for item in items] == [30.0, 10.0, 20.0, 10.0]
+
+
+def test_earliest_deadline_runs_first():
+    items = [
+        BatchItem(0, BATCH_ITEM_FILE, "0.wav"),
+        BatchItem(1, BATCH_ITEM_FILE, "1.wav", deadline=60.0),
+        BatchItem(2, BATCH_ITEM_FILE, "2.wav", deadline=10.0),
+        BatchItem(3, BATCH_ITEM_FILE, "3.wav"),
+    ]
+    _ran, _ = run_batch(items, BATCH_ORDER_DEADLINE, [5.0, 30.0, 40.0, 1.0])
+    assert _ran == [2, 1, 3, 0]
+
+
+def test_missing_audio_fails_its_item():
+    items = [BatchItem(i, BATCH_ITEM_FILE, f"{i}.wav") for i in range(2)]
+
+    def _run(item):
+        if item.audio_seconds is None:
+            raise FileNotFoundError("File not found")
+        return [[0, 100, " a"]]
+
+    batch = TranscriptionBatch(
+        items, _run, concurrency=2, probe=lambda item: [1.0, None][item.index]
+    )
+    batch.start()
+    _states = {item.index: item.state for item in batch.results()}
+    assert _states == {0: JOB_STATE_DONE, 1: JOB_STATE_FAILED}
+    assert batch.stats()["failed"] == 1
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from verify import (
+    AudioConfig,
+    AudioStorage,
+    WhisperCoreJournal,
+    WhisperCoreSave,
+    WhisperSegment,
+    WhisperSegmentChunk,
+)
+
+
+def make_save() -> WhisperCoreSave:
+    return WhisperCoreSave(AudioStorage(AudioConfig(16000, 1, 8), 1.0), [])
+
+
+def add_segment(save: WhisperCoreSave, text: str):
+    _t0 = len(save.get_segments()) * 100
+    save.get_segments().append(
+        WhisperSegmentChunk(0.0, WhisperSegment(t0=_t0, t1=_t0 + 100, text=text))
+    )
+
+
+def get_audio(save: WhisperCoreSave) -> np.ndarray:
+    return save.get_audio_storage().get_audio_range_samples(0, -1)
+
+
+def test_compaction_journals_what_is_added_while_writing(tmp_path, monkeypatch):
+    save_file = str(tmp_path / "session.save")
+    save = make_save()
+    save.get_audio_storage().append_audio(np.ones(8000, dtype=np.float32))
+    add_segment(save, " one")
+    journal = WhisperCoreJournal(save_file, save, sync=False)
+
+    # audio + a segment arrive while the base is being written
+    _write = WhisperCoreSave._write
+
+    def _write_while_recording(self, file_name, snapshot):
+        self.get_audio_storage().append_audio(np.full(4000, 2, dtype=np.float32))
+        add_segment(self, " two")
+        _write(self, file_name, snapshot)
+
+    monkeypatch.setattr(WhisperCoreSave, "_write", _write_while_recording)
+    journal.compact(save)
+    monkeypatch.undo()
+    assert journal.stats()["samples"] == 8000
+    assert journal.stats()["segments"] == 1
+
+    journal.checkpoint(save)
+    journal.close()
+    recovered = WhisperCoreJournal.recover(save_file)
+    assert np.array_equal(get_audio(recovered), get_audio(save))
+    assert [c.segment.text for c in recovered.get_segments()] == [" one", " two"]
+
+
+def record_session(save_file: str, checkpoints: int = 3):
+    save = make_save()
+    journal = WhisperCoreJournal(save_file, save, sync=False)
+    for i in range(checkpoints):
+        save.get_audio_storage().append_audio(np.full(4000, i, dtype=np.float32))
+        add_segment(save, f" {i}")
+        journal.checkpoint(save)
+    return save, journal
+
+
+def test_recover_replays_every_checkpoint(tmp_path):
+    save_file = str(tmp_path / "session.save")
+    save, journal = record_session(save_file)
+    assert journal.stats()["checkpoints"] == 3
+
+    recovered = WhisperCoreJournal.recover(save_file)
+    assert np.array_equal(get_audio(recovered), get_audio(save))
+    assert [c.segment.text for c in recovered.get_segments()] == [" 0", " 1", " 2"]
+
+
+def test_torn_last_record_is_dropped_and_cut_on_resume(tmp_path):
+    save_file = str(tmp_path / "session.save")
+    save, journal = record_session(save_file, checkpoints=2)
+    _good = get_audio(save).copy()
+    save.get_audio_storage().append_audio(np.full(4000, 9, dtype=np.float32))
+    journal.checkpoint(save)
+    journal.close()
+
+    # crash in the middle of the last record
+    _journal_file = f"{save_file}.journal"
+    _records = list(WhisperCoreJournal.read_records(_journal_file))
+    with open(_journal_file, "r+b") as f:
+        f.truncate(_records[-1][2] - 10)
+
+    recovered = WhisperCoreJournal.recover(save_file)
+    assert np.array_equal(get_audio(recovered), _good)
+
+    # journaling continues right after the last intact record
+    resumed = WhisperCoreJournal(save_file, recovered, sync=False)
+    recovered.get_audio_storage().append_audio(np.full(4000, 7, dtype=np.float32))
+    resumed.checkpoint(recovered)
+    resumed.close()
+    assert np.array_equal(
+        get_audio(WhisperCoreJournal.recover(save_file)), get_audio(recovered)
+    )
+
+
+def test_compaction_starts_a_new_journal(tmp_path):
+    save_file = str(tmp_path / "session.save")
+    save = make_save()
+    journal = WhisperCoreJournal(
+        save_file, save, compact_ratio=0, min_compact_bytes=0, sync=False
+    )
+    for i in range(3):
+        save.get_audio_storage().append_audio(np.full(4000, i, dtype=np.float32))
+        journal.checkpoint(save)
+    assert journal.stats()["compactions"] == 4
+    assert journal.stats()["journal_bytes"] == 0
+    _base = WhisperCoreSave.load(save_file)
+    assert np.array_equal(get_audio(_base), get_audio(save))
+
+    # a session shorter than the one on disk is refused
+    with pytest.raises(FileExistsError):
+        WhisperCoreJournal(save_file, make_save(), sync=False)
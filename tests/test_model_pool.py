@@ -0,0 +1,84 @@
+import threading
+import time
+
+from flask import Flask
+
+from api.stt import get_model_pool, load_model
+from engines import ENGINE_FAKE
+from model_pool import ModelCache, ModelPool
+
+
+class Instance:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(name: str = "base.en") -> ModelPool:
+    return ModelPool(name, Instance)
+
+
+def test_put_keeps_the_pool_already_cached():
+    cache = ModelCache()
+    first, second = make_pool(), make_pool()
+    assert cache.put("base.en", first) is first
+    assert cache.put("base.en", second) is first
+    assert cache["base.en"] is first
+
+
+def test_remove_only_removes_the_given_pool():
+    cache = ModelCache()
+    first, second = make_pool(), make_pool()
+    cache.put("base.en", first)
+    assert not cache.remove("base.en", second)
+    assert "base.en" in cache
+    assert cache.remove("base.en", first)
+    assert first.is_closed()
+
+
+def make_app() -> Flask:
+    app = Flask(__name__)
+    app.config.update(
+        LOADED_MODELS=ModelCache(),
+        SUPPORTED_MODELS=["base.en"],
+        MODEL_PATH_MAP={"base.en": ""},
+        STT_ENGINE=ENGINE_FAKE,
+        WHISPER_LOGS=False,
+    )
+    return app
+
+
+def test_concurrent_loads_build_one_pool(monkeypatch):
+    app = make_app()
+    _put = ModelCache.put
+
+    def _slow_put(self, name, pool):
+        time.sleep(0.05)
+        return _put(self, name, pool)
+
+    monkeypatch.setattr(ModelCache, "put", _slow_put)
+    _loaded = []
+
+    def _load():
+        with app.app_context():
+            _loaded.append(load_model("base.en"))
+
+    _threads = [threading.Thread(target=_load) for _ in range(4)]
+    for thread in _threads:
+        thread.start()
+    for thread in _threads:
+        thread.join()
+    assert sorted(_loaded) == [False, False, False, True]
+    assert len(app.config["LOADED_MODELS"]) == 1
+
+
+def test_evicted_model_is_loaded_again():
+    app = make_app()
+    with app.app_context():
+        load_model("base.en")
+        app.config["LOADED_MODELS"].remove("base.en")
+        _pool = get_model_pool("base.en")
+        assert not _pool.is_closed()
+        assert app.config["LOADED_MODELS"]["base.en"] is _pool
@@ -0,0 +1,122 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from api.stt import get_result_cache_key
+from engines import ENGINE_FAKE, ENGINE_WHISPERCPP
+from result_cache import ResultCache, hash_file, make_cache_key
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    _path = tmp_path / "ggml-base.en.bin"
+    _path.write_bytes(b"x" * 1000)
+    return _path
+
+
+def make_app(model_path, **config) -> Flask:
+    app = Flask(__name__)
+    app.config.update(
+        MODEL_PATH_MAP={"base.en": str(model_path)}, VAD_ENABLED=False, **config
+    )
+    return app
+
+
+def get_key(app: Flask, audio: np.ndarray) -> str:
+    with app.app_context():
+        return get_result_cache_key("base.en", audio, {"language": "en"})
+
+
+def test_engines_do_not_share_entries(model_path):
+    audio = np.zeros(16000, dtype=np.float32)
+    _whispercpp = get_key(make_app(model_path, STT_ENGINE=ENGINE_WHISPERCPP), audio)
+    _fake = get_key(make_app(model_path, STT_ENGINE=ENGINE_FAKE), audio)
+    assert _whispercpp != _fake
+    assert _whispercpp == get_key(make_app(model_path), audio)
+    assert _fake != get_key(
+        make_app(model_path, STT_ENGINE=ENGINE_FAKE, STT_ENGINE_PARAMS={"rtf": 0.5}),
+        audio,
+    )
+
+
+def test_key_changes_with_model_file_and_long_audio_split(model_path):
+    audio = np.zeros(16000, dtype=np.float32)
+    app = make_app(model_path)
+    _key = get_key(app, audio)
+    assert _key == get_key(app, audio)
+    assert _key != get_key(make_app(model_path, LONG_AUDIO_SECONDS=600), audio)
+
+    _stat = os.stat(model_path)
+    os.utime(model_path, ns=(_stat.st_atime_ns, _stat.st_mtime_ns + 1))
+    assert _key != get_key(app, audio)
+
+
+def write_wav(path, samples: np.ndarray, sample_rate: int = 16000):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((samples * 32767).astype("<i2").tobytes())
+
+
+def test_wav_and_its_samples_share_a_key(model_path, tmp_path):
+    audio = np.zeros(16000, dtype=np.float32)
+    write_wav(tmp_path / "a.wav", audio)
+    app = make_app(model_path, RESULT_CACHE=ResultCache())
+    assert get_key(app, str(tmp_path / "a.wav")) == get_key(app, audio)
+
+
+def test_params_are_keyed_in_any_order():
+    assert make_cache_key("h", "base.en", {"a": 1, "b": 2}) == make_cache_key(
+        "h", "base.en", {"b": 2, "a": 1}
+    )
+    assert make_cache_key("h", "base.en", {"a": 1}) != make_cache_key(
+        "h", "tiny.en", {"a": 1}
+    )
+
+
+def test_disk_tier_outlives_memory_tier(tmp_path):
+    cache = ResultCache(max_entries=1, cache_dir=str(tmp_path))
+    cache.put("a", [[0, 100, " a"]])
+    cache.put("b", [[0, 100, " b"]])
+    assert cache.stats()["memory_entries"] == 1
+    assert cache.get("a") == [[0, 100, " a"]]
+    assert cache.stats()["disk_hits"] == 1
+
+    # a new cache picks up the files
+    assert ResultCache(cache_dir=str(tmp_path)).get("b") == [[0, 100, " b"]]
+    assert cache.get("c") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_budget_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(max_entries=1, cache_dir=str(tmp_path), disk_budget=40)
+    for key in "abc":
+        cache.put(key, [[0, 100, f" {key}"]])
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.get("a") is None
+
+
+def test_file_hash_is_computed_again_once_the_file_changes(tmp_path):
+    cache = ResultCache()
+    _path = tmp_path / "a.bin"
+    _path.write_bytes(b"one")
+    assert cache.get_file_hash(str(_path), hash_file) == hash_file(str(_path))
+
+    _computed = []
+
+    def _compute(file_name):
+        _computed.append(file_name)
+        return hash_file(file_name)
+
+    _first = cache.get_file_hash(str(_path), _compute)
+    assert _computed == []
+    assert cache.stats()["file_hash_hits"] == 1
+
+    _path.write_bytes(b"other")
+    assert cache.get_file_hash(str(_path), _compute) != _first
+    assert _computed == [str(_path)]
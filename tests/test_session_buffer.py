@@ -0,0 +1,119 @@
+import os
+import time
+
+import pytest
+
+from backend import (
+    CACHE_AUDIO_DATA,
+    CACHE_CONNECTED,
+    CACHE_LAST_ACTIVE,
+    CACHE_LIVE_TRANSCRIBER,
+    CACHE_RECORDER,
+)
+from reaper import SessionReaper
+from session_buffer import BufferAccounting, BufferFull, SpillBuffer
+
+
+def test_spills_past_memory_limit(tmp_path):
+    accounting = BufferAccounting()
+    buffer = SpillBuffer(str(tmp_path / "a.chunks"), 10, accounting=accounting)
+    buffer.append(b"x" * 8)
+    assert not buffer.is_spilled()
+    assert accounting.memory_bytes() == 8
+
+    buffer.append(b"y" * 8)
+    buffer.append(b"z" * 4)
+    assert buffer.is_spilled()
+    assert buffer.read() == b"x" * 8 + b"y" * 8 + b"z" * 4
+    assert accounting.stats()["memory_bytes"] == 0
+    assert accounting.stats()["disk_bytes"] == 20
+    assert accounting.stats()["spills"] == 1
+
+
+def test_spills_when_every_buffer_together_is_over_the_limit(tmp_path):
+    accounting = BufferAccounting(memory_limit=15)
+    first = SpillBuffer(str(tmp_path / "a.chunks"), 100, accounting=accounting)
+    second = SpillBuffer(str(tmp_path / "b.chunks"), 100, accounting=accounting)
+    first.append(b"x" * 10)
+    second.append(b"x" * 10)
+    assert not first.is_spilled()
+    assert second.is_spilled()
+    assert accounting.memory_bytes() == 10
+
+
+def test_release_frees_memory_and_file(tmp_path):
+    accounting = BufferAccounting()
+    buffer = SpillBuffer(
+        str(tmp_path / "a.chunks"), 10, max_bytes=30, accounting=accounting
+    )
+    buffer.append(b"x" * 20)
+    with pytest.raises(BufferFull):
+        buffer.append(b"x" * 20)
+
+    assert buffer.release() == 20
+    assert buffer.release() == 0
+    assert not os.path.exists(buffer.get_spill_path())
+    assert accounting.stats() == {
+        "buffers": 0,
+        "memory_bytes": 0,
+        "memory_limit_bytes": 0,
+        "disk_bytes": 0,
+        "spills": 1,
+        "rejected_bytes": 20,
+        "released_bytes": 20,
+    }
+    with pytest.raises(ValueError):
+        buffer.append(b"x")
+
+
+def make_session(buffer: SpillBuffer, connected: bool, age: float):
+    return {
+        CACHE_AUDIO_DATA: buffer,
+        CACHE_RECORDER: None,
+        CACHE_LIVE_TRANSCRIBER: None,
+        CACHE_CONNECTED: connected,
+        CACHE_LAST_ACTIVE: time.time() - age,
+    }
+
+
+def test_reaper_reclaims_idle_sessions(tmp_path):
+    accounting = BufferAccounting()
+    _spill_dir = tmp_path / "spill"
+    sessions = {}
+    for sid, connected, age in [
+        ("a", True, 1000),
+        ("b", False, 1000),
+        ("c", False, 1),
+    ]:
+        buffer = SpillBuffer(
+            str(_spill_dir / f"{sid}.chunks"), 10, accounting=accounting
+        )
+        buffer.append(b"x" * 100)
+        sessions[sid] = make_session(buffer, connected, age)
+    _released = sessions["b"][CACHE_AUDIO_DATA]
+
+    reaper = SessionReaper(sessions, [str(tmp_path), str(_spill_dir)], ttl=100)
+    assert reaper.run_once() == 100
+    assert sorted(sessions) == ["a", "c"]
+    assert _released.is_released()
+    assert sorted(os.listdir(_spill_dir)) == ["a.chunks", "c.chunks"]
+    assert accounting.stats()["disk_bytes"] == 200
+    assert accounting.stats()["released_bytes"] == 100
+    assert reaper.stats()["reclaimed_bytes_by_reason"] == {"ttl": 100, "budget": 0}
+
+
+def test_reaper_keeps_pinned_sessions(tmp_path):
+    buffer = SpillBuffer(str(tmp_path / "a.chunks"), 10)
+    buffer.append(b"x" * 100)
+    sessions = {"a": make_session(buffer, False, 1000)}
+    reaper = SessionReaper(sessions, [str(tmp_path)], ttl=100)
+
+    with reaper.pinned("a"):
+        assert reaper.run_once() == 0
+        assert "a" in sessions
+    # unpinning marks the session as used
+    assert reaper.run_once() == 0
+
+    sessions["a"][CACHE_LAST_ACTIVE] = time.time() - 1000
+    assert reaper.run_once() == 100
+    assert buffer.is_released()
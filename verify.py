@@ -5,22 +5,56 @@ import os
 import time
 import numpy as np
 import threading
+import bisect
 
+import io
 import json
+import struct
+import tempfile
+import zlib
 
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
 from functools import partial
 from queue import Queue
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Callable, Iterator, Optional
 
-from pywhispercpp.model import Model as WhisperModel
 from pywhispercpp.model import Segment as WhisperSegment
+from engines import ENGINE_WHISPERCPP, create_engine
 import traceback
 
 
 import pickle
 
 
+# ------------------------------------------------------------ #
+# constants
+# ------------------------------------------------------------ #
+
+# WhisperCoreSave file format
+SAVE_MAGIC = b"WhisperCoreSave"
+SAVE_VERSION = 1
+SAVE_HEADER_SIZE = len(SAVE_MAGIC) + 1 + 16
+SAVE_ALIGNMENT = 64
+SAVE_SEGMENT_DTYPE = np.dtype(
+    [
+        ("t0", "<i8"),
+        ("t1", "<i8"),
+        ("timestamp", "<f8"),
+        ("text_offset", "<u8"),
+        ("text_length", "<u4"),
+    ]
+)
+
+# WhisperCoreJournal file format
+JOURNAL_MAGIC = b"WhisperCoreJrnl"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER_SIZE = len(JOURNAL_MAGIC) + 1
+JOURNAL_RECORD_HEADER = struct.Struct("<BII")  # kind, payload length, crc32
+JOURNAL_AUDIO = 1
+JOURNAL_SEGMENTS = 2
+
+
 # ------------------------------------------------------------ #
 # API functions
 # ------------------------------------------------------------ #
@@ -313,36 +347,105 @@ class AsyncMicrophone(threading.Thread):
 
 
 class AudioChunk:
-    """Audio chunk with proper timing calculations."""
+    """
+    Audio chunk with proper timing calculations.
+
+    Samples live in a preallocated float32 buffer that doubles in capacity
+    when it runs out of room, so appending is amortized O(1) instead of a
+    full copy per microphone block. Only the first `_num_samples` entries of
+    the buffer are valid.
+    """
+
+    # minimum capacity (in samples) for a freshly allocated buffer
+    MIN_CAPACITY = 4096
 
     def __init__(
         self,
         audio_config: AudioConfig,
         default_data: np.ndarray = None,
         start_time: float = 0.0,
+        capacity: int = 0,
+        max_capacity: int = 0,
     ):
         self._audio_config = audio_config
         self._sample_rate = audio_config.sample_rate
 
+        # growth never goes past this (0 = unbounded), the storage never
+        # appends more than it to one chunk
+        self._max_capacity = max_capacity
+
         # Store audio as float32 [-1.0, 1.0]
-        self._samples = (
-            default_data if default_data is not None else np.array([], dtype=np.float32)
+        _initial = (
+            np.asarray(default_data, dtype=np.float32)
+            if default_data is not None
+            else np.array([], dtype=np.float32)
+        )
+        self._num_samples = len(_initial)
+        self._buffer = np.empty(
+            max(capacity, self._num_samples, self.MIN_CAPACITY), dtype=np.float32
         )
+        self._buffer[: self._num_samples] = _initial
 
         # Time tracking (in seconds)
         self._start_time = start_time
-        self._num_samples = len(self._samples)
         self._end_time = start_time + (self._num_samples / self._sample_rate)
 
+    @classmethod
+    def from_samples(
+        cls,
+        audio_config: AudioConfig,
+        samples: np.ndarray,
+        start_time: float = 0.0,
+        max_capacity: int = 0,
+    ) -> "AudioChunk":
+        """
+        Chunk over existing samples (e.g. an np.memmap of a save), nothing is
+        copied. The first append copies them into a new, larger buffer.
+        """
+        chunk = cls(
+            audio_config, start_time=start_time, capacity=0, max_capacity=max_capacity
+        )
+        chunk._buffer = samples
+        chunk._num_samples = len(samples)
+        chunk._end_time = start_time + (len(samples) / chunk._sample_rate)
+        return chunk
+
+    def _reserve(self, required: int):
+        """Grow the buffer (by doubling) until it can hold `required` samples."""
+        capacity = len(self._buffer)
+        if required <= capacity:
+            return
+
+        while capacity < required:
+            capacity *= 2
+        if self._max_capacity:
+            capacity = min(capacity, max(required, self._max_capacity))
+
+        _new_buffer = np.empty(capacity, dtype=np.float32)
+        _new_buffer[: self._num_samples] = self._buffer[: self._num_samples]
+        self._buffer = _new_buffer
+
     def append_audio_data(self, audio_data: np.ndarray):
         """Append audio data to the chunk."""
         if len(audio_data) == 0:
             return
 
-        self._samples = np.concatenate((self._samples, audio_data))
-        self._num_samples = len(self._samples)
+        _count = len(audio_data)
+        self._reserve(self._num_samples + _count)
+        self._buffer[self._num_samples : self._num_samples + _count] = audio_data
+
+        self._num_samples += _count
         self._end_time = self._start_time + (self._num_samples / self._sample_rate)
 
+    def get_audio_from_samples(self, start_sample: int, end_sample: int) -> np.ndarray:
+        """
+        Get a view of the samples in [start_sample, end_sample), relative to
+        the start of this chunk. No data is copied.
+        """
+        start_sample = max(0, min(start_sample, self._num_samples))
+        end_sample = max(start_sample, min(end_sample, self._num_samples))
+        return self._buffer[start_sample:end_sample]
+
     def get_audio_from_time(
         self, start_time: float, end_time: float = -1
     ) -> np.ndarray:
@@ -363,20 +466,20 @@ class AudioChunk:
         start_sample = int((start_time - self._start_time) * self._sample_rate)
         end_sample = int((end_time - self._start_time) * self._sample_rate)
 
-        # Ensure valid indices
-        start_sample = max(0, min(start_sample, self._num_samples))
-        end_sample = max(start_sample, min(end_sample, self._num_samples))
-
         # Return the slice
-        return self._samples[start_sample:end_sample]
+        return self.get_audio_from_samples(start_sample, end_sample)
 
     def get_audio_duration(self) -> float:
         """Get duration of the audio in seconds."""
         return self._num_samples / self._sample_rate
 
     def get_samples(self) -> np.ndarray:
-        """Get all audio samples."""
-        return self._samples
+        """Get all audio samples (a view into the chunk buffer)."""
+        return self._buffer[: self._num_samples]
+
+    def get_capacity(self) -> int:
+        """Get the number of samples the chunk can hold before growing."""
+        return len(self._buffer)
 
     def __len__(self):
         """Get the number of samples."""
@@ -384,17 +487,71 @@ class AudioChunk:
 
 
 class AudioStorage:
-    """Audio storage with correct timing and sample handling."""
+    """
+    Audio storage with correct timing and sample handling.
+
+    Audio is split into chunks of at most `max_chunk_duration` seconds.
+    `_chunk_offsets` holds the absolute sample offset at which each chunk
+    starts, so a range lookup is a binary search instead of a scan over
+    every chunk. Ranges that fall inside a single chunk are returned as
+    zero-copy views; ranges that span chunks are copied once into a single
+    preallocated array.
+    """
 
     def __init__(self, audio_config: AudioConfig, max_chunk_duration: float = 10.0):
         self._audio_config = audio_config
         self._sample_rate = audio_config.sample_rate
         self._total_duration = 0.0
+        self._total_samples = 0
 
         # Audio storage in chunks
-        self._chunks = []
+        self._chunks: List[AudioChunk] = []
+        self._chunk_offsets: List[int] = []
         self._audio_cache_lock = threading.RLock()
         self._max_chunk_duration = max_chunk_duration  # seconds per chunk
+        self._max_chunk_samples = max(1, int(max_chunk_duration * self._sample_rate))
+
+    @classmethod
+    def from_samples(
+        cls,
+        audio_config: AudioConfig,
+        samples: np.ndarray,
+        chunk_offsets: List[int],
+        max_chunk_duration: float = 10.0,
+    ) -> "AudioStorage":
+        """
+        Storage over existing samples, split at `chunk_offsets`. The chunks
+        are views, so a memory mapped save is only read where it is used.
+        """
+        storage = cls(audio_config, max_chunk_duration)
+        _bounds = list(chunk_offsets) + [len(samples)]
+        for start, end in zip(_bounds[:-1], _bounds[1:]):
+            if end <= start:
+                continue
+            storage._chunks.append(
+                AudioChunk.from_samples(
+                    audio_config,
+                    samples[start:end],
+                    start / storage._sample_rate,
+                    storage._max_chunk_samples,
+                )
+            )
+            storage._chunk_offsets.append(start)
+        storage._total_samples = len(samples)
+        storage._total_duration = len(samples) / storage._sample_rate
+        return storage
+
+    def _new_chunk(self) -> AudioChunk:
+        """Create a new chunk starting at the current end of the storage."""
+        chunk = AudioChunk(
+            self._audio_config,
+            start_time=self._total_samples / self._sample_rate,
+            capacity=self._max_chunk_samples,
+            max_capacity=self._max_chunk_samples,
+        )
+        self._chunks.append(chunk)
+        self._chunk_offsets.append(self._total_samples)
+        return chunk
 
     def append_audio(self, audio_data: np.ndarray):
         """Add audio data to storage."""
@@ -402,51 +559,78 @@ class AudioStorage:
             return
 
         with self._audio_cache_lock:
-            # Create first chunk if needed
-            if not self._chunks:
-                self._chunks.append(AudioChunk(self._audio_config))
-
-            # If current chunk is full, create a new one
-            current_chunk = self._chunks[-1]
-            if current_chunk.get_audio_duration() >= self._max_chunk_duration:
-                new_chunk = AudioChunk(
-                    self._audio_config, start_time=self._total_duration
+            # split the block at chunk boundaries, so a chunk never grows past
+            # its preallocated `max_chunk_samples` buffer
+            _offset = 0
+            while _offset < len(audio_data):
+                # create the first chunk / a new one once the current is full
+                if not self._chunks or len(self._chunks[-1]) >= self._max_chunk_samples:
+                    self._new_chunk()
+                current_chunk = self._chunks[-1]
+
+                # add as much of the data as fits
+                _count = min(
+                    len(audio_data) - _offset,
+                    self._max_chunk_samples - len(current_chunk),
                 )
-                self._chunks.append(new_chunk)
-                current_chunk = new_chunk
-
-            # Add the data
-            current_chunk.append_audio_data(audio_data)
+                current_chunk.append_audio_data(audio_data[_offset : _offset + _count])
+                _offset += _count
+                self._total_samples += _count
 
             # Update total duration
-            added_duration = len(audio_data) / self._sample_rate
-            self._total_duration += added_duration
+            self._total_duration = self._total_samples / self._sample_rate
 
-    def get_audio_range_seconds(
-        self, start_sec: float, end_sec: float = -1
+    def _find_chunk_index(self, sample: int) -> int:
+        """Find the index of the chunk containing the given absolute sample."""
+        return max(0, bisect.bisect_right(self._chunk_offsets, sample) - 1)
+
+    def get_audio_range_samples(
+        self, start_sample: int, end_sample: int = -1
     ) -> np.ndarray:
-        """Get audio data for a time range in seconds."""
+        """
+        Get audio data for an absolute sample range [start_sample, end_sample).
+
+        Returns a view when the range lies inside one chunk, otherwise a
+        single copy of the spanned data.
+        """
         with self._audio_cache_lock:
-            # Handle default end time
-            if end_sec == -1:
-                end_sec = self._total_duration
-
-            # Validate inputs
-            if start_sec < 0:
-                start_sec = 0
-            if end_sec > self._total_duration:
-                end_sec = self._total_duration
-            if start_sec >= end_sec:
+            # Handle default end sample + clamp inputs
+            if end_sample == -1 or end_sample > self._total_samples:
+                end_sample = self._total_samples
+            start_sample = max(0, start_sample)
+            if start_sample >= end_sample:
                 return np.array([], dtype=np.float32)
 
-            # Collect audio from chunks
-            result = np.array([], dtype=np.float32)
-            for chunk in self._chunks:
-                chunk_data = chunk.get_audio_from_time(start_sec, end_sec)
-                if len(chunk_data) > 0:
-                    result = np.concatenate((result, chunk_data))
+            first = self._find_chunk_index(start_sample)
+            last = self._find_chunk_index(end_sample - 1)
+
+            # fast path: range fits into a single chunk
+            if first == last:
+                _offset = self._chunk_offsets[first]
+                return self._chunks[first].get_audio_from_samples(
+                    start_sample - _offset, end_sample - _offset
+                )
+
+            # slow path: one copy into a preallocated array
+            result = np.empty(end_sample - start_sample, dtype=np.float32)
+            _cursor = 0
+            for i in range(first, last + 1):
+                _offset = self._chunk_offsets[i]
+                _data = self._chunks[i].get_audio_from_samples(
+                    start_sample - _offset, end_sample - _offset
+                )
+                result[_cursor : _cursor + len(_data)] = _data
+                _cursor += len(_data)
+
+            return result[:_cursor]
 
-            return result
+    def get_audio_range_seconds(
+        self, start_sec: float, end_sec: float = -1
+    ) -> np.ndarray:
+        """Get audio data for a time range in seconds."""
+        start_sample = int(max(0, start_sec) * self._sample_rate)
+        end_sample = int(end_sec * self._sample_rate) if end_sec != -1 else -1
+        return self.get_audio_range_samples(start_sample, end_sample)
 
     def get_audio_range_millis(self, start_ms: int, end_ms: int = -1) -> np.ndarray:
         """Get audio data for a time range in milliseconds."""
@@ -455,6 +639,11 @@ class AudioStorage:
         end_sec = end_ms / 1000.0 if end_ms != -1 else -1
         return self.get_audio_range_seconds(start_sec, end_sec)
 
+    def get_total_samples(self) -> int:
+        """Get total number of samples stored."""
+        with self._audio_cache_lock:
+            return self._total_samples
+
     def get_total_duration_seconds(self) -> float:
         """Get total duration of all audio in seconds."""
         with self._audio_cache_lock:
@@ -478,64 +667,755 @@ class AudioStorage:
             yield chunk
 
 
+class VoiceActivityDetector:
+    """
+    Vectorized energy + zero-crossing voice activity detector.
+
+    Audio is cut into fixed frames and two features are computed per frame
+    with NumPy (no python loop over samples):
+    - energy, in dB relative to an adaptive noise floor
+    - zero-crossing rate, which picks up quiet fricatives ("s", "f")
+
+    Hysteresis is applied on the energy: a region starts only where a frame
+    crosses the high threshold, but it is allowed to extend through frames
+    above the low threshold. Regions shorter than `min_speech_ms` are dropped,
+    gaps shorter than `min_silence_ms` are merged, and `padding_ms` is added on
+    both sides so word edges are not clipped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        high_threshold_db: float = 12.0,
+        low_threshold_db: float = 6.0,
+        zcr_threshold: float = 0.25,
+        min_noise_floor_db: float = -70.0,
+        max_noise_floor_db: float = -45.0,
+        min_speech_ms: int = 200,
+        min_silence_ms: int = 400,
+        padding_ms: int = 200,
+    ):
+        self._sample_rate = sample_rate
+        self._frame_size = max(1, int(sample_rate * frame_ms / 1000))
+        self._high_threshold_db = high_threshold_db
+        self._low_threshold_db = low_threshold_db
+        self._zcr_threshold = zcr_threshold
+        self._min_noise_floor_db = min_noise_floor_db
+        self._max_noise_floor_db = max_noise_floor_db
+        self._min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self._min_silence_frames = max(1, int(min_silence_ms / frame_ms))
+        self._padding = int(sample_rate * padding_ms / 1000)
+
+    # ------------------------------------------------------------ #
+    # features
+
+    def frame_features(self, audio_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get per-frame (energy in dB, zero-crossing rate) for the audio."""
+        _num_frames = len(audio_data) // self._frame_size
+        if _num_frames == 0:
+            return np.array([], dtype=np.float32), np.array([], dtype=np.float32)
+
+        frames = audio_data[: _num_frames * self._frame_size].reshape(
+            _num_frames, self._frame_size
+        )
+        energy = np.mean(np.square(frames, dtype=np.float32), axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-10)
+
+        _signs = np.signbit(frames)
+        zcr = np.count_nonzero(_signs[:, 1:] != _signs[:, :-1], axis=1) / (
+            self._frame_size - 1 if self._frame_size > 1 else 1
+        )
+        return energy_db.astype(np.float32), zcr.astype(np.float32)
+
+    def _speech_frames(self, audio_data: np.ndarray) -> np.ndarray:
+        """Get a boolean mask of speech frames (hysteresis applied)."""
+        energy_db, zcr = self.frame_features(audio_data)
+        if len(energy_db) == 0:
+            return np.array([], dtype=bool)
+
+        # noise floor from the quietest 10% of frames, clamped so a clip that
+        # is speech from start to end still has a sensible floor
+        noise_floor = float(
+            np.clip(
+                np.percentile(energy_db, 10),
+                self._min_noise_floor_db,
+                self._max_noise_floor_db,
+            )
+        )
+        high = energy_db > noise_floor + self._high_threshold_db
+        low = energy_db > noise_floor + self._low_threshold_db
+
+        # quiet but noisy frames above the low threshold are likely fricatives
+        high |= low & (zcr > self._zcr_threshold)
+
+        # hysteresis: keep every run of `low` frames that contains a `high`
+        # frame (high is a subset of low). runs are labelled 1..n, 0 = silence
+        _labels = np.cumsum(low & ~np.concatenate(([False], low[:-1]))) * low
+        _has_high = np.zeros(int(_labels.max()) + 1, dtype=bool)
+        _has_high[_labels[high]] = True
+        _has_high[0] = False
+        return _has_high[_labels]
+
+    # ------------------------------------------------------------ #
+    # detection
+
+    def detect(self, audio_data: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Get the speech regions of the audio as a list of
+        (start_sample, end_sample) tuples.
+        """
+        speech = self._speech_frames(audio_data)
+        if not speech.any():
+            return []
+
+        # run boundaries in frames
+        _edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(_edges == 1)
+        ends = np.flatnonzero(_edges == -1)
+
+        # merge regions split by short gaps
+        _keep = np.concatenate(
+            ([True], starts[1:] - ends[:-1] >= self._min_silence_frames)
+        )
+        starts = starts[_keep]
+        ends = ends[np.concatenate((_keep[1:], [True]))]
+
+        # drop short blips
+        _long = ends - starts >= self._min_speech_frames
+        starts, ends = starts[_long], ends[_long]
+
+        # frames -> padded samples
+        regions = []
+        for start, end in zip(starts, ends):
+            _start = max(0, int(start) * self._frame_size - self._padding)
+            _end = min(len(audio_data), int(end) * self._frame_size + self._padding)
+            if regions and _start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], _end)
+            else:
+                regions.append((_start, _end))
+        return regions
+
+    def detect_storage(
+        self, audio_storage: "AudioStorage", start_sample: int = 0, end_sample: int = -1
+    ) -> List[Tuple[int, int]]:
+        """Get speech regions (absolute sample indices) for a range of an AudioStorage."""
+        audio_data = audio_storage.get_audio_range_samples(start_sample, end_sample)
+        return [
+            (start + start_sample, end + start_sample)
+            for start, end in self.detect(audio_data)
+        ]
+
+    def contains_speech(self, audio_data: np.ndarray) -> bool:
+        """Check if the audio has any speech in it."""
+        return len(self.detect(audio_data)) > 0
+
+    def get_sample_rate(self) -> int:
+        return self._sample_rate
+
+
+def read_wav_samples(filename: str) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit wav file into mono float32 samples + its sample rate."""
+    with wave.open(filename, "rb") as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit pcm wav files are supported")
+        raw = wf.readframes(wf.getnframes())
+
+    audio_data = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio_data = np.mean(audio_data.reshape(-1, channels), axis=1).astype(
+            np.float32
+        )
+    return audio_data, sample_rate
+
+
 class WhisperCoreSave:
+    """
+    Audio + segments of a transcription stream, saved to / loaded from a
+    single file.
+
+    File Format (little endian, version 1):
+    [1] Header: `SAVE_MAGIC` (15 bytes), version (u8), index offset (u64),
+        index length (u64), zero padded to `SAVE_ALIGNMENT`
+    [2] Audio: every sample as contiguous float32, readable with np.memmap
+    [3] Segment table: `SAVE_SEGMENT_DTYPE` records (times in ms)
+    [4] Segment text: the utf-8 texts the table points into
+    [5] Index: json with the audio config, chunk offsets and the offset +
+        size of [2] - [4]
+
+    `load` only reads the header + index: the audio is memory mapped and
+    the segments are decoded on first use, so opening a multi-hour save is
+    instant. Old pickled saves can still be loaded.
+    """
+
     def __init__(self, audio_storage: AudioStorage, segments: List[WhisperSegment]):
         self._audio_storage = audio_storage
         self._saved_segments = segments
 
+        # set by `load`, reads the segment table on first `get_segments`
+        self._segment_loader: Optional[Callable[[], list]] = None
+        self._segment_lock = threading.Lock()
+
     # ------------------------------------------------------------ #
     # io functions
 
     def save(self, save_file: str):
         """
-        Save the current state to a single file.
-
-        File Format:
-        [1] Header Segment
-        [2] Whisper Model Config
-        [3] Audio File Storage
-        [4] Whisper Segment Storage
-
-        """
-        # 15 in length
-        _header = b"WhisperCoreSave"
-
-        # model config
-        _config_chunk = {"bytes": pickle.dumps(self._audio_storage._audio_config)}
-
-        # model audio chunks
-        _audio_chunks = {
-            "count": len(self._audio_storage._chunks),
-            "duration": self._audio_storage.get_total_duration_millis(),
-            "max_chunk_duration": self._audio_storage._max_chunk_duration,
-            "chunks": [],
-        }
-        for i, chunk in enumerate(self._audio_storage._chunks):
-            _audio_chunks["chunks"].append(
-                {
-                    "index": i,
-                    "start_time": chunk._start_time,
-                    "end_time": chunk._end_time,
-                    "samples": chunk.get_samples(),
-                }
+        Save the current state to a single file. The file is written next to
+        `save_file` and moved over it when complete, so a crash never leaves
+        a half written save behind.
+        """
+        self._write(save_file, self._snapshot())
+
+    def _snapshot(self) -> Tuple[List[np.ndarray], List[int], int, list]:
+        """
+        (chunk samples, chunk offsets, total samples, segments) as of now,
+        appends after it don't touch these views.
+        """
+        _storage = self._audio_storage
+        with _storage._audio_cache_lock:
+            _chunks = [chunk.get_samples() for chunk in _storage._chunks]
+            _chunk_offsets = list(_storage._chunk_offsets)
+            _total_samples = _storage._total_samples
+        return _chunks, _chunk_offsets, _total_samples, list(self.get_segments())
+
+    def _write(
+        self,
+        save_file: str,
+        snapshot: Tuple[List[np.ndarray], List[int], int, list],
+    ):
+        """Write a `_snapshot` of this save to `save_file`."""
+        _storage = self._audio_storage
+        _chunks, _chunk_offsets, _total_samples, _segments = snapshot
+
+        # segment table + text
+        _texts = [chunk.segment.text.encode("utf-8") for chunk in _segments]
+        _table = np.zeros(len(_segments), dtype=SAVE_SEGMENT_DTYPE)
+        _table["t0"] = [int(chunk.segment.t0) for chunk in _segments]
+        _table["t1"] = [int(chunk.segment.t1) for chunk in _segments]
+        _table["timestamp"] = [chunk.timestamp for chunk in _segments]
+        _table["text_length"] = [len(text) for text in _texts]
+        _table["text_offset"] = np.cumsum([0] + _table["text_length"].tolist())[:-1]
+
+        with _atomic_write(save_file) as f:
+            f.write(b"\0" * SAVE_ALIGNMENT)
+
+            _audio_offset = f.tell()
+            for samples in _chunks:
+                samples.astype("<f4", copy=False).tofile(f)
+            _pad_to_alignment(f)
+
+            _table_offset = f.tell()
+            f.write(_table.tobytes())
+            _text_offset = f.tell()
+            f.write(b"".join(_texts))
+
+            _index = {
+                "audio_config": {
+                    "sample_rate": _storage._audio_config.sample_rate,
+                    "channels": _storage._audio_config.channels,
+                    "audio_format": _storage._audio_config.audio_format,
+                },
+                "max_chunk_duration": _storage._max_chunk_duration,
+                "audio": {"offset": _audio_offset, "samples": _total_samples},
+                "chunk_offsets": _chunk_offsets,
+                "segments": {"offset": _table_offset, "count": len(_segments)},
+                "text": {"offset": _text_offset, "length": sum(map(len, _texts))},
+            }
+            _index_offset = f.tell()
+            _index_bytes = json.dumps(_index).encode("utf-8")
+            f.write(_index_bytes)
+
+            # header last, it points at the index
+            f.seek(0)
+            f.write(
+                SAVE_MAGIC
+                + bytes([SAVE_VERSION])
+                + struct.pack("<QQ", _index_offset, len(_index_bytes))
+            )
+
+    @staticmethod
+    def read_index(save_file: str) -> Dict[str, Any]:
+        """Read the header + index of a save (nothing else is read)."""
+        with open(save_file, "rb") as f:
+            _header = f.read(SAVE_HEADER_SIZE)
+            if _header[: len(SAVE_MAGIC)] != SAVE_MAGIC:
+                raise ValueError(f"Not a WhisperCoreSave file: {save_file}")
+            _version = _header[len(SAVE_MAGIC)]
+            if _version > SAVE_VERSION:
+                raise ValueError(
+                    f"Save version {_version} is newer than supported {SAVE_VERSION}"
+                )
+            _index_offset, _index_length = struct.unpack(
+                "<QQ", _header[len(SAVE_MAGIC) + 1 : SAVE_HEADER_SIZE]
+            )
+            f.seek(_index_offset)
+            index = json.loads(f.read(_index_length).decode("utf-8"))
+        index["version"] = _version
+        return index
+
+    @staticmethod
+    def load(save_file: str) -> "WhisperCoreSave":
+        """Open a save: the audio is memory mapped, segments are read lazily."""
+        with open(save_file, "rb") as f:
+            _legacy = f.read(1) == b"\x80"
+        if _legacy:
+            return WhisperCoreSave._load_legacy(save_file)
+
+        index = WhisperCoreSave.read_index(save_file)
+        _config = index["audio_config"]
+        _audio = index["audio"]
+        samples = (
+            np.memmap(
+                save_file,
+                dtype="<f4",
+                mode="r",
+                offset=_audio["offset"],
+                shape=(_audio["samples"],),
             )
+            if _audio["samples"]
+            else np.array([], dtype=np.float32)
+        )
+
+        instance = WhisperCoreSave(
+            AudioStorage.from_samples(
+                AudioConfig(
+                    _config["sample_rate"],
+                    _config["channels"],
+                    _config["audio_format"],
+                ),
+                samples,
+                index["chunk_offsets"],
+                index["max_chunk_duration"],
+            ),
+            None,
+        )
+        instance._segment_loader = partial(_read_save_segments, save_file, index)
+        return instance
+
+    @staticmethod
+    def _load_legacy(save_file: str) -> "WhisperCoreSave":
+        """Load a pickled save (before version 1), only allowing its own types."""
+        with open(save_file, "rb") as f:
+            data = _LegacySaveUnpickler(f).load()
+        _chunks = data["audio_chunks"]
+        _samples = [chunk["samples"] for chunk in _chunks["chunks"]]
+        _chunk_offsets = np.cumsum([0] + [len(s) for s in _samples[:-1]]).tolist()
+        return WhisperCoreSave(
+            AudioStorage.from_samples(
+                _LegacySaveUnpickler.loads(data["config"]["bytes"]),
+                (
+                    np.concatenate(_samples).astype(np.float32, copy=False)
+                    if _samples
+                    else np.array([], dtype=np.float32)
+                ),
+                _chunk_offsets,
+                _chunks["max_chunk_duration"],
+            ),
+            [
+                _LegacySaveUnpickler.loads(segment)
+                for segment in data["segment_data"]["segments"]
+            ],
+        )
+
+    # ------------------------------------------------------------ #
+    # data
+
+    def get_audio_storage(self) -> AudioStorage:
+        return self._audio_storage
 
-        # segment data
-        _segment_data = {
-            "count": len(self._saved_segments),
-            "segments": [pickle.dumps(seg) for seg in self._saved_segments],
-        }
+    def get_segments(self) -> List["WhisperSegmentChunk"]:
+        """Saved segments, read from the save file on first use."""
+        with self._segment_lock:
+            if self._segment_loader is not None:
+                self._saved_segments = self._segment_loader()
+                self._segment_loader = None
+            return self._saved_segments
 
-        result = {
-            "header": _header,
-            "config": _config_chunk,
-            "audio_chunks": _audio_chunks,
-            "segment_data": _segment_data,
-        }
 
-        # write to file as json
-        with open(save_file, "wb") as f:
-            pickle.dump(result, f)
+@contextmanager
+def _atomic_write(file_name: str):
+    """
+    Write `file_name` through a temp file of its own next to it (mkstemp, so
+    concurrent writers never share one), replacing the file once the block
+    is done. The temp file is removed if the block fails.
+    """
+    _fd, _temp_file = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(file_name)),
+        prefix=f"{os.path.basename(file_name)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(_fd, "wb") as f:
+            yield f
+        os.replace(_temp_file, file_name)
+    except BaseException:
+        try:
+            os.remove(_temp_file)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _pad_to_alignment(f):
+    """Zero pad an open file to the next `SAVE_ALIGNMENT` boundary."""
+    f.write(b"\0" * (-f.tell() % SAVE_ALIGNMENT))
+
+
+def _read_save_segments(
+    save_file: str, index: Dict[str, Any]
+) -> List["WhisperSegmentChunk"]:
+    """Decode the segment table of a save."""
+    _count = index["segments"]["count"]
+    if not _count:
+        return []
+    with open(save_file, "rb") as f:
+        f.seek(index["segments"]["offset"])
+        _table = np.frombuffer(
+            f.read(_count * SAVE_SEGMENT_DTYPE.itemsize), dtype=SAVE_SEGMENT_DTYPE
+        )
+        f.seek(index["text"]["offset"])
+        _text = f.read(index["text"]["length"])
+
+    return [
+        WhisperSegmentChunk(
+            float(row["timestamp"]),
+            WhisperSegment(
+                t0=int(row["t0"]),
+                t1=int(row["t1"]),
+                text=_text[
+                    row["text_offset"] : row["text_offset"] + row["text_length"]
+                ].decode("utf-8"),
+            ),
+        )
+        for row in _table
+    ]
+
+
+class _LegacySaveUnpickler(pickle.Unpickler):
+    """
+    Unpickler of the old pickled saves. Only numpy arrays and the save's own
+    classes (pickled from verify.py as `__main__` or `verify`) are allowed.
+    """
+
+    _ALLOWED = {
+        ("numpy", "ndarray"),
+        ("numpy", "dtype"),
+        ("numpy.core.multiarray", "_reconstruct"),
+        ("numpy._core.multiarray", "_reconstruct"),
+    }
+
+    def find_class(self, module: str, name: str):
+        if (module, name) in self._ALLOWED:
+            return super().find_class(module, name)
+        if module in ("__main__", "verify", "pywhispercpp.model"):
+            _classes = {
+                "AudioConfig": AudioConfig,
+                "WhisperSegmentChunk": WhisperSegmentChunk,
+                "Segment": WhisperSegment,
+            }
+            if name in _classes:
+                return _classes[name]
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a save")
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return cls(io.BytesIO(data)).load()
+
+
+class WhisperCoreJournal:
+    """
+    Append-only journal of a transcription stream, for long sessions.
+
+    The state is the save at `save_file` (the base, see WhisperCoreSave)
+    plus the records of `<save_file>.journal`, each one framed as kind,
+    length, crc32 + payload:
+    - audio: absolute start sample (u64) + float32 samples
+    - segments: json {"start": i, "segments": [[timestamp, t0, t1, text]]},
+      the segments from index `i` on replace the ones before
+
+    `checkpoint` appends only what changed since the last one (new samples,
+    the segments from the first one that changed), so its cost is O(new
+    data). A session is recoverable up to the last checkpoint, a torn last
+    record is dropped by `recover` (and cut off when journaling resumes).
+    Once the journal outgrows `compact_ratio`
+    times the base (and `min_compact_bytes`), the state is compacted into a
+    new base and the journal starts over.
+    """
+
+    def __init__(
+        self,
+        save_file: str,
+        save: WhisperCoreSave,
+        compact_ratio: float = 1.0,
+        min_compact_bytes: int = 64 * 1024 * 1024,
+        sync: bool = True,
+    ):
+        """
+        Start journaling `save`. A new session is written as the base first.
+        If `save_file` already holds a session, `save` has to continue it
+        (restored from `recover`): nothing is rewritten, the journal is
+        appended to. A session shorter than the one on disk is refused.
+        """
+        self._save_file = save_file
+        self._journal_file = f"{save_file}.journal"
+        self._compact_ratio = compact_ratio
+        self._min_compact_bytes = min_compact_bytes
+        self._sync = sync
+        self._lock = threading.Lock()
+        self._file = None
+
+        # what the base + journal hold
+        self._samples = 0
+        self._segments: List[list] = []
+        self._base_bytes = 0
+        self._journal_bytes = 0
+
+        # stats
+        self._checkpoints = 0
+        self._compactions = 0
+
+        with self._lock:
+            if os.path.exists(save_file):
+                self._resume(save)
+            elif os.path.exists(self._journal_file):
+                raise FileExistsError(
+                    f"{self._journal_file} has no base {save_file}, remove it first"
+                )
+            else:
+                self._compact(save)
+
+    # ------------------------------------------------------------ #
+    # io functions
+
+    def checkpoint(self, save: WhisperCoreSave) -> int:
+        """
+        Append the audio + segment changes since the last checkpoint and
+        flush them to disk. Returns the bytes appended.
+        """
+        _storage = save.get_audio_storage()
+        with _storage._audio_cache_lock:
+            _total = _storage.get_total_samples()
+            if _total < self._samples:
+                raise ValueError(
+                    "Audio storage is shorter than the journal, start a new journal"
+                )
+            _new_audio = _storage.get_audio_range_samples(self._samples, _total)
+        _state = self._segment_state(save.get_segments())
+
+        with self._lock:
+            _written = 0
+            if len(_new_audio):
+                _written += self._append(
+                    JOURNAL_AUDIO,
+                    struct.pack("<Q", self._samples)
+                    + _new_audio.astype("<f4", copy=False).tobytes(),
+                )
+                self._samples = _total
+
+            # segments only change at the end, find the first that did
+            _start = 0
+            _common = min(len(_state), len(self._segments))
+            while _start < _common and _state[_start] == self._segments[_start]:
+                _start += 1
+            if _start < len(_state) or len(_state) < len(self._segments):
+                _update = {"start": _start, "segments": _state[_start:]}
+                _written += self._append(
+                    JOURNAL_SEGMENTS, json.dumps(_update).encode("utf-8")
+                )
+                self._segments = _state
+
+            self._file.flush()
+            if self._sync:
+                os.fsync(self._file.fileno())
+            self._checkpoints += 1
+
+            if self._journal_bytes > max(
+                self._min_compact_bytes, self._compact_ratio * self._base_bytes
+            ):
+                self._compact(save)
+        return _written
+
+    def compact(self, save: WhisperCoreSave):
+        """Write `save` as the new base and start an empty journal."""
+        with self._lock:
+            self._compact(save)
+
+    def close(self, save: Optional[WhisperCoreSave] = None):
+        """Stop journaling, compacting `save` into the base (if given)."""
+        with self._lock:
+            if save is not None:
+                self._compact(save)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if save is not None and os.path.exists(self._journal_file):
+                os.remove(self._journal_file)
+
+    def _append(self, kind: int, payload: bytes) -> int:
+        self._file.write(
+            JOURNAL_RECORD_HEADER.pack(kind, len(payload), zlib.crc32(payload))
+        )
+        self._file.write(payload)
+        _written = JOURNAL_RECORD_HEADER.size + len(payload)
+        self._journal_bytes += _written
+        return _written
+
+    def _resume(self, save: WhisperCoreSave):
+        """Continue the session on disk, `save` is (a continuation of) it."""
+        _persisted, _samples, _journal_end = self._replay(
+            self._save_file, load_audio=False
+        )
+        if save.get_audio_storage().get_total_samples() < _samples:
+            raise FileExistsError(
+                f"{self._save_file} holds a longer session, recover it or remove it"
+            )
+        self._samples = _samples
+        self._segments = self._segment_state(_persisted.get_segments())
+        self._base_bytes = os.path.getsize(self._save_file)
+
+        if not _journal_end:
+            self._reset_journal()
+            return
+        # drop a torn / corrupt tail, new records go right after the last good one
+        with open(self._journal_file, "r+b") as f:
+            f.truncate(_journal_end)
+        self._file = open(self._journal_file, "ab")
+        self._journal_bytes = _journal_end - JOURNAL_HEADER_SIZE
+
+    def _reset_journal(self):
+        """Replace the journal with an empty one."""
+        with _atomic_write(self._journal_file) as f:
+            f.write(JOURNAL_MAGIC + bytes([JOURNAL_VERSION]))
+            f.flush()
+            if self._sync:
+                os.fsync(f.fileno())
+        self._file = open(self._journal_file, "ab")
+        self._journal_bytes = 0
+
+    def _compact(self, save: WhisperCoreSave):
+        """
+        Base first, then the journal: a crash in between leaves an old
+        journal whose records the base already holds, `recover` skips them.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        # the base + what the journal continues from are the same snapshot,
+        # audio / segments added while it's written go to the next checkpoint
+        _snapshot = save._snapshot()
+        save._write(self._save_file, _snapshot)
+        self._samples = _snapshot[2]
+        self._segments = self._segment_state(_snapshot[3])
+        self._base_bytes = os.path.getsize(self._save_file)
+        self._reset_journal()
+        self._compactions += 1
+
+    @staticmethod
+    def _segment_state(segments: List["WhisperSegmentChunk"]) -> List[list]:
+        """Segments as the json rows of a segments record."""
+        return [
+            [
+                chunk.timestamp,
+                int(chunk.segment.t0),
+                int(chunk.segment.t1),
+                chunk.segment.text,
+            ]
+            for chunk in list(segments)
+        ]
+
+    @staticmethod
+    def read_records(journal_file: str) -> Iterator[Tuple[int, bytes, int]]:
+        """
+        (kind, payload, end offset) of every intact record, stops at a torn /
+        corrupt one.
+        """
+        with open(journal_file, "rb") as f:
+            _header = f.read(JOURNAL_HEADER_SIZE)
+            if _header[: len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+                raise ValueError(f"Not a WhisperCoreJournal file: {journal_file}")
+            if _header[len(JOURNAL_MAGIC)] > JOURNAL_VERSION:
+                raise ValueError(
+                    f"Journal version {_header[len(JOURNAL_MAGIC)]} is newer "
+                    f"than supported {JOURNAL_VERSION}"
+                )
+
+            while True:
+                _record = f.read(JOURNAL_RECORD_HEADER.size)
+                if len(_record) < JOURNAL_RECORD_HEADER.size:
+                    return
+                kind, _length, _crc = JOURNAL_RECORD_HEADER.unpack(_record)
+                payload = f.read(_length)
+                if len(payload) < _length or zlib.crc32(payload) != _crc:
+                    return
+                yield kind, payload, f.tell()
+
+    @staticmethod
+    def recover(save_file: str) -> Optional[WhisperCoreSave]:
+        """
+        The state of a journaled session: its base + every intact journal
+        record. None if there is no base.
+        """
+        return WhisperCoreJournal._replay(save_file)[0]
+
+    @staticmethod
+    def _replay(
+        save_file: str, load_audio: bool = True
+    ) -> Tuple[Optional[WhisperCoreSave], int, int]:
+        """
+        Base + journal records: (the save, its total samples, end offset of
+        the last record replayed, 0 without a journal). Without `load_audio`
+        the journaled samples are only counted, not added to the save.
+        """
+        if not os.path.exists(save_file):
+            return None, 0, 0
+        base = WhisperCoreSave.load(save_file)
+        _storage = base.get_audio_storage()
+        _total = _storage.get_total_samples()
+        _journal_file = f"{save_file}.journal"
+        if not os.path.exists(_journal_file):
+            return base, _total, 0
+
+        _segments = list(base.get_segments())
+        _end = JOURNAL_HEADER_SIZE
+        for kind, payload, end in WhisperCoreJournal.read_records(_journal_file):
+            if kind == JOURNAL_AUDIO:
+                (_start,) = struct.unpack_from("<Q", payload)
+                if _start > _total:
+                    # a gap, nothing after it can be trusted
+                    break
+                _samples = np.frombuffer(payload, dtype="<f4", offset=8)
+                if load_audio:
+                    _storage.append_audio(_samples[_total - _start :])
+                _total = max(_total, _start + len(_samples))
+            elif kind == JOURNAL_SEGMENTS:
+                _update = json.loads(payload.decode("utf-8"))
+                del _segments[_update["start"] :]
+                _segments.extend(
+                    WhisperSegmentChunk(
+                        timestamp, WhisperSegment(t0=t0, t1=t1, text=text)
+                    )
+                    for timestamp, t0, t1, text in _update["segments"]
+                )
+            _end = end
+        return WhisperCoreSave(_storage, _segments), _total, _end
+
+    # ------------------------------------------------------------ #
+    # info
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "samples": self._samples,
+                "segments": len(self._segments),
+                "base_bytes": self._base_bytes,
+                "journal_bytes": self._journal_bytes,
+                "checkpoints": self._checkpoints,
+                "compactions": self._compactions,
+            }
 
 
 class WhisperSegmentChunk:
@@ -555,14 +1435,28 @@ class WhisperCore:
     - user can only retrieve transcription data
     """
 
+    # pending job key for queued `update_stream` passes
+    _UPDATE_STREAM_JOB = "__update_stream__"
+
     def __init__(
         self,
-        model: str,
+        model: Any,
         audio_storage: AudioStorage,
+        max_decode_window: float = None,
+        vad: VoiceActivityDetector = None,
+        engine: str = ENGINE_WHISPERCPP,
         **kwargs,
     ):
+        """
+        `model` is a model path loaded by `engine` (see engines.py, `kwargs`
+        go to the engine), or an already loaded model (anything with a
+        pywhispercpp style `transcribe`) to share it between cores.
+        """
         self._audio_storage = audio_storage
-        self._model = WhisperModel(model, **kwargs)
+        if isinstance(model, str):
+            self._model = create_engine(engine, model, **kwargs)
+        else:
+            self._model = model
         self._model_lock = threading.RLock()
 
         # results container
@@ -570,14 +1464,35 @@ class WhisperCore:
         self._results_container_lock = threading.RLock()
         self._whisper_model_lock = threading.RLock()
 
+        # bounded-window streaming decoder
+        #   - committed segments were agreed on by consecutive passes and
+        #     are never decoded again
+        #   - tentative segments come from the latest pass only
+        #   - when set, each pass decodes at most `max_decode_window` seconds
+        #     of audio starting at the end of the committed prefix
+        self._max_decode_window = max_decode_window
+        self._committed_segments: List[WhisperSegmentChunk] = []
+        self._tentative_segments: List[WhisperSegmentChunk] = []
+        self._committed_end_millis = 0
+
+        # optional voice activity detection, silent audio is never decoded
+        self._vad = vad
+
         # threading
         self._thread_pool = ThreadPoolExecutor(max_workers=1)
 
+        # queued jobs that haven't finished yet, keyed by stream id
+        self._pending_jobs: Dict[str, Future] = {}
+        self._pending_jobs_lock = threading.RLock()
+
     # ------------------------------------------------------------ #
     # audio processing / transcription functions
 
     def update_stream(self):
         """Updates the transcription with new audio data using correct time handling."""
+        if self._max_decode_window is not None:
+            self.update_stream_windowed()
+            return
 
         # here's how i'm going to approach this:
         #   - retrieve audio data range from audio storage
@@ -615,6 +1530,9 @@ class WhisperCore:
         if len(audio_clip) == 0:
             # no audio data to process
             return
+        if self._vad is not None and not self._vad.contains_speech(audio_clip):
+            # only silence since the last segment
+            return
         # print("Time Range", start_millis, end_millis)
         # print("Audio Clip Size", len(audio_clip))
         # print("Audio Clip Duration", len(audio_clip) / self._audio_storage._sample_rate)
@@ -648,6 +1566,145 @@ class WhisperCore:
                         WhisperSegmentChunk(time.time(), seg)
                     )
 
+    def update_stream_windowed(self):
+        """
+        Incrementally decode the audio after the committed prefix.
+
+        Each pass decodes at most `max_decode_window` seconds, so the cost of a
+        tick is O(window) rather than O(utterance). Segments that match
+        (same text, in the same order) across two consecutive passes are
+        committed, except for the last segment of a pass which may still grow.
+        If the window is full and nothing was agreed on, everything but the
+        last segment is committed anyway so the window keeps moving forward.
+        """
+        _sample_rate = self._audio_storage._sample_rate
+
+        # STEP 1 - figure out the decode window
+        with self._results_container_lock:
+            start_millis = self._committed_end_millis
+        end_millis = start_millis + int(self._max_decode_window * 1000)
+        total_millis = self._audio_storage.get_total_duration_millis()
+        window_full = total_millis >= end_millis
+
+        # STEP 2
+        audio_clip = self._audio_storage.get_audio_range_millis(
+            start_millis, end_millis if window_full else -1
+        )
+        if len(audio_clip) == 0:
+            return
+
+        # STEP 2.5 - skip silence
+        if self._vad is not None:
+            regions = self._vad.detect(audio_clip)
+            if not regions:
+                # a full window of silence is never looked at again
+                if window_full:
+                    with self._results_container_lock:
+                        self._committed_end_millis = start_millis + int(
+                            len(audio_clip) * 1000 / _sample_rate
+                        )
+                        self._tentative_segments = []
+                        self._results_container = list(self._committed_segments)
+                return
+
+            # start decoding at the first speech in the window
+            _skip_millis = int(regions[0][0] * 1000 / _sample_rate)
+            audio_clip = audio_clip[regions[0][0] :]
+            start_millis += _skip_millis
+
+        # STEP 3
+        results = self.transcribe_audio(audio_clip)
+        for seg in results:
+            seg.t0 += start_millis
+            seg.t1 += start_millis
+
+        # STEP 4 - agree on a prefix + split committed / tentative
+        with self._results_container_lock:
+            _previous = [chunk.segment.text for chunk in self._tentative_segments]
+            _agreed = 0
+            while (
+                _agreed < min(len(_previous), len(results) - 1)
+                and _previous[_agreed] == results[_agreed].text
+            ):
+                _agreed += 1
+
+            # window full with no agreement, force the window forward
+            if window_full and _agreed == 0:
+                _agreed = max(1, len(results) - 1) if results else 0
+            _agreed = min(_agreed, len(results))
+
+            _now = time.time()
+            for seg in results[:_agreed]:
+                self._committed_segments.append(WhisperSegmentChunk(_now, seg))
+
+            if _agreed:
+                self._committed_end_millis = max(
+                    self._committed_end_millis, int(results[_agreed - 1].t1)
+                )
+            elif window_full:
+                # nothing was said in a full window, skip past it
+                self._committed_end_millis = start_millis + int(
+                    len(audio_clip) * 1000 / _sample_rate
+                )
+
+            # keep the edit timestamps of tentative segments that didn't change
+            _old_tentative = {
+                chunk.segment.text: chunk.timestamp
+                for chunk in self._tentative_segments
+            }
+            self._tentative_segments = [
+                WhisperSegmentChunk(_old_tentative.get(seg.text, _now), seg)
+                for seg in results[_agreed:]
+            ]
+            self._results_container = (
+                self._committed_segments + self._tentative_segments
+            )
+
+    def finish_stream(self):
+        """
+        Decode the rest of the audio at the end of a stream: windowed passes
+        until everything is committed. The segments of the last pass are
+        committed too, no more audio will come to change them.
+        """
+        if self._max_decode_window is None:
+            self.update_stream()
+            return
+
+        _window_millis = int(self._max_decode_window * 1000)
+        while True:
+            with self._results_container_lock:
+                start_millis = self._committed_end_millis
+            total_millis = self._audio_storage.get_total_duration_millis()
+            if start_millis >= total_millis:
+                return
+
+            self.update_stream_windowed()
+
+            with self._results_container_lock:
+                if (
+                    total_millis - start_millis >= _window_millis
+                    and self._committed_end_millis > start_millis
+                ):
+                    continue
+                # last window (or no progress), the rest is final
+                self._committed_segments += self._tentative_segments
+                self._committed_end_millis = max(
+                    self._committed_end_millis, total_millis
+                )
+                self._tentative_segments = []
+                self._results_container = list(self._committed_segments)
+                return
+
+    def get_committed_segments(self) -> List[WhisperSegmentChunk]:
+        """Segments that are final and will not be decoded again."""
+        with self._results_container_lock:
+            return list(self._committed_segments)
+
+    def get_tentative_segments(self) -> List[WhisperSegmentChunk]:
+        """Segments from the latest pass that may still change."""
+        with self._results_container_lock:
+            return list(self._tentative_segments)
+
     def transcribe_audio(self, audio_data: np.array, **kwargs):
         """
         Transcribe audio data
@@ -685,6 +1742,25 @@ class WhisperCore:
 
         return list(results)
 
+    def transcribe_speech(self, audio_data: np.array, **kwargs):
+        """
+        Transcribe only the speech regions of the audio data.
+
+        Requires a VoiceActivityDetector. Each region is transcribed on its own
+        and the timestamps (ms) are shifted back to the start of `audio_data`.
+        """
+        if self._vad is None:
+            return self.transcribe_audio(audio_data, **kwargs)
+
+        results = []
+        for start, end in self._vad.detect(audio_data):
+            _offset_millis = int(start * 1000 / self._vad.get_sample_rate())
+            for seg in self.transcribe_audio(audio_data[start:end], **kwargs):
+                seg.t0 += _offset_millis
+                seg.t1 += _offset_millis
+                results.append(seg)
+        return results
+
     def transcribe_file(self, audio_file: str, **kwargs):
         """Transcribe audio file."""
         # check if file exists
@@ -718,6 +1794,9 @@ class WhisperCore:
         )
         with self._results_container_lock:
             self._results_container = []
+            self._committed_segments = []
+            self._tentative_segments = []
+            self._committed_end_millis = 0
             self._audio_storage = AudioStorage(self._audio_storage._audio_config)
         return instance
 
@@ -730,16 +1809,140 @@ class WhisperCore:
 
     def restore_save(self, save: WhisperCoreSave):
         """Restore the transcription stream from a saved state."""
+        _segments = save.get_segments()
         with self._results_container_lock:
-            self._audio_storage = save._audio_storage
-            self._results_container = save._saved_segments
+            self._audio_storage = save.get_audio_storage()
+            self._results_container = _segments
+
+            # everything restored is treated as committed
+            self._committed_segments = list(_segments)
+            self._tentative_segments = []
+            self._committed_end_millis = max(
+                [int(chunk.segment.t1) for chunk in self._committed_segments],
+                default=0,
+            )
 
     # ---------------------------------------------------------- #
     # threading functions
 
-    def queue_transcribe_audio(self, audio_data: np.array, **kwargs):
-        """Queue audio data for transcription."""
-        pass
+    def queue_transcribe_audio(
+        self,
+        audio_data: np.array,
+        stream_id: str = None,
+        callback: Callable[[List[WhisperSegment]], None] = None,
+        error_callback: Callable[[BaseException], None] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue audio data for transcription on the worker thread.
+
+        Returns a Future right away, the caller never waits on inference.
+        If `stream_id` is given, a job for the same stream that is still
+        waiting in the queue is stale and gets cancelled (coalesced) in favour
+        of the new one. Results go to `callback`, exceptions to
+        `error_callback`; neither is called for a cancelled job.
+
+        `audio_data` must not be modified until the job is done.
+        """
+        with self._pending_jobs_lock:
+            if stream_id is not None and stream_id in self._pending_jobs:
+                self._pending_jobs[stream_id].cancel()
+
+            future = self._thread_pool.submit(
+                self.transcribe_audio, audio_data, **kwargs
+            )
+            if stream_id is not None:
+                self._pending_jobs[stream_id] = future
+
+        future.add_done_callback(
+            partial(
+                self._on_job_done,
+                stream_id,
+                callback=callback,
+                error_callback=error_callback,
+            )
+        )
+        return future
+
+    def queue_update_stream(
+        self, callback: Callable[[], None] = None, error_callback=None
+    ) -> Future:
+        """
+        Queue an `update_stream` pass on the worker thread.
+
+        If a pass is already waiting to start, that one is returned instead of
+        queueing another, so ticks never pile up behind a slow decode.
+        """
+        with self._pending_jobs_lock:
+            _pending = self._pending_jobs.get(self._UPDATE_STREAM_JOB)
+            if _pending is not None and not _pending.running() and not _pending.done():
+                return _pending
+
+            future = self._thread_pool.submit(self.update_stream)
+            self._pending_jobs[self._UPDATE_STREAM_JOB] = future
+
+        future.add_done_callback(
+            partial(
+                self._on_job_done,
+                self._UPDATE_STREAM_JOB,
+                callback=(lambda _: callback()) if callback else None,
+                error_callback=error_callback,
+            )
+        )
+        return future
+
+    def queue_finish_stream(
+        self, callback: Callable[[], None] = None, error_callback=None
+    ) -> Future:
+        """Queue `finish_stream` on the worker thread, after the queued passes."""
+        future = self._thread_pool.submit(self.finish_stream)
+        future.add_done_callback(
+            partial(
+                self._on_job_done,
+                None,
+                callback=(lambda _: callback()) if callback else None,
+                error_callback=error_callback,
+            )
+        )
+        return future
+
+    def cancel_queued_jobs(self, stream_id: str = None) -> int:
+        """Cancel queued jobs (all, or only for one stream). Returns the count."""
+        with self._pending_jobs_lock:
+            _targets = [
+                (key, future)
+                for key, future in self._pending_jobs.items()
+                if stream_id is None or key == stream_id
+            ]
+            return sum(1 for key, future in _targets if future.cancel())
+
+    def _on_job_done(
+        self,
+        stream_id: Optional[str],
+        future: Future,
+        callback: Callable = None,
+        error_callback: Callable = None,
+    ):
+        """Deliver job results + forget about finished jobs."""
+        with self._pending_jobs_lock:
+            if stream_id is not None and self._pending_jobs.get(stream_id) is future:
+                self._pending_jobs.pop(stream_id)
+
+        if future.cancelled():
+            return
+        _error = future.exception()
+        if _error is not None:
+            if error_callback:
+                error_callback(_error)
+            else:
+                print(f"Transcription job error: {_error}")
+            return
+        if callback:
+            callback(future.result())
+
+    def shutdown(self, wait: bool = True):
+        """Cancel queued jobs and stop the worker thread."""
+        self._thread_pool.shutdown(wait=wait, cancel_futures=True)
 
 
 # ------------------------------------------------------------ #
@@ -755,6 +1958,11 @@ if __name__ == "__main__":
     # start printing out mic audio
     UPDATE_INTERVAL = 0.5
 
+    # journal the session every few seconds, compacted into SAVE_FILE on exit.
+    # a session left in SAVE_FILE (+ its journal) is continued
+    SAVE_FILE = os.getenv("WHISPER_SAVE_FILE", "whispercpp-session.save")
+    CHECKPOINT_INTERVAL = 5.0
+
     SAMPLE_RATE = 16000  # samples per sec
     CHUNK_SIZE = 1024 * 4  # samples per chunk
     FORMAT = pyaudio.paInt16  # 16-bit signed int
@@ -774,8 +1982,19 @@ if __name__ == "__main__":
     whisper = WhisperCore(
         "assets/models/ggml-small.en.bin",
         audio_storage,
+        engine=os.getenv("STT_ENGINE", ENGINE_WHISPERCPP),
         # redirect_whispercpp_logs_to="stdout",
     )
+    _recovered = WhisperCoreJournal.recover(SAVE_FILE)
+    if _recovered is not None:
+        whisper.restore_save(_recovered)
+        audio_storage = _recovered.get_audio_storage()
+        print(
+            f"Recovered {audio_storage.get_total_duration_seconds():.2f} seconds "
+            f"from {SAVE_FILE}"
+        )
+    journal = WhisperCoreJournal(SAVE_FILE, whisper.get_save())
+    last_checkpoint = time.time()
 
     # ------------------------------------------------------------ #
     # start mic thread
@@ -807,7 +2026,8 @@ if __name__ == "__main__":
             for blob in _audio_batch:
                 audio_storage.append_audio(blob)
 
-            whisper.update_stream()
+            # decode on the worker thread, never block the capture loop
+            whisper.queue_update_stream()
 
             # print stats
             print(f"Audio blob count: {_blob_count}")
@@ -841,6 +2061,11 @@ if __name__ == "__main__":
 
             print()
 
+            # append the new audio + segment changes to the journal
+            if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                journal.checkpoint(whisper.get_save())
+                last_checkpoint = time.time()
+
             # --------------------------------------------- #
             # process audio
 
@@ -861,7 +2086,8 @@ if __name__ == "__main__":
     finally:
         mic.stop()
         mic.join()
+        whisper.shutdown()
         print("Exiting...")
         # save the data
-        whisper.get_save().save("whispercpp-audio-test.save")
+        journal.close(whisper.get_save())
         os._exit(0)